@@ -0,0 +1,52 @@
+"""
+Concurrency benchmark for the asyncio ImageGenerator API
+
+Fires many agenerate calls at a fake Stability client with injected latency
+and transient failures, and reports throughput, peak requests in flight and
+how many failures were absorbed by retries.
+
+Usage:
+    python benchmarks/bench_agenerate.py --requests 128 --max-in-flight 32
+"""
+
+import argparse
+import asyncio
+import time
+from thumbcrafter import ImageGenerator
+from fakes import FakeStabilityClient
+
+async def run(generator, requests):
+    return await asyncio.gather(*[
+        generator.agenerate(f"benchmark prompt {index}", (512, 512))
+        for index in range(requests)
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=128, help="Number of generations")
+    parser.add_argument("--latency", type=float, default=0.25, help="Seconds per fake generation")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="Share of calls failing transiently")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="ImageGenerator max_in_flight")
+    parser.add_argument("--pool-size", type=int, default=4, help="ImageGenerator pool_size")
+    args = parser.parse_args()
+
+    client = FakeStabilityClient(latency=args.latency, failure_rate=args.failure_rate)
+    generator = ImageGenerator(
+        client_factory=lambda: client,
+        pool_size=args.pool_size,
+        max_in_flight=args.max_in_flight,
+        max_retries=5,
+        backoff_base=0.05
+    )
+
+    start = time.perf_counter()
+    images = asyncio.run(run(generator, args.requests))
+    elapsed = time.perf_counter() - start
+    generator.close()
+
+    print(f"{len(images)} images in {elapsed:.2f}s ({len(images) / elapsed:.1f} images/s)")
+    print(f"peak in flight: {client.max_in_flight} (limit {args.max_in_flight})")
+    print(f"calls: {client.calls}, transient failures retried: {client.failures}")
+
+if __name__ == "__main__":
+    main()
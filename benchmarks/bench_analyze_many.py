@@ -0,0 +1,54 @@
+"""
+Throughput benchmark for batched theme classification
+
+Compares ContentAnalyzer.analyze (one pipeline call per post) against
+ContentAnalyzer.analyze_many at batch sizes 1 through 64 on a small local
+NLI model, and checks that both paths return the same themes.
+
+Usage:
+    python benchmarks/bench_analyze_many.py --model cross-encoder/nli-MiniLM2-L6-H768 --posts 64
+"""
+
+import argparse
+import time
+from thumbcrafter.content_analyzer import ContentAnalyzer
+
+SAMPLE_POSTS = [
+    ("The Future of Artificial Intelligence", "Exploring the latest developments in AI and their impact on society"),
+    ("10 Tips for Better Productivity", "Simple yet effective strategies to boost your daily productivity"),
+    ("The Art of Photography", "Master the fundamentals of photography and take stunning pictures"),
+    ("Budget Travel in Southeast Asia", "How to see five countries in a month without breaking the bank"),
+    ("Understanding Interest Rates", "What central bank decisions mean for your mortgage and savings"),
+    ("Plant-Based Meal Prep", "A week of healthy lunches you can cook in a single afternoon"),
+    ("Climate Policy After the Summit", "Which commitments will actually reduce emissions this decade"),
+    ("Marathon Training for Beginners", "A sixteen week plan to get you from the couch to the finish line"),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="cross-encoder/nli-MiniLM2-L6-H768", help="Zero-shot model to benchmark")
+    parser.add_argument("--posts", type=int, default=64, help="Number of posts per run")
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16,32,64", help="Comma separated batch sizes")
+    args = parser.parse_args()
+
+    analyzer = ContentAnalyzer(model=args.model)
+    posts = [SAMPLE_POSTS[i % len(SAMPLE_POSTS)] for i in range(args.posts)]
+
+    # Warm up the model so the first timed run does not pay for lazy init
+    analyzer.analyze(*posts[0])
+
+    start = time.perf_counter()
+    expected = [analyzer.analyze(title, summary) for title, summary in posts]
+    elapsed = time.perf_counter() - start
+    print(f"{'analyze':>12}: {len(posts) / elapsed:8.1f} posts/s")
+
+    for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+        start = time.perf_counter()
+        themes = analyzer.analyze_many(posts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+
+        matches = sum(1 for got, want in zip(themes, expected) if got == want)
+        print(f"{'batch=' + str(batch_size):>12}: {len(posts) / elapsed:8.1f} posts/s  ({matches}/{len(posts)} match analyze)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Encode time and output size per format across the style presets
+
+Renders a thumbnail for every style preset on a synthetic photo-like base
+image, then encodes it as PNG, WebP, progressive JPEG and AVIF (when
+available), both at the default quality and against a byte budget.
+
+Usage:
+    python benchmarks/bench_encode.py --target-kb 80
+"""
+
+import argparse
+import time
+import numpy as np
+from PIL import Image, ImageFilter
+from thumbcrafter import TextOverlay, ColorSchemes
+from thumbcrafter.encoder import avif_available, encode_image
+
+STYLES = ["modern", "minimal", "vibrant", "corporate", "creative"]
+
+def make_base(size):
+    """Smooth color fields plus fine noise, closer to a photo than pure noise"""
+    rng = np.random.default_rng(0)
+    coarse = Image.fromarray(rng.integers(0, 256, (9, 16, 3), dtype=np.uint8), "RGB")
+    base = coarse.resize(size, Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(8))
+    noise = rng.normal(0, 6, (size[1], size[0], 3))
+    return Image.fromarray(np.clip(np.asarray(base, dtype=np.float32) + noise, 0, 255).astype(np.uint8), "RGB")
+
+def timed_encode(image, format, target_bytes=None, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = encode_image(image, format, target_bytes=target_bytes)
+        best = min(best, time.perf_counter() - start)
+    return best, encoded.nbytes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="1200x630", help="Thumbnail size as WIDTHxHEIGHT")
+    parser.add_argument("--target-kb", type=int, default=80, help="Byte budget in KiB for the budgeted runs")
+    args = parser.parse_args()
+
+    size = tuple(int(value) for value in args.size.split("x"))
+    formats = ["png", "webp", "jpeg"] + (["avif"] if avif_available() else [])
+    overlay = TextOverlay()
+    base = make_base(size)
+    target = args.target_kb * 1024
+
+    print(f"{'style':<10} {'format':<6} {'default':>20} {'budget ' + str(args.target_kb) + ' KiB':>22}")
+    for style in STYLES:
+        thumbnail = overlay.add_text(base, "Encoding Benchmark Title", ColorSchemes.get_scheme_for_style(style), style)
+        for format in formats:
+            seconds, nbytes = timed_encode(thumbnail, format)
+            line = f"{style:<10} {format:<6} {seconds * 1000:7.1f} ms {nbytes / 1024:8.1f} KiB"
+            if format != "png":
+                seconds, nbytes = timed_encode(thumbnail, format, target)
+                line += f"   {seconds * 1000:7.1f} ms {nbytes / 1024:8.1f} KiB"
+            print(line)
+
+if __name__ == "__main__":
+    main()
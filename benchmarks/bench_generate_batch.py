@@ -0,0 +1,49 @@
+"""
+Wall-clock benchmark for concurrent multi-style generation
+
+Runs ThumbCrafter.generate_batch against a fake Stability client with
+injected latency and shows how total time shrinks as max_concurrency grows.
+
+Usage:
+    python benchmarks/bench_generate_batch.py --latency 0.5 --styles 8
+"""
+
+import argparse
+import time
+from thumbcrafter import ThumbCrafter, ImageGenerator
+from fakes import FakeContentAnalyzer, FakeStabilityClient
+
+STYLES = ["modern", "minimal", "vibrant", "corporate", "creative"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake generation")
+    parser.add_argument("--styles", type=int, default=8, help="Number of styles per batch")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma separated max_concurrency values")
+    args = parser.parse_args()
+
+    client = FakeStabilityClient(latency=args.latency)
+    # Random seeds, so repeated styles are not shared as identical requests
+    generator = ImageGenerator(client_factory=lambda: client, deterministic=False)
+    creator = ThumbCrafter(content_analyzer=FakeContentAnalyzer(), image_generator=generator)
+    styles = [STYLES[i % len(STYLES)] for i in range(args.styles)]
+
+    for concurrency in [int(value) for value in args.concurrency.split(",")]:
+        client.max_in_flight = 0
+        start = time.perf_counter()
+        thumbnails = creator.generate_batch(
+            "Benchmarking Concurrent Generation",
+            "How long does a batch take?",
+            styles=styles,
+            resolution=(1024, 576),
+            max_concurrency=concurrency
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"concurrency={concurrency:<3} {len(thumbnails)} styles in {elapsed:6.2f}s "
+            f"(peak in flight: {client.max_in_flight}, ideal: "
+            f"{args.latency * -(-len(styles) // concurrency):.2f}s)"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Import-time benchmark for overlay-only workers
+
+Measures, in a fresh interpreter, how long `import thumbcrafter` plus one
+TextOverlay render takes and verifies that none of the heavyweight model or
+API packages were loaded along the way.
+
+Usage:
+    python benchmarks/bench_import.py --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["torch", "transformers", "stability_sdk", "grpc"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import thumbcrafter
+imported = time.perf_counter()
+from PIL import Image
+from thumbcrafter import TextOverlay, ColorSchemes
+image = Image.new("RGB", (1200, 630), (40, 90, 160))
+TextOverlay().add_text(image, "Overlay Only Worker", ColorSchemes.get_modern_scheme(), "modern")
+rendered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "render_ms": (rendered - imported) * 1000,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to sample")
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, "-c", PROBE], check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output))
+
+    import_ms = statistics.median(sample["import_ms"] for sample in samples)
+    render_ms = statistics.median(sample["render_ms"] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample["loaded"]})
+
+    print(f"import thumbcrafter: {import_ms:7.1f} ms (median of {args.runs})")
+    print(f"first overlay render: {render_ms:7.1f} ms")
+    if loaded:
+        print(f"FAIL: heavyweight modules loaded: {', '.join(loaded)}")
+        sys.exit(1)
+    print(f"ok: none of {', '.join(HEAVY_MODULES)} were imported")
+
+if __name__ == "__main__":
+    main()
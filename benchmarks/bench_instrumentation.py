@@ -0,0 +1,84 @@
+"""
+Microbenchmark for the overhead of pipeline instrumentation
+
+Times an empty stage block with instrumentation disabled (the default
+no-op), enabled, and enabled with a callback, and relates the per-thumbnail
+cost to the CPU time of one text overlay render. Fails when the disabled
+overhead exceeds the allowed fraction of a render.
+
+Usage:
+    python benchmarks/bench_instrumentation.py --iterations 200000
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+from PIL import Image
+from thumbcrafter.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from thumbcrafter.text_overlay import TextOverlay
+
+# Instrumentation calls made while rendering one thumbnail
+CALLS_PER_THUMBNAIL = 8
+
+# Largest disabled overhead allowed, as a fraction of one overlay render
+MAX_DISABLED_OVERHEAD = 0.001
+
+def time_calls(instrumentation, iterations):
+    """Seconds per stage block, minus the cost of the bare loop"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with instrumentation.stage("overlay"):
+            pass
+    return max(time.perf_counter() - start - loop, 0.0) / iterations
+
+def time_overlay(repeat):
+    overlay = TextOverlay()
+    rng = np.random.default_rng(0)
+    base = Image.fromarray(rng.integers(0, 256, (1024, 1024, 3), dtype=np.uint8), "RGB")
+    colors = {"primary": (255, 255, 255), "secondary": (200, 200, 200), "accent": (255, 87, 51)}
+    overlay.add_text(base, "Benchmarking the overhead of instrumentation", colors, "modern")
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        overlay.add_text(base, "Benchmarking the overhead of instrumentation", colors, "modern")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000, help="Stage blocks timed per case")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed overlay renders (best is reported)")
+    args = parser.parse_args()
+
+    events = []
+    cases = [
+        ("disabled", NULL_INSTRUMENTATION),
+        ("enabled", Instrumentation()),
+        ("callback", Instrumentation(callback=events.append))
+    ]
+    overlay_time = time_overlay(args.repeat)
+    print(f"overlay render {overlay_time * 1000:.2f} ms")
+
+    disabled_fraction = None
+    for name, instrumentation in cases:
+        events.clear()
+        per_call = time_calls(instrumentation, args.iterations)
+        fraction = per_call * CALLS_PER_THUMBNAIL / overlay_time
+        if name == "disabled":
+            disabled_fraction = fraction
+        print(f"{name:<9} {per_call * 1e9:8.1f} ns/stage  {fraction * 100:8.4f}% of a render")
+
+    if disabled_fraction > MAX_DISABLED_OVERHEAD:
+        print(f"disabled overhead above {MAX_DISABLED_OVERHEAD * 100:.2f}% of a render", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Microbenchmark for lazily decoded generation results
+
+Requests many variation samples from the fake Stability client and ranks
+them, once by fully decoding every sample and once from downscaled
+LazyImage previews, decoding only the winner at full resolution. Also
+times building the variation request from a decoded generation result
+(PNG re-encode) and from the LazyImage returned by generate(lazy=True)
+(bytes reused).
+
+Usage:
+    python benchmarks/bench_lazy_images.py --samples 8 --size 1024
+"""
+
+import argparse
+import time
+import numpy as np
+from thumbcrafter import ImageGenerator
+from fakes import FakeStabilityClient
+
+def contrast(image):
+    """Ranking score: standard deviation of the grayscale pixels"""
+    return float(np.asarray(image.convert("L"), dtype=np.float32).std())
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=8, help="Variation samples per request")
+    parser.add_argument("--size", type=int, default=1024, help="Side of the generated images")
+    parser.add_argument("--preview-side", type=int, default=128, help="Largest side of ranking previews")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (best is reported)")
+    args = parser.parse_args()
+
+    client = FakeStabilityClient()
+    generator = ImageGenerator(client_factory=lambda: client)
+    source = generator.generate("lazy decoding benchmark", (args.size, args.size), lazy=True)
+    samples = generator.generate_variations(source, args.samples, lazy=True)
+
+    def rank_decoded():
+        images = [sample.load() for sample in samples]
+        return max(images, key=contrast)
+
+    def rank_previews():
+        best = max(samples, key=lambda sample: contrast(sample.preview(args.preview_side)))
+        return best.load()
+
+    decoded_time, _ = best_time(rank_decoded, args.repeat)
+    preview_time, _ = best_time(rank_previews, args.repeat)
+    print(
+        f"rank {args.samples} samples of {args.size}x{args.size}: full decode {decoded_time * 1000:8.2f} ms  "
+        f"previews {preview_time * 1000:8.2f} ms  speedup {decoded_time / preview_time:5.1f}x"
+    )
+
+    decoded = source.load()
+    reencode_time, _ = best_time(lambda: generator._variation_params(decoded, args.samples), args.repeat)
+    reuse_time, _ = best_time(lambda: generator._variation_params(source, args.samples), args.repeat)
+    print(
+        f"variation request from decoded image {reencode_time * 1000:8.2f} ms  "
+        f"from LazyImage {reuse_time * 1000:8.3f} ms"
+    )
+    generator.close()
+
+if __name__ == "__main__":
+    main()
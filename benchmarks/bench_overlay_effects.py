@@ -0,0 +1,87 @@
+"""
+Microbenchmark for the modern gradient and vibrant vignette effects
+
+Compares the original per-row / per-ring drawing loops against the cached
+NumPy alpha masks composited in one paste, and checks that both produce
+the same pixels wherever the loops draw (the ring loop leaves gaps between
+its outlines, which the mask fills in).
+
+Usage:
+    python benchmarks/bench_overlay_effects.py --repeat 5
+"""
+
+import argparse
+import time
+import numpy as np
+from PIL import Image, ImageDraw
+from thumbcrafter import text_overlay
+
+SIZES = [(1200, 630), (1024, 1024), (2048, 2048)]
+
+# Largest per-channel difference allowed between old and new output on pixels the loops draw
+TOLERANCE = 1
+
+def legacy_gradient(image):
+    gradient = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(gradient)
+    for y in range(image.size[1]):
+        alpha = int(128 * (1 - y / image.size[1]))
+        draw.line([(0, y), (image.size[0], y)], fill=(0, 0, 0, alpha))
+    image.paste(gradient, (0, 0), gradient)
+
+def legacy_vignette(image):
+    vignette = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(vignette)
+    center_x, center_y = image.size[0] // 2, image.size[1] // 2
+    max_radius = max(center_x, center_y)
+    for radius in range(max_radius, 0, -1):
+        alpha = int(128 * (1 - radius / max_radius))
+        draw.ellipse(
+            [center_x - radius, center_y - radius,
+             center_x + radius, center_y + radius],
+            outline=(0, 0, 0, alpha)
+        )
+    image.paste(vignette, (0, 0), vignette)
+
+def mask_gradient(image):
+    image.paste((0, 0, 0), (0, 0) + image.size, text_overlay._gradient_mask(image.size))
+
+def mask_vignette(image):
+    image.paste((0, 0, 0), (0, 0) + image.size, text_overlay._vignette_mask(image.size))
+
+def time_effect(effect, base, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        image = base.copy()
+        start = time.perf_counter()
+        effect(image)
+        best = min(best, time.perf_counter() - start)
+    return best, image
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (best is reported)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in SIZES:
+        base = Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8), "RGB")
+        cases = [("gradient", legacy_gradient, mask_gradient), ("vignette", legacy_vignette, mask_vignette)]
+
+        for name, legacy, vectorized in cases:
+            legacy_time, legacy_image = time_effect(legacy, base, args.repeat)
+            mask_time, mask_image = time_effect(vectorized, base, args.repeat)
+
+            legacy_pixels = np.asarray(legacy_image, dtype=np.int16)
+            drawn = (legacy_pixels != np.asarray(base, dtype=np.int16)).any(axis=2)
+            diff = np.abs(legacy_pixels - np.asarray(mask_image, dtype=np.int16))[drawn]
+            max_diff = int(diff.max()) if diff.size else 0
+            status = "ok" if max_diff <= TOLERANCE else "MISMATCH"
+            print(
+                f"{size[0]}x{size[1]:<5} {name:<9} loop {legacy_time * 1000:8.2f} ms  "
+                f"mask {mask_time * 1000:7.2f} ms  speedup {legacy_time / mask_time:6.1f}x  "
+                f"max diff {max_diff} [{status}]"
+            )
+
+if __name__ == "__main__":
+    main()
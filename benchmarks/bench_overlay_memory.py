@@ -0,0 +1,116 @@
+"""
+Peak memory benchmark for the vibrant overlay effect
+
+Runs the original float32 implementation, drawing the title straight onto
+the image, and the lookup-table pipeline compositing a freshly rendered
+text layer in separate processes, and reports how much peak RSS each adds
+on top of the working image, in multiples of one RGB frame buffer. Fails
+if the layered pipeline needs more than one extra frame buffer.
+
+Usage:
+    python benchmarks/bench_overlay_memory.py --size 2048x2048
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import numpy as np
+from PIL import Image, ImageDraw
+from thumbcrafter.text_layout import DEFAULT_FONT_PATHS, resolve_font
+from thumbcrafter.text_overlay import TextOverlay
+
+def reset_peak_rss():
+    """Reset the peak RSS to the current RSS where the OS allows it (Linux), so warmup peaks do not hide later ones"""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+def peak_rss_bytes():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+TITLE = "Measuring Overlay Memory"
+SCHEME = {"primary": (255, 255, 255), "secondary": (0, 120, 212)}
+
+def legacy_vibrant(image):
+    font = resolve_font(DEFAULT_FONT_PATHS, image.height // 12)
+    draw = ImageDraw.Draw(image)
+    draw.text((image.width // 10 + 2, image.height // 2 + 2), TITLE, font=font, fill=(0, 0, 0, 128))
+    draw.text((image.width // 10, image.height // 2), TITLE, font=font, fill=SCHEME["primary"])
+
+    img_array = np.array(image)
+    img_array = img_array.astype(np.float32)
+    img_array[:, :, :3] = np.clip(img_array[:, :, :3] * 1.2, 0, 255)
+    image = Image.fromarray(img_array.astype(np.uint8))
+
+    vignette = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(vignette)
+    center_x, center_y = image.size[0] // 2, image.size[1] // 2
+    max_radius = max(center_x, center_y)
+    for radius in range(max_radius, 0, -1):
+        alpha = int(128 * (1 - radius / max_radius))
+        draw.ellipse(
+            [center_x - radius, center_y - radius,
+             center_x + radius, center_y + radius],
+            outline=(0, 0, 0, alpha)
+        )
+    image.paste(vignette, (0, 0), vignette)
+
+def measure(variant, width, height):
+    """Measure one variant in this process and print the extra peak RSS"""
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), "RGB")
+    overlay = TextOverlay()
+
+    # Warm caches (fonts, vignette mask, lookup table) outside the measured region
+    overlay.add_text(image.resize((width // 8, height // 8)), TITLE, SCHEME, "vibrant")
+    resolve_font(DEFAULT_FONT_PATHS, height // 12)
+    if variant == "layered":
+        from thumbcrafter.text_overlay import _vignette_mask
+        _vignette_mask(image.size)
+
+    reset_peak_rss()
+    before = peak_rss_bytes()
+    if variant == "legacy":
+        legacy_vibrant(image)
+    else:
+        # Cold layer cache: includes rasterizing the overlay layer
+        overlay.add_text(image, TITLE, SCHEME, "vibrant")
+    print(peak_rss_bytes() - before)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="2048x2048", help="Image size as WIDTHxHEIGHT")
+    parser.add_argument("--variant", choices=["legacy", "layered"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    width, height = [int(value) for value in args.size.split("x")]
+
+    if args.variant:
+        measure(args.variant, width, height)
+        return
+
+    frame = width * height * 3
+    for variant in ["legacy", "layered"]:
+        output = subprocess.run(
+            [sys.executable, __file__, "--size", args.size, "--variant", variant],
+            check=True, capture_output=True, text=True
+        ).stdout
+        extra = int(output.strip().splitlines()[-1])
+        print(f"{variant:<8} extra peak RSS {extra / 2 ** 20:8.1f} MiB ({extra / frame:.2f} frames)")
+
+    # The lookup-table copy is the one extra frame; the text layer only covers the title
+    if extra > frame:
+        sys.exit(f"layered overlay used {extra / frame:.2f} extra frames, expected at most 1")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Microbenchmark for image palette extraction and text contrast selection
+
+Times the NumPy k-means palette and the region-aware text color choice
+against colorthief's pure-Python median cut (when installed) on generated
+images of several sizes.
+
+Usage:
+    python benchmarks/bench_palette.py --repeat 10
+"""
+
+import argparse
+import io
+import time
+from fakes import render_fake_image
+from PIL import Image
+from thumbcrafter.palette import choose_text_color, extract_palette
+
+SIZES = [(512, 512), (1024, 1024), (1200, 630), (2048, 2048)]
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def colorthief_palette(data, colors):
+    from colorthief import ColorThief
+
+    return ColorThief(io.BytesIO(data)).get_palette(color_count=colors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case (best is reported)")
+    parser.add_argument("--colors", type=int, default=5, help="Palette size")
+    args = parser.parse_args()
+
+    try:
+        import colorthief  # noqa: F401
+        has_colorthief = True
+    except ImportError:
+        has_colorthief = False
+        print("colorthief not installed, skipping the comparison")
+
+    for width, height in SIZES:
+        data = render_fake_image("palette benchmark", 0, width, height)
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        box = (width // 20, height * 2 // 5, width * 19 // 20, height * 3 // 5)
+
+        palette_time, palette = best_time(lambda: extract_palette(image, args.colors), args.repeat)
+        contrast_time, color = best_time(lambda: choose_text_color(image, box, (128, 128, 128)), args.repeat)
+        line = (
+            f"{width}x{height:<5} palette {palette_time * 1000:6.2f} ms  "
+            f"text color {contrast_time * 1000:6.2f} ms -> {color}"
+        )
+        if has_colorthief:
+            # colorthief opens the image itself, so its timing includes the PNG decode
+            thief_time, _ = best_time(lambda: colorthief_palette(data, args.colors), max(1, args.repeat // 5))
+            line += f"  colorthief {thief_time * 1000:8.2f} ms ({thief_time / palette_time:5.1f}x)"
+        print(line)
+        print(f"{'':<10} palette: " + ", ".join(f"{entry.color} {entry.weight:.0%}" for entry in palette))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Latency benchmark for progressive previews
+
+Runs ThumbCrafter.preview against a fake Stability client whose latency
+grows with the number of diffusion steps, and compares the time to the
+draft thumbnail with the time to the final one. A simulated editing
+session then re-previews on every keystroke and cancels the previous
+preview, showing how many final generations are not paid for.
+
+Usage:
+    python benchmarks/bench_progressive.py --latency-per-step 0.02 --edits 10
+"""
+
+import argparse
+import time
+from thumbcrafter import ThumbCrafter, ImageGenerator
+from fakes import FakeContentAnalyzer, FakeStabilityClient
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Fixed seconds per fake generation")
+    parser.add_argument("--latency-per-step", type=float, default=0.02, help="Additional seconds per diffusion step")
+    parser.add_argument("--draft-steps", type=int, default=8, help="Diffusion steps of the draft")
+    parser.add_argument("--previews", type=int, default=5, help="Previews timed end to end")
+    parser.add_argument("--edits", type=int, default=10, help="Title edits in the simulated editing session")
+    parser.add_argument("--typing-interval", type=float, default=0.1, help="Seconds between edits")
+    parser.add_argument("--final-delay", type=float, default=0.3, help="Seconds a preview waits before its final request")
+    args = parser.parse_args()
+
+    client = FakeStabilityClient(latency=args.latency, latency_per_step=args.latency_per_step)
+    generator = ImageGenerator(client_factory=lambda: client)
+    creator = ThumbCrafter(content_analyzer=FakeContentAnalyzer(), image_generator=generator)
+    resolution = (1024, 576)
+
+    draft_times, final_times = [], []
+    for index in range(args.previews):
+        start = time.perf_counter()
+        preview = creator.preview(f"Progressive Preview {index}", "Draft first", resolution=resolution, draft_steps=args.draft_steps)
+        draft_times.append(time.perf_counter() - start)
+        final = preview.result()
+        final_times.append(time.perf_counter() - start)
+        assert preview.draft.size == final.size == resolution
+
+    draft_ms = sorted(draft_times)[len(draft_times) // 2] * 1000
+    final_ms = sorted(final_times)[len(final_times) // 2] * 1000
+    print(f"median time to draft: {draft_ms:7.1f} ms")
+    print(f"median time to final: {final_ms:7.1f} ms ({final_ms / draft_ms:.1f}x the draft)")
+
+    # Every edit replaces the previous preview; only the last one should pay for a final render
+    calls_before = client.calls
+    preview = None
+    cancelled = 0
+    for index in range(args.edits):
+        if preview is not None:
+            cancelled += preview.cancel()
+        preview = creator.preview(
+            "Editing Session" + "!" * index, "Draft first", resolution=resolution,
+            draft_steps=args.draft_steps, final_delay=args.final_delay
+        )
+        time.sleep(args.typing_interval)
+    preview.result()
+    calls = client.calls - calls_before
+    print(
+        f"editing session: {args.edits} edits, {calls} generation calls "
+        f"({args.edits} drafts + {calls - args.edits} finals, {cancelled} finals cancelled)"
+    )
+    generator.close()
+
+if __name__ == "__main__":
+    main()
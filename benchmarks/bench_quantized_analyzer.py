@@ -0,0 +1,117 @@
+"""
+Agreement, latency and memory of the theme classifier's inference backends
+
+Classifies a fixed corpus with the fp32 torch path and with each selected
+backend (int8 torch, ONNX Runtime, int8 ONNX Runtime), every backend in a
+fresh process so its memory is measured in isolation. Reports per-post
+latency, model load time and RSS side by side, plus how often each backend
+selects exactly the same themes (and the same top theme) as fp32. Exits
+non-zero when agreement falls below --min-agreement.
+
+Usage:
+    python benchmarks/bench_quantized_analyzer.py --model cross-encoder/nli-MiniLM2-L6-H768 --threads 4
+    python benchmarks/bench_quantized_analyzer.py --theme-mode embedding --backends torch-int8,onnx
+"""
+
+import argparse
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+from bench_analyze_many import SAMPLE_POSTS
+
+CORPUS = SAMPLE_POSTS + [
+    ("Kubernetes Autoscaling Explained", "Scale your services with demand using horizontal pod autoscalers"),
+    ("Inside the James Webb Telescope", "How infrared astronomy is rewriting the history of early galaxies"),
+    ("Negotiating Your First Salary", "Research, anchoring and timing for a better job offer"),
+    ("Sourdough From Scratch", "Feeding a starter and baking an open-crumb loaf at home"),
+    ("Streetwear Trends This Autumn", "Oversized silhouettes and earthy tones dominate the season"),
+    ("Teaching Kids to Code", "Block-based tools that make programming fun for young learners"),
+    ("The Economics of Streaming Music", "Why artists earn fractions of a cent per play"),
+    ("Local Elections and Housing", "How city council votes shape rents and zoning"),
+    ("Rewilding Urban Rivers", "Restoring habitats in the middle of the city"),
+    ("Watercolor Techniques for Landscapes", "Wet-on-wet washes, glazing and lifting explained"),
+    ("Sleep and Athletic Recovery", "What research says about rest for endurance athletes"),
+    ("Index Funds Versus Stock Picking", "Long-term returns, fees and risk for retail investors"),
+]
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # No procfs: fall back to the peak, which is what macOS reports
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_backend(backend: str, args: dict) -> dict:
+    """Load one backend and classify the corpus"""
+    from thumbcrafter.content_analyzer import ContentAnalyzer
+
+    baseline_rss = rss_bytes()
+    start = time.perf_counter()
+    analyzer = ContentAnalyzer(args["model"], args["theme_mode"], backend=backend, num_threads=args["threads"])
+    analyzer.warmup()
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    themes = []
+    for _ in range(args["repeat"]):
+        themes = []
+        for title, summary in CORPUS:
+            start = time.perf_counter()
+            themes.append(analyzer.analyze(title, summary))
+            latencies.append(time.perf_counter() - start)
+
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "backend": backend,
+        "themes": themes,
+        "load_seconds": load_seconds,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "model_rss_bytes": rss_bytes() - baseline_rss
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", help="Model name or path (defaults to the theme mode's default model)")
+    parser.add_argument("--theme-mode", default="nli", choices=["nli", "embedding"], help="ContentAnalyzer theme mode")
+    parser.add_argument("--backends", default="torch-int8,onnx,onnx-int8", help="Comma separated backends compared against fp32 torch")
+    parser.add_argument("--threads", type=int, help="Inference threads per backend")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus per backend")
+    parser.add_argument("--min-agreement", type=float, default=0.9, help="Lowest acceptable exact theme agreement with fp32")
+    args = parser.parse_args()
+
+    config = {"model": args.model, "theme_mode": args.theme_mode, "threads": args.threads, "repeat": args.repeat}
+    backends = ["torch"] + [backend for backend in args.backends.split(",") if backend != "torch"]
+
+    results = []
+    for backend in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            results.append(executor.submit(run_backend, backend, config).result())
+
+    reference = results[0]["themes"]
+    print(f"{len(CORPUS)} posts, {args.repeat} passes, threads={args.threads or 'default'}")
+    print(f"{'backend':<11} {'p50 ms':>8} {'p90 ms':>8} {'load s':>7} {'RSS MiB':>8} {'exact':>6} {'top-1':>6}")
+
+    failed = False
+    for result in results:
+        exact = np.mean([got == want for got, want in zip(result["themes"], reference)])
+        top1 = np.mean([got[:1] == want[:1] for got, want in zip(result["themes"], reference)])
+        print(
+            f"{result['backend']:<11} {result['p50_ms']:8.1f} {result['p90_ms']:8.1f} "
+            f"{result['load_seconds']:7.1f} {result['model_rss_bytes'] / 2 ** 20:8.0f} "
+            f"{exact:6.0%} {top1:6.0%}"
+        )
+        failed = failed or exact < args.min_agreement
+
+    if failed:
+        print(f"agreement with fp32 below {args.min_agreement:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Scaling benchmark for the multi-process render pool
+
+Renders every style preset for a set of base images, first in-process with
+TextOverlay + PNG encoding, then on RenderPool with 1 up to the CPU count
+worker processes, and reports the throughput and speedup of each run.
+
+Usage:
+    python benchmarks/bench_render_pool.py --images 32 --size 1200x630
+"""
+
+import argparse
+import io
+import os
+import time
+import numpy as np
+from PIL import Image
+from thumbcrafter import TextOverlay, ColorSchemes
+from thumbcrafter.render_pool import RenderJob, RenderPool
+
+STYLES = ["modern", "minimal", "vibrant", "corporate", "creative"]
+
+def make_tasks(count, size):
+    rng = np.random.default_rng(0)
+    jobs = [
+        RenderJob(f"Benchmark Title Number {index}", ColorSchemes.get_scheme_for_style(style), style)
+        for index, style in enumerate(STYLES)
+    ]
+    images = [
+        Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8), "RGB")
+        for _ in range(count)
+    ]
+    return [(image, jobs) for image in images]
+
+def render_in_process(tasks):
+    overlay = TextOverlay()
+    for image, jobs in tasks:
+        for job in jobs:
+            buffer = io.BytesIO()
+            overlay.add_text(image, job.text, job.color_scheme, job.style).save(buffer, format=job.format)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=32, help="Number of base images")
+    parser.add_argument("--size", default="1200x630", help="Base image size as WIDTHxHEIGHT")
+    args = parser.parse_args()
+
+    size = tuple(int(value) for value in args.size.split("x"))
+    tasks = make_tasks(args.images, size)
+    renders = args.images * len(STYLES)
+
+    start = time.perf_counter()
+    render_in_process(tasks)
+    baseline = time.perf_counter() - start
+    print(f"in-process      {renders / baseline:7.1f} renders/s")
+
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    for processes in counts:
+        with RenderPool(processes) as pool:
+            # Start the workers and warm their font caches before timing
+            list(pool.render_many(tasks[:processes]))
+
+            start = time.perf_counter()
+            for _ in pool.render_many(tasks):
+                pass
+            elapsed = time.perf_counter() - start
+        print(
+            f"processes={processes:<3}   {renders / elapsed:7.1f} renders/s  "
+            f"speedup {baseline / elapsed:5.2f}x (ideal {processes}x)"
+        )
+
+if __name__ == "__main__":
+    main()
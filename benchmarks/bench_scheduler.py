@@ -0,0 +1,93 @@
+"""
+Simulation of the generation scheduler under a rate limit
+
+Drives a GenerationScheduler on a simulated clock against the fake
+Stability client: a backlog of backfill requests (with duplicate prompts)
+is queued up front while interactive requests keep arriving, and tenants
+draw on limited budgets. Reports simulated latency per priority, how many
+requests were coalesced or rejected, and the scheduler's own metrics.
+
+Usage:
+    python benchmarks/bench_scheduler.py --rate 2 --backfill 60
+"""
+
+import argparse
+import json
+from concurrent.futures import wait
+from thumbcrafter import ImageGenerator
+from thumbcrafter.scheduler import PRIORITY_BACKFILL, PRIORITY_INTERACTIVE, BudgetExceeded, GenerationScheduler
+from fakes import FakeStabilityClient, SimulatedClock
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=2.0, help="Requests per simulated second")
+    parser.add_argument("--burst", type=float, default=4.0, help="Token bucket capacity")
+    parser.add_argument("--backfill", type=int, default=60, help="Backfill requests queued up front")
+    parser.add_argument("--duplicate-every", type=int, default=4, help="Every Nth backfill prompt repeats an earlier one")
+    parser.add_argument("--interactive-interval", type=float, default=1.5, help="Simulated seconds between interactive requests")
+    parser.add_argument("--duration", type=float, default=30.0, help="Simulated seconds to run")
+    parser.add_argument("--tick", type=float, default=0.05, help="Simulated seconds per step")
+    args = parser.parse_args()
+
+    clock = SimulatedClock()
+    client = FakeStabilityClient()
+    generator = ImageGenerator(client_factory=lambda: client)
+    scheduler = GenerationScheduler(
+        generator,
+        rate=args.rate,
+        burst=args.burst,
+        budgets={"backfill-tenant": args.backfill * 0.6, "editor-tenant": 1000},
+        clock=clock,
+        autostart=False
+    )
+
+    latencies = {"interactive": [], "backfill": []}
+    pending = []
+    rejected = 0
+
+    def track(future, kind):
+        submitted = clock()
+        future.add_done_callback(lambda _: latencies[kind].append(clock() - submitted))
+        pending.append(future)
+
+    for index in range(args.backfill):
+        prompt_index = index - 1 if index and index % args.duplicate_every == 0 else index
+        try:
+            future = scheduler.submit(
+                f"backfill prompt {prompt_index}", (512, 512), priority=PRIORITY_BACKFILL, tenant="backfill-tenant"
+            )
+        except BudgetExceeded:
+            rejected += 1
+            continue
+        track(future, "backfill")
+
+    next_interactive = 0.0
+    interactive = 0
+    while clock() < args.duration:
+        if clock() >= next_interactive:
+            track(
+                scheduler.submit(f"edit {interactive}", (512, 512), priority=PRIORITY_INTERACTIVE, tenant="editor-tenant"),
+                "interactive"
+            )
+            interactive += 1
+            next_interactive += args.interactive_interval
+        scheduler.dispatch()
+        # The fake answers instantly, so dispatched requests finish within the tick
+        wait([future for future in pending if future.running()])
+        clock.advance(args.tick)
+
+    for kind, values in latencies.items():
+        values.sort()
+        if values:
+            print(
+                f"{kind:<12} completed {len(values):4d}  latency p50 {values[len(values) // 2]:6.2f}s  "
+                f"max {values[-1]:6.2f}s (simulated)"
+            )
+    print(f"backfill rejected for budget at submit: {rejected}")
+    print(f"fake API calls: {client.calls} for {args.backfill - rejected + interactive} accepted submissions")
+    print(json.dumps(scheduler.stats(), indent=2))
+    scheduler.close(wait=False)
+    generator.close()
+
+if __name__ == "__main__":
+    main()
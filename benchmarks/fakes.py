@@ -0,0 +1,213 @@
+"""
+Offline stand-ins for the paid and heavyweight backends used in benchmarks
+"""
+
+import hashlib
+import io
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+import numpy as np
+from PIL import Image
+import stability_sdk.interfaces.gooseai.generation.generation_pb2 as generation
+from thumbcrafter.content_analyzer import ContentAnalyzer
+
+class FakeStabilityClient:
+    """
+    Drop-in replacement for stability_sdk's StabilityInference
+
+    Produces deterministic gradient images derived from the prompt and seed,
+    after sleeping for a configurable latency to mimic the network round
+    trip plus a per-step share for the diffusion itself. Can fail a share
+    of calls with a transient ConnectionError to exercise retries.
+    Thread-safe, and counts and records the calls it served.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0, latency_per_step: float = 0.0):
+        """
+        Args:
+            latency (float): Seconds each generate call blocks before answering
+            latency_per_step (float): Additional seconds per requested diffusion step
+            failure_rate (float): Probability that a call fails with ConnectionError
+            seed (int): Seed for the failure injection
+        """
+        self.latency = latency
+        self.latency_per_step = latency_per_step
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.requests = []  # (prompt, seed, width, height, steps) of every call
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, width=512, height=512, samples=1, seed=0, init_image=None, steps=30, **kwargs):
+        """Yield a single answer holding `samples` PNG artifacts"""
+        with self._lock:
+            self.calls += 1
+            self.requests.append((prompt, seed, width, height, steps))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self._random.random() < self.failure_rate
+        try:
+            time.sleep(self.latency + self.latency_per_step * steps)
+            if fail:
+                with self._lock:
+                    self.failures += 1
+                raise ConnectionError("injected transient failure")
+            artifacts = [
+                SimpleNamespace(
+                    type=generation.ARTIFACT_IMAGE,
+                    binary=render_fake_image(prompt, seed + index, width, height)
+                )
+                for index in range(samples)
+            ]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        yield SimpleNamespace(artifacts=artifacts)
+
+class SimulatedClock:
+    """Manually advanced clock for driving time-dependent components deterministically"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+def render_fake_image(prompt: str, seed: int, width: int, height: int) -> bytes:
+    """
+    Render a deterministic PNG for a prompt and seed
+
+    Args:
+        prompt (str): Generation prompt
+        seed (int): Generation seed
+        width (int): Image width
+        height (int): Image height
+
+    Returns:
+        bytes: PNG-encoded RGB image
+    """
+    digest = hashlib.sha256(f"{prompt}|{seed}".encode("utf-8")).digest()
+    start = np.frombuffer(digest[:3], dtype=np.uint8).astype(np.float32)
+    end = np.frombuffer(digest[3:6], dtype=np.uint8).astype(np.float32)
+
+    # Diagonal two-color gradient
+    ramp = (np.arange(width)[None, :] + np.arange(height)[:, None]) / max(width + height - 2, 1)
+    pixels = start + (end - start) * ramp[:, :, None]
+
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8), "RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class FakeContentAnalyzer(ContentAnalyzer):
+    """Content analyzer that returns fixed themes without loading a model"""
+
+    def __init__(self, themes=("technology", "science")):
+        """
+        Args:
+            themes (tuple): Themes returned for every post
+        """
+        self.themes = list(themes)
+        self.theme_mode = "fake"
+        self.model = None
+        self.backend = "torch"
+
+    def analyze(self, title, summary):
+        return list(self.themes)
+
+    def analyze_many(self, posts, batch_size=16):
+        return [list(self.themes) for _ in posts]
+
+# Keywords describing each candidate theme for TinyThemeModel
+THEME_KEYWORDS = {
+    "technology": "technology software computer code programming ai data cloud app developer",
+    "business": "business company startup market strategy management sales customer growth",
+    "lifestyle": "lifestyle home habits daily living routine family productivity",
+    "health": "health fitness medical wellness diet exercise sleep doctor",
+    "education": "education learning school students teaching course university study",
+    "entertainment": "entertainment movies music games television shows celebrity",
+    "sports": "sports football basketball soccer training team match athletes",
+    "science": "science research physics biology chemistry experiment discovery space",
+    "art": "art design painting creative drawing illustration gallery",
+    "food": "food recipe cooking kitchen restaurant meal baking",
+    "travel": "travel trip destination vacation flight hotel adventure",
+    "fashion": "fashion style clothing outfit trends wear",
+    "finance": "finance money investing budget stocks savings banking",
+    "environment": "environment climate sustainability energy nature green",
+    "politics": "politics government election policy law vote"
+}
+
+class TinyThemeModel:
+    """
+    Tiny local stand-in for the zero-shot classification pipeline
+
+    Scores each candidate label by the cosine similarity of hashed
+    bag-of-words vectors of the text and the label's keywords. Pure NumPy,
+    so it runs in microseconds without downloading a model, yet follows the
+    pipeline's call signature and result format.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        """
+        Args:
+            dimensions (int): Size of the hashed feature space
+        """
+        self.dimensions = dimensions
+        self._label_vectors: Dict[str, np.ndarray] = {}
+
+    def embed(self, text: str) -> np.ndarray:
+        """Hash the words of a text into an L2-normalized count vector"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in re.findall(r"[a-z]+", text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest()
+            vector[int.from_bytes(digest, "little") % self.dimensions] += 1
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __call__(self, sequences, candidate_labels: List[str], multi_label: bool = True, batch_size: int = 1):
+        single = isinstance(sequences, str)
+        labels = list(candidate_labels)
+        matrix = np.stack([self._label_vector(label) for label in labels])
+
+        results = []
+        for text in [sequences] if single else sequences:
+            scores = matrix @ self.embed(text)
+            order = np.argsort(-scores)
+            results.append({
+                "sequence": text,
+                "labels": [labels[index] for index in order],
+                "scores": [float(scores[index]) for index in order]
+            })
+        return results[0] if single else results
+
+    def _label_vector(self, label: str) -> np.ndarray:
+        vector = self._label_vectors.get(label)
+        if vector is None:
+            vector = self.embed(f"{label} {THEME_KEYWORDS.get(label, '')}")
+            self._label_vectors[label] = vector
+        return vector
+
+class LocalContentAnalyzer(ContentAnalyzer):
+    """Content analyzer running the real analysis path on TinyThemeModel"""
+
+    def __init__(self, threshold: float = 0.1):
+        """
+        Args:
+            threshold (float): Minimum similarity for a theme to be selected
+        """
+        super().__init__()
+        self.theme_mode = "tiny"
+        self.score_threshold = threshold
+
+    def _load_theme_extractor(self):
+        return TinyThemeModel()
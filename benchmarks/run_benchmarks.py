@@ -0,0 +1,239 @@
+"""
+End-to-end benchmark harness with swappable offline backends
+
+Runs generate_thumbnail, generate_batch and the overlay effects across
+resolutions against a fake Stability client (deterministic images after a
+configurable latency) and a tiny local theme model, or against the real
+backends when requested. For every scenario it reports end-to-end and
+per-stage latency percentiles, throughput and peak RSS. Each scenario runs
+in a fresh process so peak RSS is not inherited from earlier scenarios.
+
+Results are written as JSON; pass an earlier file with --compare to print
+the change in p50 latency and throughput per scenario.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --output new.json --compare results.json
+    python benchmarks/run_benchmarks.py --analyzer nli --generator stability --iterations 5
+"""
+
+import argparse
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List
+import numpy as np
+
+RESOLUTIONS = [(512, 512), (1024, 576), (1024, 1024), (1200, 630)]
+STYLES = ["modern", "minimal", "vibrant"]
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latencies in milliseconds"""
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+        "max_ms": float(values.max())
+    }
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def build_crafter(config: dict, instrumentation):
+    """Create a ThumbCrafter on the configured backends"""
+    from thumbcrafter import ThumbCrafter, ImageGenerator
+    from fakes import FakeContentAnalyzer, FakeStabilityClient, LocalContentAnalyzer
+
+    if config["analyzer"] == "tiny":
+        analyzer = LocalContentAnalyzer()
+    elif config["analyzer"] == "fixed":
+        analyzer = FakeContentAnalyzer()
+    else:
+        from thumbcrafter import ContentAnalyzer
+        analyzer = ContentAnalyzer(theme_mode=config["analyzer"])
+
+    if config["generator"] == "fake":
+        client = FakeStabilityClient(latency=config["latency"])
+        generator = ImageGenerator(client_factory=lambda: client)
+    else:
+        generator = ImageGenerator()
+
+    return ThumbCrafter(content_analyzer=analyzer, image_generator=generator, instrumentation=instrumentation)
+
+def run_scenario(scenario: dict, config: dict) -> dict:
+    """Run one scenario and summarize its measurements"""
+    from thumbcrafter.instrumentation import Instrumentation
+
+    stage_samples = defaultdict(list)
+
+    def collect(event):
+        if event.kind == "timing":
+            stage_samples[event.name].append(event.value)
+
+    instrumentation = Instrumentation(callback=collect)
+    kind = scenario["kind"]
+    resolution = tuple(scenario["resolution"])
+
+    if kind == "overlay":
+        from thumbcrafter import TextOverlay, ColorSchemes
+        from PIL import Image
+        from fakes import render_fake_image
+
+        overlay = TextOverlay()
+        base = Image.open(io.BytesIO(render_fake_image("benchmark", 0, *resolution)))
+        base.load()
+        colors = ColorSchemes.get_scheme_for_style(scenario["style"])
+
+        def call(index):
+            with instrumentation.stage("overlay"):
+                overlay.add_text(base, f"Benchmark Overlay Title {index}", colors, scenario["style"])
+        units = 1
+    else:
+        crafter = build_crafter(config, instrumentation)
+
+        if kind == "generate_thumbnail":
+            def call(index):
+                crafter.generate_thumbnail(
+                    f"Benchmark Post {index}: Building Faster Software",
+                    "A look at profiling and optimizing a technology stack",
+                    resolution=resolution
+                )
+            units = 1
+        else:
+            def call(index):
+                crafter.generate_batch(
+                    f"Benchmark Post {index}: Building Faster Software",
+                    "A look at profiling and optimizing a technology stack",
+                    styles=STYLES,
+                    resolution=resolution,
+                    max_concurrency=len(STYLES)
+                )
+            units = len(STYLES)
+
+    # Distinct indices keep warmup calls from being shared with timed ones
+    for index in range(config["warmup"]):
+        call(-1 - index)
+    stage_samples.clear()
+
+    latencies = []
+    start = time.perf_counter()
+    for index in range(config["iterations"]):
+        call_start = time.perf_counter()
+        call(index)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    return {
+        **scenario,
+        "iterations": config["iterations"],
+        "latency": percentiles(latencies),
+        "throughput_per_s": config["iterations"] * units / elapsed,
+        "stages": {name: percentiles(samples) for name, samples in sorted(stage_samples.items())},
+        "peak_rss_bytes": peak_rss_bytes()
+    }
+
+def scenario_name(scenario: dict) -> str:
+    width, height = scenario["resolution"]
+    name = f"{scenario['kind']}/{width}x{height}"
+    return f"{name}/{scenario['style']}" if "style" in scenario else name
+
+def build_scenarios(kinds: List[str], resolutions) -> List[dict]:
+    scenarios = []
+    for resolution in resolutions:
+        for kind in kinds:
+            if kind == "overlay":
+                scenarios += [{"kind": kind, "resolution": resolution, "style": style} for style in STYLES]
+            else:
+                scenarios.append({"kind": kind, "resolution": resolution})
+    for scenario in scenarios:
+        scenario["name"] = scenario_name(scenario)
+    return scenarios
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_comparison(results: List[dict], baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = {result["name"]: result for result in json.load(baseline_file)["results"]}
+
+    print(f"\ncompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(result["name"])
+        if before is None:
+            continue
+        p50_change = result["latency"]["p50_ms"] / before["latency"]["p50_ms"] - 1
+        throughput_change = result["throughput_per_s"] / before["throughput_per_s"] - 1
+        print(f"{result['name']:<38} p50 {p50_change * 100:+7.1f}%  throughput {throughput_change * 100:+7.1f}%")
+
+def parse_resolution(value: str):
+    width, height = value.lower().split("x")
+    return (int(width), int(height))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default="generate_thumbnail,generate_batch,overlay", help="Comma separated scenario kinds")
+    parser.add_argument("--resolutions", default=",".join(f"{w}x{h}" for w, h in RESOLUTIONS), help="Comma separated WIDTHxHEIGHT values")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed calls per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed calls per scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake generation")
+    parser.add_argument("--analyzer", default="tiny", choices=["tiny", "fixed", "nli", "embedding"], help="Theme backend: tiny local model, fixed themes, or a real ContentAnalyzer mode")
+    parser.add_argument("--generator", default="fake", choices=["fake", "stability"], help="Image backend; stability needs STABILITY_API_KEY")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    config = {
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "latency": args.latency,
+        "analyzer": args.analyzer,
+        "generator": args.generator
+    }
+    resolutions = [parse_resolution(value) for value in args.resolutions.split(",")]
+    scenarios = build_scenarios(args.scenarios.split(","), resolutions)
+
+    results = []
+    for scenario in scenarios:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(run_scenario, scenario, config).result()
+        results.append(result)
+        print(
+            f"{result['name']:<38} p50 {result['latency']['p50_ms']:8.1f} ms  "
+            f"p99 {result['latency']['p99_ms']:8.1f} ms  {result['throughput_per_s']:7.2f}/s  "
+            f"peak RSS {result['peak_rss_bytes'] / 2 ** 20:6.0f} MiB"
+        )
+
+    if args.output:
+        report = {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": config,
+            "results": results
+        }
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -15,5 +15,14 @@ setup(
         "torch>=2.2.1",
         "stability-sdk>=0.8.5"
     ],
+    extras_require={
+        "onnx": ["optimum[onnxruntime]>=1.17.0"]
+    },
+    entry_points={
+        "console_scripts": [
+            "thumbcrafter=thumbcrafter.cli:main",
+            "thumbcrafter-analyzer=thumbcrafter.analyzer_server:main"
+        ]
+    },
     python_requires=">=3.8",
 ) 
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""
+Shared pytest setup: the fakes and reference implementations of the benchmarks are reused by the tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
@@ -0,0 +1,35 @@
+"""
+Tests for the shared analyzer server and its clients
+"""
+
+import time
+import pytest
+from fakes import FakeContentAnalyzer
+from thumbcrafter.analyzer_server import AnalyzerClient, AnalyzerServer
+
+POSTS = [("Server Post", "Classified remotely")]
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "analyzer.sock")
+
+def test_client_fails_fast_after_close(socket_path):
+    server = AnalyzerServer(socket_path, FakeContentAnalyzer()).start()
+    client = AnalyzerClient(socket_path, timeout=3)
+    assert client.analyze_many(POSTS) == [["technology", "science"]]
+
+    server.close()
+    start = time.perf_counter()
+    with pytest.raises(OSError):
+        client.analyze_many(POSTS)
+
+    assert time.perf_counter() - start < 1
+
+def test_client_reconnects_to_restarted_server(socket_path):
+    client = AnalyzerClient(socket_path, timeout=3)
+    with AnalyzerServer(socket_path, FakeContentAnalyzer()).start():
+        assert client.analyze_many(POSTS) == [["technology", "science"]]
+
+    with AnalyzerServer(socket_path, FakeContentAnalyzer(themes=["art"])).start():
+        assert client.analyze_many(POSTS) == [["art"]]
+    client.close()
@@ -0,0 +1,63 @@
+"""
+Tests for reading post feeds and streaming them through the CLI pipeline
+"""
+
+import io
+import json
+import pytest
+from fakes import FakeContentAnalyzer, FakeStabilityClient
+from thumbcrafter import ImageGenerator, ThumbCrafter
+from thumbcrafter.cli import MANIFEST_NAME, InvalidRecord, Pipeline, read_posts
+
+@pytest.fixture
+def creator():
+    generator = ImageGenerator(client_factory=FakeStabilityClient)
+    yield ThumbCrafter(content_analyzer=FakeContentAnalyzer(), image_generator=generator)
+    generator.close()
+
+def run_pipeline(creator, tmp_path, text, format, dedupe=False):
+    pipeline = Pipeline(creator, tmp_path, resolution=(128, 128), generate_workers=2, progress_interval=0, dedupe=dedupe)
+    counts = pipeline.run(read_posts(io.StringIO(text), format))
+    records = [json.loads(line) for line in (tmp_path / MANIFEST_NAME).read_text().splitlines()]
+    return counts, records
+
+def test_jsonl_bad_records_reported_per_post(creator, tmp_path):
+    text = "\n".join([
+        json.dumps({"id": "good", "title": "Good Post", "summary": "Renders"}),
+        "{not json",
+        json.dumps(["a", "list"]),
+        json.dumps({"title": 5}),
+        json.dumps({"title": "Styled", "style": ["modern"]}),
+        json.dumps({"title": "No Summary"}),
+    ])
+
+    counts, records = run_pipeline(creator, tmp_path, text, "jsonl")
+
+    assert counts == {"rendered": 2, "failed": 4, "skipped": 0}
+    failed = sorted(record["id"] for record in records if record["status"] == "error")
+    assert failed == ["line-2", "line-3", "line-4", "line-5"]
+    assert all(record["error"].startswith("read: ") for record in records if record["status"] == "error")
+
+def test_csv_missing_fields_become_empty(creator, tmp_path):
+    text = "id,title,summary\nfirst,First Post,About things\n,Short Row\n"
+
+    counts, records = run_pipeline(creator, tmp_path, text, "csv")
+
+    assert counts == {"rendered": 2, "failed": 0, "skipped": 0}
+    assert all(record["status"] == "ok" for record in records)
+
+def test_read_posts_checks_field_types():
+    posts = list(read_posts(io.StringIO('{"title": "A", "summary": null}\n{"summary": {}}\n'), "jsonl"))
+
+    assert posts[0] == {"title": "A", "summary": ""}
+    assert isinstance(posts[1], InvalidRecord)
+    assert posts[1].line_number == 2
+
+@pytest.mark.parametrize("dedupe, rendered, skipped", [(False, 3, 1), (True, 2, 2)])
+def test_repeated_posts_skipped_on_rerun_and_with_dedupe(creator, tmp_path, dedupe, rendered, skipped):
+    run_pipeline(creator, tmp_path, json.dumps({"id": "done", "title": "Done"}), "jsonl")
+    text = "\n".join(json.dumps({"id": post_id, "title": post_id}) for post_id in ["done", "new", "new", "other"])
+
+    counts, _ = run_pipeline(creator, tmp_path, text, "jsonl", dedupe=dedupe)
+
+    assert counts == {"rendered": rendered, "failed": 0, "skipped": skipped}
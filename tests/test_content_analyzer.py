@@ -0,0 +1,81 @@
+"""
+Tests for batched theme classification against the per-post path
+"""
+
+import math
+import os
+import pytest
+from bench_analyze_many import SAMPLE_POSTS
+from fakes import LocalContentAnalyzer, TinyThemeModel
+from thumbcrafter.content_analyzer import ContentAnalyzer
+
+# Tiny Hugging Face zero-shot checkpoint for the real pipeline test
+TINY_NLI_MODEL = os.getenv("THUMBCRAFTER_TEST_NLI_MODEL", "hf-internal-testing/tiny-random-BertForSequenceClassification")
+
+class BatchingThemeModel(TinyThemeModel):
+    """TinyThemeModel scoring (sequence, label) pairs in chunks of batch_size, as the transformers pipeline does"""
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+        self.chunks = []
+
+    def __call__(self, sequences, candidate_labels, multi_label=True, batch_size=1):
+        single = isinstance(sequences, str)
+        sequences = [sequences] if single else list(sequences)
+        labels = list(candidate_labels)
+        self.batch_sizes.append(batch_size)
+
+        pairs = [(text, label) for text in sequences for label in labels]
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            chunk = pairs[start:start + batch_size]
+            self.chunks.append(len(chunk))
+            scores += [float(self._label_vector(label) @ self.embed(text)) for text, label in chunk]
+
+        results = []
+        for index, text in enumerate(sequences):
+            ranked = sorted(zip(labels, scores[index * len(labels):(index + 1) * len(labels)]), key=lambda pair: -pair[1])
+            results.append({"sequence": text, "labels": [label for label, _ in ranked], "scores": [score for _, score in ranked]})
+        return results[0] if single else results
+
+@pytest.fixture
+def analyzer():
+    analyzer = LocalContentAnalyzer()
+    analyzer._theme_extractor = BatchingThemeModel()
+    return analyzer
+
+@pytest.mark.parametrize("batch_size", [1, 3, 16])
+def test_analyze_many_matches_analyze(analyzer, batch_size):
+    posts = SAMPLE_POSTS + SAMPLE_POSTS[:2]
+    expected = [analyzer.analyze(title, summary) for title, summary in posts]
+    assert any(expected)
+
+    model = analyzer.theme_extractor
+    model.chunks.clear()
+    assert analyzer.analyze_many(posts, batch_size=batch_size) == expected
+
+    # All pairs of the posts go through one call, in chunks of batch_size
+    pairs = len(posts) * len(analyzer.candidate_themes)
+    assert model.batch_sizes[-1] == batch_size
+    assert len(model.chunks) == math.ceil(pairs / batch_size)
+    assert max(model.chunks) == min(batch_size, pairs)
+
+def test_analyze_many_single_post(analyzer):
+    post = SAMPLE_POSTS[0]
+    assert analyzer.analyze_many([post]) == [analyzer.analyze(*post)]
+
+def test_analyze_many_empty(analyzer):
+    assert analyzer.analyze_many([]) == []
+
+@pytest.mark.parametrize("batch_size", [1, 7, 32])
+def test_analyze_many_matches_analyze_on_pipeline(batch_size):
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    analyzer = ContentAnalyzer(TINY_NLI_MODEL, server="")
+    try:
+        expected = [analyzer.analyze(title, summary) for title, summary in SAMPLE_POSTS]
+    except OSError as error:  # Offline, or the checkpoint is gone
+        pytest.skip(f"model {TINY_NLI_MODEL} unavailable: {error}")
+
+    assert analyzer.analyze_many(SAMPLE_POSTS, batch_size=batch_size) == expected
@@ -0,0 +1,67 @@
+"""
+Tests for concurrent multi-style generation
+"""
+
+import pytest
+from fakes import FakeContentAnalyzer, FakeStabilityClient
+from thumbcrafter import BatchGenerationError, ImageGenerator, ThumbCrafter
+
+STYLES = ["modern", "minimal", "vibrant", "corporate"]
+
+class CountingAnalyzer(FakeContentAnalyzer):
+    """Fake analyzer counting how often posts are analyzed"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def analyze(self, title, summary):
+        self.calls += 1
+        return super().analyze(title, summary)
+
+    def analyze_many(self, posts, batch_size=16):
+        posts = list(posts)
+        self.calls += len(posts)
+        return super().analyze_many(posts, batch_size)
+
+@pytest.fixture
+def client():
+    return FakeStabilityClient(latency=0.1)
+
+@pytest.fixture
+def creator(client):
+    generator = ImageGenerator(client_factory=lambda: client)
+    yield ThumbCrafter(content_analyzer=CountingAnalyzer(), image_generator=generator)
+    generator.close()
+
+def test_themes_analyzed_once_per_batch(creator):
+    thumbnails = creator.generate_batch("Shared Themes", "One analysis", styles=STYLES, resolution=(256, 256))
+
+    assert len(thumbnails) == len(STYLES)
+    assert creator.content_analyzer.calls == 1
+
+def test_styles_render_concurrently(creator, client):
+    creator.generate_batch("Concurrent Styles", "In parallel", styles=STYLES, resolution=(256, 256), max_concurrency=4)
+
+    assert client.calls == len(STYLES)
+    assert client.max_in_flight > 1
+
+def test_failing_style_reported_per_style(creator):
+    def fail(image, text, color_scheme):
+        raise ValueError("broken effect")
+    creator.text_overlay.style_effects["broken"] = [fail]
+    styles = ["modern", "broken", "minimal"]
+
+    with pytest.raises(BatchGenerationError) as info:
+        creator.generate_batch("Partial Failure", "One style fails", styles=styles, resolution=(256, 256))
+
+    assert list(info.value.errors) == ["broken"]
+    assert isinstance(info.value.errors["broken"], ValueError)
+    results = info.value.results
+    assert results[1] is None
+    assert results[0].size == results[2].size == (256, 256)
+
+    thumbnails = creator.generate_batch(
+        "Partial Failure", "One style fails", styles=styles, resolution=(256, 256), return_exceptions=True
+    )
+    assert isinstance(thumbnails[1], ValueError)
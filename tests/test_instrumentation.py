@@ -0,0 +1,46 @@
+"""
+Tests for stage profiling and memory tracing across threads
+"""
+
+import threading
+import tracemalloc
+from thumbcrafter.instrumentation import Instrumentation
+
+def run_overlapping(instrumentation, stage, threads=4):
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def work():
+        try:
+            with instrumentation.stage(stage):
+                barrier.wait(timeout=5)
+                sum(range(1000))
+        except Exception as error:
+            errors.append(error)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return errors
+
+def test_overlapping_profiled_stages_do_not_fail():
+    instrumentation = Instrumentation(profile_stages=["generate"], trace_memory_stages=["generate"])
+
+    assert run_overlapping(instrumentation, "generate") == []
+
+    report = instrumentation.snapshot()
+    assert report["timings"]["generate"]["count"] == 4
+    assert report["counters"]["generate.profile_skipped"] == 3
+    assert instrumentation.profile_report("generate")
+    assert not tracemalloc.is_tracing()
+
+def test_profiling_resumes_after_overlap():
+    instrumentation = Instrumentation(profile_stages=["overlay"])
+    run_overlapping(instrumentation, "overlay")
+
+    with instrumentation.stage("overlay"):
+        pass
+
+    assert instrumentation.snapshot()["counters"]["overlay.profile_skipped"] == 3
@@ -0,0 +1,55 @@
+"""
+Tests for progressive previews: a fast draft first, a cancellable final render later
+"""
+
+import time
+from concurrent.futures import CancelledError
+import pytest
+from fakes import FakeContentAnalyzer, FakeStabilityClient
+from thumbcrafter import ImageGenerator, ThumbCrafter
+
+@pytest.fixture
+def client():
+    return FakeStabilityClient(latency=0.01, latency_per_step=0.005)
+
+@pytest.fixture
+def generator(client):
+    generator = ImageGenerator(client_factory=lambda: client)
+    yield generator
+    generator.close()
+
+def test_draft_returns_before_final(generator):
+    creator = ThumbCrafter(content_analyzer=FakeContentAnalyzer(), image_generator=generator)
+    preview = creator.preview("Progressive Preview", "Draft first", resolution=(512, 384), final_delay=0.2)
+
+    assert preview.draft.size == (512, 384)
+    assert not preview.done()
+    assert preview.result(timeout=5).size == (512, 384)
+
+def test_draft_uses_seed_of_final(generator, client):
+    render = generator.generate_progressive("a lighthouse at dusk", (512, 512), steps=30, draft_steps=8)
+    render.result(timeout=5)
+
+    (draft_prompt, draft_seed, draft_width, _, draft_steps), (final_prompt, final_seed, final_width, _, final_steps) = client.requests
+    assert draft_prompt == final_prompt
+    assert draft_seed == final_seed
+    assert (draft_width, draft_steps) == (256, 8)
+    assert (final_width, final_steps) == (512, 30)
+
+def test_cancel_stops_final_generation(generator, client):
+    render = generator.generate_progressive("a lighthouse at dusk", (512, 512), final_delay=0.2)
+    calls = client.calls
+
+    assert render.cancel()
+    assert render.cancelled()
+    with pytest.raises(CancelledError):
+        render.result(timeout=5)
+    time.sleep(0.3)
+    assert client.calls == calls
+
+def test_cancel_after_final_was_sent(generator, client):
+    render = generator.generate_progressive("a lighthouse at dusk", (512, 512))
+    render.result(timeout=5)
+
+    assert not render.cancel()
+    assert client.calls == 2
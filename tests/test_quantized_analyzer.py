@@ -0,0 +1,71 @@
+"""
+Tests for label agreement of the quantized and ONNX analyzer backends with the fp32 torch path
+
+Run against a tiny Hugging Face checkpoint (override with
+THUMBCRAFTER_TEST_NLI_MODEL) and skipped when torch, transformers, optimum
+or the model are not available.
+"""
+
+import os
+import pytest
+from bench_quantized_analyzer import CORPUS
+from thumbcrafter.content_analyzer import ContentAnalyzer
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+MODEL = os.getenv("THUMBCRAFTER_TEST_NLI_MODEL", "hf-internal-testing/tiny-random-BertForSequenceClassification")
+
+# Largest allowed change of a theme score; themes are only compared where
+# the fp32 scores are further apart than twice this
+SCORE_TOLERANCE = 0.05
+
+def load_analyzer(backend):
+    analyzer = ContentAnalyzer(MODEL, backend=backend, server="")
+    try:
+        analyzer.warmup()
+    except OSError as error:  # Offline, or the checkpoint is gone
+        pytest.skip(f"model {MODEL} unavailable: {error}")
+    return analyzer
+
+def theme_scores(analyzer):
+    results = analyzer.theme_extractor(
+        [f"{title} {summary}" for title, summary in CORPUS],
+        candidate_labels=analyzer.candidate_themes,
+        multi_label=True
+    )
+    return [dict(zip(result["labels"], result["scores"])) for result in results]
+
+def clear_margin(scores, threshold):
+    """Whether no quantization error within SCORE_TOLERANCE can change the selected themes"""
+    ranked = sorted(scores.values(), reverse=True)[:4]
+    gaps = [a - b for a, b in zip(ranked, ranked[1:])] + [abs(score - threshold) for score in ranked]
+    return min(gaps) > 2 * SCORE_TOLERANCE
+
+@pytest.fixture(scope="module")
+def reference():
+    analyzer = load_analyzer("torch")
+    return analyzer, theme_scores(analyzer), analyzer.analyze_many(CORPUS)
+
+@pytest.fixture(scope="module", params=["torch-int8", "onnx", "onnx-int8"])
+def backend(request):
+    if request.param.startswith("onnx"):
+        pytest.importorskip("optimum.onnxruntime")
+    return request.param
+
+def test_scores_match_fp32(reference, backend):
+    _, expected, _ = reference
+    scores = theme_scores(load_analyzer(backend))
+
+    for got, want in zip(scores, expected):
+        assert set(got) == set(want)
+        assert max(abs(got[label] - want[label]) for label in want) <= SCORE_TOLERANCE
+
+def test_themes_agree_with_fp32(reference, backend):
+    fp32, scores, expected = reference
+    themes = load_analyzer(backend).analyze_many(CORPUS)
+
+    assert len(themes) == len(expected)
+    for post_themes, want, post_scores in zip(themes, expected, scores):
+        if clear_margin(post_scores, fp32.score_threshold):
+            assert post_themes == want
@@ -0,0 +1,25 @@
+"""
+Tests for rendering overlays on the process pool
+"""
+
+import pytest
+from PIL import Image
+from thumbcrafter.render_pool import RenderJob, RenderPool
+
+@pytest.fixture(scope="module")
+def pool():
+    with RenderPool(1) as pool:
+        yield pool
+
+def test_job_error_reaches_caller(pool):
+    # A color scheme without "primary" fails inside add_text, while the worker holds the shared view
+    with pytest.raises(KeyError):
+        pool.render(Image.new("RGB", (64, 64)), [RenderJob("Broken Scheme", {}, "modern")])
+
+def test_pool_usable_after_job_error(pool):
+    scheme = {"primary": (20, 40, 80), "secondary": (200, 120, 40), "text": (255, 255, 255)}
+    with pytest.raises(KeyError):
+        pool.render(Image.new("RGB", (64, 64)), [RenderJob("Broken Scheme", {}, "modern")])
+
+    encoded = pool.render(Image.new("RGB", (64, 64)), [RenderJob("Works", scheme, "modern")])
+    assert len(encoded) == 1 and encoded[0].startswith(b"\x89PNG")
@@ -0,0 +1,31 @@
+"""
+Tests for the vectorized TextOverlay effects against the original drawing loops
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+from bench_overlay_effects import legacy_gradient, legacy_vignette, mask_gradient, mask_vignette
+
+SIZES = [(1200, 630), (1024, 1024), (333, 77), (63, 65)]
+
+def apply(effect, size):
+    image = Image.new("RGB", size, (255, 255, 255))
+    effect(image)
+    return np.asarray(image, dtype=np.int16)
+
+@pytest.mark.parametrize("size", SIZES)
+def test_gradient_matches_reference(size):
+    diff = np.abs(apply(legacy_gradient, size) - apply(mask_gradient, size))
+    assert diff.max() == 0
+
+@pytest.mark.parametrize("size", SIZES)
+def test_vignette_matches_reference(size):
+    reference = apply(legacy_vignette, size)
+    vectorized = apply(mask_vignette, size)
+
+    # The ring loop leaves pixels between its outlines untouched; the mask fills them in
+    drawn = (reference != 255).any(axis=2)
+    assert drawn.mean() > 0.6
+    assert np.abs(reference - vectorized)[drawn].max() == 0
+    assert (vectorized <= reference).all()
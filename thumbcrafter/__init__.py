@@ -2,22 +2,103 @@
 ThumbCrafterAI - Automated blog thumbnail generation system
 """
 
-from .content_analyzer import ContentAnalyzer
-from .image_generator import ImageGenerator
-from .text_overlay import TextOverlay
-from .utils import StylePresets, ColorSchemes
+import contextvars
+import importlib
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple, Dict, Tuple
+from .cache import ResultCache, image_from_bytes, image_to_bytes
+from .instrumentation import Instrumentation, NULL_INSTRUMENTATION
 
 __version__ = "0.1.0"
-__all__ = ['ThumbCrafter', 'ContentAnalyzer', 'ImageGenerator', 'TextOverlay', 'StylePresets', 'ColorSchemes']
+__all__ = ['ThumbCrafter', 'BatchGenerationError', 'ContentAnalyzer', 'ImageGenerator', 'TextOverlay', 'ResultCache', 'RenderArtifact', 'Instrumentation', 'StylePresets', 'ColorSchemes']
+
+# Public names and the submodule defining them. Submodules are imported on
+# first attribute access, so `import thumbcrafter` does not pull in
+# transformers, torch or stability_sdk
+_LAZY_ATTRIBUTES = {
+    "ContentAnalyzer": ".content_analyzer",
+    "ImageGenerator": ".image_generator",
+    "TextOverlay": ".text_overlay",
+    "RenderArtifact": ".artifact",
+    "StylePresets": ".utils",
+    "ColorSchemes": ".utils",
+}
+
+def __getattr__(name):
+    """Import public classes from their submodules on first access"""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+class _RenderPlan(NamedTuple):
+    """Inputs and cache keys of a single thumbnail render"""
+    title: str
+    style: str
+    resolution: Tuple[int, int]
+    color_scheme: Dict[str, Tuple[int, int, int]]
+    prompt: str
+    base_key: str
+    thumbnail_key: str
+
+class BatchGenerationError(RuntimeError):
+    """Raised by ThumbCrafter.generate_batch when one or more styles fail"""
+    
+    def __init__(self, errors, results):
+        """
+        Args:
+            errors (dict): Exception raised for each failed style
+            results (list): Thumbnails in input order, with None for failed styles
+        """
+        super().__init__(
+            "Thumbnail generation failed for styles: " + ", ".join(
+                f"{style} ({error!r})" for style, error in errors.items()
+            )
+        )
+        self.errors = errors
+        self.results = results
 
 class ThumbCrafter:
     """Main class for generating blog thumbnails"""
     
-    def __init__(self, api_key=None):
-        """Initialize the ThumbCrafter with optional API key"""
-        self.content_analyzer = ContentAnalyzer()
-        self.image_generator = ImageGenerator(api_key)
-        self.text_overlay = TextOverlay()
+    def __init__(self, api_key=None, cache=None, content_analyzer=None, image_generator=None, text_overlay=None, instrumentation=None, scheduler=None):
+        """
+        Initialize the ThumbCrafter
+        
+        Args:
+            api_key (str, optional): Stability AI API key
+            cache (ResultCache, optional): Cache for stage results. Themes, prompts, base images and
+                final thumbnails are cached separately, keyed by a hash of each stage's inputs
+            content_analyzer (ContentAnalyzer, optional): Analyzer to use instead of a default one
+            image_generator (ImageGenerator, optional): Generator to use instead of a default one
+            text_overlay (TextOverlay, optional): Overlay renderer to use instead of a default one
+            instrumentation (Instrumentation, optional): Collects per-stage timings, counters and
+                byte sizes. Disabled (a no-op) when not given
+            scheduler (GenerationScheduler, optional): Rate-, priority- and budget-aware queue that
+                base image generations go through. Priority and tenant come from
+                `scheduler.request_context`
+        """
+        from .content_analyzer import ContentAnalyzer
+        from .image_generator import ImageGenerator
+        from .text_overlay import TextOverlay
+        
+        self.content_analyzer = content_analyzer or ContentAnalyzer()
+        self.image_generator = image_generator or ImageGenerator(api_key)
+        self.text_overlay = text_overlay or TextOverlay()
+        self.cache = cache
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        self.scheduler = scheduler
+        
+    def warmup(self):
+        """Load the theme model and open image API connections ahead of the first request"""
+        self.content_analyzer.warmup()
+        self.image_generator.warmup()
         
     def generate_thumbnail(self, title, summary, style="modern", resolution=(1200, 630)):
         """
@@ -33,42 +114,500 @@ class ThumbCrafter:
             PIL.Image: Generated thumbnail
         """
         # Analyze content
-        themes = self.content_analyzer.analyze(title, summary)
+        themes = self._analyze(title, summary)
+        return self._render(title, themes, style, resolution)
+    
+    def render(self, title, summary, style="modern", resolution=(1200, 630)):
+        """
+        Generate a thumbnail and keep everything it was rendered from
+        
+        The returned artifact holds the base image, themes, prompt and
+        overlay inputs. Its `rerender(title=..., style=...)` redoes only the
+        stages whose inputs changed, so a title edit re-applies the overlay
+        instead of paying for another generation.
+        
+        Args:
+            title (str): Blog post title
+            summary (str): Blog post summary
+            style (str): Style preset to use
+            resolution (tuple): Output image resolution (width, height)
+            
+        Returns:
+            RenderArtifact: Thumbnail with its base image and inputs
+        """
+        themes = self._analyze(title, summary)
+        return self._render_artifact(title, summary, themes, style, resolution)
+    
+    def preview(self, title, summary, style="modern", resolution=(1200, 630), draft_steps=8, draft_scale=0.5, final_delay=0.0, callback=None):
+        """
+        Generate a quick draft thumbnail now and the final one in the background
+        
+        The draft is rendered from a few-step, reduced-resolution image with
+        the seed of the final one and gets the full overlay, so editors can
+        show it within a fraction of the usual latency. The final thumbnail
+        is delivered through the returned object's `final` future (and
+        `callback`); `cancel()` stops the final generation if its request
+        has not been sent yet. Only the final images are cached.
+        
+        Args:
+            title (str): Blog post title
+            summary (str): Blog post summary
+            style (str): Style preset to use
+            resolution (tuple): Output image resolution (width, height)
+            draft_steps (int): Diffusion steps of the draft image
+            draft_scale (float): Fraction of each side the draft image is generated at
+            final_delay (float): Seconds to wait before sending the final request, a window for cancelling
+            callback (callable, optional): Called with the final thumbnail once it is available
+            
+        Returns:
+            ProgressiveRender: Draft thumbnail (`draft`) and the pending final thumbnail (`final`)
+        """
+        from .image_generator import ProgressiveRender, _CancelToken
+        
+        themes = self._analyze(title, summary)
+        plan, target_plan = self._plan_output(title, themes, style, resolution)
+        
+        def finish(base_image, cache=True):
+            return self._apply_overlay(target_plan, self._fit_base(base_image, target_plan.resolution), cache)
+            
+        final = Future()
+        if callback is not None:
+            def deliver(future):
+                if not future.cancelled() and future.exception() is None:
+                    callback(future.result())
+            final.add_done_callback(deliver)
+            
+        # Without a generation to wait for, the final thumbnail doubles as the draft
+        thumbnail = self._cache_get_image(target_plan.thumbnail_key)
+        if thumbnail is None:
+            base_image = self._cache_get_image(plan.base_key)
+            if base_image is not None:
+                self.instrumentation.count("generate.cache_hits")
+                thumbnail = finish(base_image)
+        else:
+            self.instrumentation.count("thumbnail.cache_hits")
+        if thumbnail is not None:
+            token = _CancelToken()
+            token.send()
+            final.set_result(thumbnail)
+            return ProgressiveRender(thumbnail, final, token)
+            
+        # With a scheduler the draft is queued as interactive work and both requests count against its limits
+        with self.instrumentation.stage("generate_draft"):
+            base = (self.scheduler or self.image_generator).generate_progressive(
+                plan.prompt, plan.resolution, draft_steps=draft_steps, draft_scale=draft_scale, final_delay=final_delay
+            )
+        draft = finish(base.draft, cache=False)
+        
+        def on_base_image(future):
+            # A cancelled preview has no one waiting for the overlay
+            if not final.set_running_or_notify_cancel():
+                return
+            try:
+                base_image = future.result()
+                self._cache_set_image(plan.base_key, base_image)
+                thumbnail = finish(base_image)
+            except BaseException as error:
+                final.set_exception(error)
+            else:
+                final.set_result(thumbnail)
+                
+        base.final.add_done_callback(on_base_image)
+        return ProgressiveRender(draft, final, base._token)
+    
+    def generate_multi(self, title, summary, resolutions=None, style="modern", base_resolution=(1024, 1024)):
+        """
+        Generate thumbnails in several sizes from a single base image
+        
+        The content is analyzed and the base image generated once. Every
+        output size is then derived on the CPU with a saliency-aware crop to
+        its aspect ratio, a reduce-then-resample resize and its own text
+        overlay, so N sizes cost one paid generation.
+        
+        Args:
+            title (str): Blog post title
+            summary (str): Blog post summary
+            resolutions (dict or list, optional): Output sizes, either a mapping of names to
+                (width, height) or a list of sizes. Defaults to utils.SOCIAL_RESOLUTIONS
+            style (str): Style preset to use
+            base_resolution (tuple): Resolution the base image is generated at
+            
+        Returns:
+            dict: Thumbnail per name (or per size when a list was given)
+        """
+        from .utils import SOCIAL_RESOLUTIONS
+        
+        if resolutions is None:
+            resolutions = SOCIAL_RESOLUTIONS
+        if not isinstance(resolutions, dict):
+            resolutions = {tuple(size): size for size in resolutions}
+            
+        themes = self._analyze(title, summary)
+        return self._render_multi(title, themes, style, resolutions, base_resolution)
+    
+    def encode(self, thumbnail, format="webp", quality=None, target_bytes=None):
+        """
+        Encode a thumbnail in memory for upload or storage
+        
+        Args:
+            thumbnail (PIL.Image): Thumbnail to encode
+            format (str): "webp", "jpeg", "avif" (when available) or "png"
+            quality (int, optional): Fixed encoder quality
+            target_bytes (int, optional): Byte budget; the highest quality that fits is found by binary search
+            
+        Returns:
+            memoryview: Encoded image
+        """
+        from .encoder import encode_image
+        
+        with self.instrumentation.stage("encode"):
+            encoded = encode_image(thumbnail, format, quality=quality, target_bytes=target_bytes)
+        self.instrumentation.record_bytes("encode", encoded.nbytes)
+        return encoded
+    
+    def analyze_many(self, posts, batch_size=16):
+        """
+        Extract themes for many blog posts
+        
+        Cached posts are answered from the cache; the rest are classified
+        together in batches.
+        
+        Args:
+            posts (list): (title, summary) pairs
+            batch_size (int): Batch size passed to ContentAnalyzer.analyze_many
+            
+        Returns:
+            list: Themes for each post, in input order
+        """
+        posts = list(posts)
+        themes = [None] * len(posts)
+        if self.cache is not None:
+            for index, (title, summary) in enumerate(posts):
+                themes[index] = self._cache_get_json(self._themes_key(title, summary))
+                
+        missing = [index for index, post_themes in enumerate(themes) if post_themes is None]
+        if missing:
+            with self.instrumentation.stage("analyze_batch"):
+                results = self.content_analyzer.analyze_many([posts[index] for index in missing], batch_size=batch_size)
+            for index, post_themes in zip(missing, results):
+                themes[index] = post_themes
+                self._cache_set_json(self._themes_key(*posts[index]), post_themes)
+                    
+        self.instrumentation.count("analyze.cache_hits", len(posts) - len(missing))
+        return themes
+    
+    def plan_render(self, title, themes, style="modern", resolution=(1200, 630)):
+        """
+        Plan a render for already extracted themes
+        
+        Together with `cached_thumbnail`, `generate_base` and `apply_overlay`
+        this lets callers such as the bulk CLI run the render stages on
+        separate threads. Sizes beyond what the engine generates get a base
+        image at its limit that is reframed to the output size.
+        
+        Args:
+            title (str): Blog post title
+            themes (list): Themes of the post, as returned by `analyze_many`
+            style (str): Style preset to use
+            resolution (tuple): Output image resolution (width, height)
+            
+        Returns:
+            tuple: Plan of the base image and plan of the output thumbnail
+        """
+        return self._plan_output(title, themes, style, resolution)
+    
+    def cached_thumbnail(self, plan):
+        """
+        Look up the finished thumbnail of an output plan
+        
+        Args:
+            plan: Output plan returned by `plan_render`
+            
+        Returns:
+            PIL.Image: Cached thumbnail, or None without a cache or on a miss
+        """
+        return self._cache_get_image(plan.thumbnail_key)
+    
+    def generate_base(self, plan, resolution=None):
+        """
+        Generate (or load from the cache) the base image of a base plan
+        
+        Args:
+            plan: Base plan returned by `plan_render`
+            resolution (tuple, optional): Output size to reframe the base image to
+            
+        Returns:
+            PIL.Image: Base image
+        """
+        base_image = self._generate_base(plan)
+        if resolution is None:
+            return base_image
+        return self._fit_base(base_image, resolution)
+    
+    def apply_overlay(self, plan, base_image):
+        """
+        Add the text overlay of an output plan to its base image and cache the thumbnail
+        
+        Args:
+            plan: Output plan returned by `plan_render`
+            base_image (PIL.Image): Base image returned by `generate_base` for the output size
+            
+        Returns:
+            PIL.Image: Finished thumbnail
+        """
+        return self._apply_overlay(plan, base_image)
+    
+    def _render(self, title, themes, style, resolution):
+        """Render a thumbnail for already extracted themes"""
+        # Sizes beyond what the engine generates are derived from a base image
+        limit = self.image_generator.max_resolution
+        if resolution[0] > limit or resolution[1] > limit:
+            targets = {"output": resolution}
+            return self._render_multi(title, themes, style, targets, (limit, limit))["output"]
+            
+        plan = self._plan_render(title, themes, style, resolution)
+        
+        # Reuse a finished thumbnail when none of its inputs changed
+        thumbnail = self._cache_get_image(plan.thumbnail_key)
+        if thumbnail is not None:
+            self.instrumentation.count("thumbnail.cache_hits")
+            return thumbnail
+            
+        base_image = self._generate_base(plan)
+        return self._apply_overlay(plan, base_image)
+    
+    def _render_multi(self, title, themes, style, targets, base_resolution):
+        """Render several output sizes from one base image"""
+        from .reframe import SaliencyMap
+        
+        plan = self._plan_render(title, themes, style, base_resolution)
+        base_image = None
+        saliency = None
+        
+        thumbnails = {}
+        for name, size in targets.items():
+            size = tuple(size)
+            target_plan = self._target_plan(plan, size)
+            thumbnail = self._cache_get_image(target_plan.thumbnail_key)
+            if thumbnail is None:
+                # Generate (or load) the base image only once, on the first miss
+                if base_image is None:
+                    base_image = self._generate_base(plan)
+                    with self.instrumentation.stage("saliency"):
+                        saliency = SaliencyMap.from_image(base_image)
+                thumbnail = self._apply_overlay(target_plan, self._fit_base(base_image, size, saliency))
+            thumbnails[name] = thumbnail
+            
+        return thumbnails
+    
+    def _render_artifact(self, title, summary, themes, style, resolution, prompt=None, base_image=None):
+        """Render a thumbnail into a RenderArtifact, reusing a given prompt and base image"""
+        from .artifact import RenderArtifact
+        
+        plan, target_plan = self._plan_output(title, themes, style, resolution, prompt)
+        if base_image is None:
+            base_image = self._generate_base(plan)
+            
+        thumbnail = self._cache_get_image(target_plan.thumbnail_key)
+        if thumbnail is None:
+            thumbnail = self._apply_overlay(target_plan, self._fit_base(base_image, target_plan.resolution))
+            
+        return RenderArtifact(
+            title, summary, themes, style, target_plan.resolution, plan.prompt, plan.color_scheme,
+            base_image, thumbnail, crafter=self
+        )
+    
+    def _plan_output(self, title, themes, style, resolution, prompt=None):
+        """
+        Plan a render at an output size, generating sizes beyond what the engine supports at its limit
+        
+        Returns:
+            tuple: Plan of the base image and plan of the output thumbnail (the same plan when
+                the output size can be generated directly)
+        """
+        resolution = tuple(resolution)
+        limit = self.image_generator.max_resolution
+        if resolution[0] <= limit and resolution[1] <= limit:
+            plan = self._plan_render(title, themes, style, resolution, prompt)
+            return plan, plan
+            
+        plan = self._plan_render(title, themes, style, (limit, limit), prompt)
+        return plan, self._target_plan(plan, resolution)
+    
+    def _fit_base(self, base_image, size, saliency=None):
+        """Derive an output size from a base image generated at another size, as in _render_multi"""
+        from .reframe import SaliencyMap, reframe
+        
+        size = tuple(size)
+        if base_image.size == size:
+            return base_image
+        if saliency is None:
+            with self.instrumentation.stage("saliency"):
+                saliency = SaliencyMap.from_image(base_image)
+        with self.instrumentation.stage("reframe"):
+            return reframe(base_image, size, saliency)
+    
+    def _target_plan(self, plan, size):
+        """Plan for deriving an output size from the base image of another plan"""
+        return plan._replace(
+            resolution=size,
+            thumbnail_key=ResultCache.make_key("thumbnail", plan.thumbnail_key, list(size))
+        )
+    
+    def _plan_render(self, title, themes, style, resolution, prompt=None):
+        """Resolve the color scheme, prompt and cache keys of a render, optionally keeping a given prompt"""
         color_scheme = self.content_analyzer.extract_color_scheme(themes)
         
-        # Generate base image
-        prompt = self.content_analyzer.generate_prompt(title, themes, style)
-        base_image = self.image_generator.generate(prompt, resolution)
+        # Build the image prompt
+        if prompt is None:
+            prompt = self._build_prompt(title, themes, style)
         
-        # Add text overlay
-        thumbnail = self.text_overlay.add_text(
-            base_image,
-            title,
-            color_scheme,
-            style
+        base_key = ResultCache.make_key("base_image", prompt, list(resolution))
+        thumbnail_key = ResultCache.make_key(
+            "thumbnail", base_key, title, color_scheme, style, self.text_overlay.version
         )
+        return _RenderPlan(title, style, tuple(resolution), color_scheme, prompt, base_key, thumbnail_key)
+    
+    def _generate_base(self, plan):
+        """Generate the base image of a render, going through the cache when one is configured"""
+        base_image = self._cache_get_image(plan.base_key)
+        if base_image is None:
+            with self.instrumentation.stage("generate"):
+                base_image = (self.scheduler or self.image_generator).generate(plan.prompt, plan.resolution)
+            self._cache_set_image(plan.base_key, base_image)
+        else:
+            self.instrumentation.count("generate.cache_hits")
+        return base_image
+    
+    def _apply_overlay(self, plan, base_image, cache=True):
+        """Add the text overlay of a render to its base image, caching the thumbnail unless told not to"""
+        with self.instrumentation.stage("overlay"):
+            thumbnail = self.text_overlay.add_text(
+                base_image,
+                plan.title,
+                plan.color_scheme,
+                plan.style
+            )
+        if cache:
+            self._cache_set_image(plan.thumbnail_key, thumbnail)
         
         return thumbnail
     
-    def generate_batch(self, title, summary, styles=None, resolution=(1200, 630)):
+    def generate_batch(self, title, summary, styles=None, resolution=(1200, 630), max_concurrency=4, return_exceptions=False):
         """
         Generate multiple thumbnails with different styles
         
+        The content is analyzed once and the themes are shared by every
+        style. Image generation is network-bound, so the styles are rendered
+        concurrently on a thread pool.
+        
         Args:
             title (str): Blog post title
             summary (str): Blog post summary
             styles (list): List of style presets to use
             resolution (tuple): Output image resolution
+            max_concurrency (int): Maximum number of styles rendered at the same time
+            return_exceptions (bool): Put the exception of a failed style in its slot instead of raising
             
         Returns:
-            list: List of generated thumbnails
+            list: List of generated thumbnails, in the same order as `styles`
+            
+        Raises:
+            BatchGenerationError: If any style failed and `return_exceptions` is False
         """
         if styles is None:
             styles = ["modern", "minimal", "vibrant"]
+        if not styles:
+            return []
+            
+        themes = self._analyze(title, summary)
+        
+        workers = max(1, min(max_concurrency, len(styles)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Renders inherit the caller's request_context (scheduling priority and tenant)
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._render, title, themes, style, resolution)
+                for style in styles
+            ]
             
         thumbnails = []
-        for style in styles:
-            thumbnail = self.generate_thumbnail(title, summary, style, resolution)
-            thumbnails.append(thumbnail)
+        errors = {}
+        for style, future in zip(styles, futures):
+            error = future.exception()
+            if error is None:
+                thumbnails.append(future.result())
+            elif return_exceptions:
+                thumbnails.append(error)
+            else:
+                thumbnails.append(None)
+                errors[style] = error
+                
+        if errors:
+            raise BatchGenerationError(errors, thumbnails)
+            
+        return thumbnails
+    
+    def _analyze(self, title, summary):
+        """Extract themes, going through the cache when one is configured"""
+        if self.cache is None:
+            with self.instrumentation.stage("analyze"):
+                return self.content_analyzer.analyze(title, summary)
+            
+        key = self._themes_key(title, summary)
+        themes = self._cache_get_json(key)
+        if themes is None:
+            with self.instrumentation.stage("analyze"):
+                themes = self.content_analyzer.analyze(title, summary)
+            self._cache_set_json(key, themes)
+        else:
+            self.instrumentation.count("analyze.cache_hits")
+        return themes
+    
+    def _themes_key(self, title, summary):
+        """Cache key for the themes of a post under the current analyzer"""
+        return ResultCache.make_key(
+            "themes", title, summary, self.content_analyzer.theme_mode, self.content_analyzer.model,
+            self.content_analyzer.backend
+        )
+    
+    def _build_prompt(self, title, themes, style):
+        """Build the image prompt, going through the cache when one is configured"""
+        if self.cache is None:
+            return self.content_analyzer.generate_prompt(title, themes, style)
             
-        return thumbnails 
\ No newline at end of file
+        key = ResultCache.make_key("prompt", title, themes, style)
+        prompt = self._cache_get_json(key)
+        if prompt is None:
+            prompt = self.content_analyzer.generate_prompt(title, themes, style)
+            self._cache_set_json(key, prompt)
+        return prompt
+    
+    def _cache_get_json(self, key):
+        """Load a cached JSON value, or None without a cache or on a miss"""
+        if self.cache is None:
+            return None
+        data = self.cache.get(key)
+        return None if data is None else json.loads(data.decode("utf-8"))
+    
+    def _cache_set_json(self, key, value):
+        """Store a JSON-serializable value in the cache when one is configured"""
+        if self.cache is not None:
+            self.cache.set(key, json.dumps(value).encode("utf-8"))
+    
+    def _cache_get_image(self, key):
+        """Load a cached image, or None without a cache or on a miss"""
+        if self.cache is None:
+            return None
+        data = self.cache.get(key)
+        if data is None:
+            return None
+        with self.instrumentation.stage("cache_decode"):
+            return image_from_bytes(data)
+    
+    def _cache_set_image(self, key, image):
+        """Store an image in the cache when one is configured"""
+        if self.cache is not None:
+            with self.instrumentation.stage("cache_encode"):
+                data = image_to_bytes(image)
+            self.instrumentation.record_bytes("cache_write", len(data))
+            self.cache.set(key, data)
@@ -0,0 +1,420 @@
+"""
+Local theme analyzer server shared by many worker processes over a Unix socket
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Environment variable read by ContentAnalyzer to find a running server
+SOCKET_ENV_VAR = "THUMBCRAFTER_ANALYZER_SOCKET"
+
+# Messages are JSON objects prefixed with their length as a big-endian uint32
+_HEADER = struct.Struct(">I")
+
+def _send_frame(sock: socket.socket, message: dict):
+    payload = json.dumps(message).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            if received:
+                raise ConnectionError("Connection closed in the middle of a message")
+            return None
+        received += count
+    return bytes(buffer)
+
+def _recv_frame(sock: socket.socket) -> Optional[dict]:
+    """Read one message, or None if the peer closed the connection"""
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    payload = _recv_exactly(sock, _HEADER.unpack(header)[0])
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a message")
+    return json.loads(payload)
+
+def _shutdown_socket(sock: socket.socket):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # Already closed by the peer
+
+class _DynamicBatcher:
+    """
+    Groups requests that arrive close together into one model call
+
+    The first queued request opens a batch; requests arriving within
+    max_wait seconds join it until max_batch posts are collected. Once
+    closed, queued requests are finished and new ones are refused.
+    """
+
+    def __init__(self, analyzer, max_batch: int, max_wait: float, batch_size: int):
+        self.analyzer = analyzer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batch_size = batch_size
+        self.requests = 0
+        self.batches = 0
+        self.posts = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="thumbcrafter-analyzer-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, posts: List[Tuple[str, str]]) -> Future:
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Analyzer server is closed")
+            self._queue.put((posts, future))
+        return future
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # Finish this batch, then stop
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            posts = [post for item_posts, _ in batch for post in item_posts]
+            try:
+                themes = self.analyzer.analyze_many(posts, batch_size=self.batch_size)
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.posts += len(posts)
+            offset = 0
+            for item_posts, future in batch:
+                future.set_result(themes[offset:offset + len(item_posts)])
+                offset += len(item_posts)
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serves one client connection, one request at a time"""
+
+    def setup(self):
+        self.server.add_connection(self.request)
+
+    def finish(self):
+        self.server.remove_connection(self.request)
+
+    def handle(self):
+        while True:
+            try:
+                request = _recv_frame(self.request)
+            except (ConnectionError, ValueError):
+                return
+            if request is None:
+                return
+
+            if request.get("op") == "ping":
+                response = self.server.info()
+            else:
+                try:
+                    posts = [(str(title), str(summary)) for title, summary in request["posts"]]
+                    response = {"themes": self.server.batcher.submit(posts).result()}
+                except Exception as error:
+                    response = {"error": repr(error)}
+
+            try:
+                _send_frame(self.request, response)
+            except OSError:
+                return
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    # Every thread of every worker holds a connection; a short accept backlog
+    # makes bursts of new connections fail with EAGAIN
+    request_queue_size = 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._closing = False
+
+    def add_connection(self, sock: socket.socket):
+        """Track an open client connection, shutting it down right away once the server is closing"""
+        with self._connections_lock:
+            if not self._closing:
+                self._connections.add(sock)
+                return
+        _shutdown_socket(sock)
+
+    def remove_connection(self, sock: socket.socket):
+        with self._connections_lock:
+            self._connections.discard(sock)
+
+    def close_connections(self):
+        """Shut down every open client connection, so clients see a closed connection and reconnect"""
+        with self._connections_lock:
+            self._closing = True
+            connections = list(self._connections)
+        for sock in connections:
+            _shutdown_socket(sock)
+
+class AnalyzerServer:
+    """
+    Owns one theme model and classifies posts for many client processes
+
+    Worker processes (e.g. gunicorn workers) connect over a Unix socket
+    instead of each loading their own copy of the model, so the weights are
+    loaded and warmed up once per host. Requests from all clients are
+    grouped into batches dynamically: a batch closes after max_wait seconds
+    or once it holds max_batch posts, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        analyzer=None,
+        max_batch: int = 32,
+        max_wait: float = 0.005,
+        batch_size: int = 16
+    ):
+        """
+        Initialize the server and bind its socket
+
+        Args:
+            socket_path (str): Filesystem path of the Unix socket
+            analyzer (ContentAnalyzer, optional): Analyzer that runs the model. Defaults to a local ContentAnalyzer
+            max_batch (int): Maximum number of posts classified together
+            max_wait (float): Seconds a batch waits for more requests after the first one
+            batch_size (int): Batch size passed to ContentAnalyzer.analyze_many
+        """
+        if analyzer is None:
+            from .content_analyzer import ContentAnalyzer
+
+            # An empty server path keeps the analyzer local even if the env var is set
+            analyzer = ContentAnalyzer(server="")
+
+        self.socket_path = socket_path
+        self.analyzer = analyzer
+        self.batcher = _DynamicBatcher(analyzer, max_batch, max_wait, batch_size)
+
+        self._remove_stale_socket()
+        self._server = _UnixServer(socket_path, _RequestHandler)
+        self._server.batcher = self.batcher
+        self._server.info = self.info
+        self._serving = False
+
+    def info(self) -> Dict:
+        """Model configuration, batching counters and theme index hit rates"""
+        theme_index = getattr(self.analyzer, "theme_index", None)
+        return {
+            "theme_mode": self.analyzer.theme_mode,
+            "model": self.analyzer.model,
+            "backend": getattr(self.analyzer, "backend", None),
+            "requests": self.batcher.requests,
+            "batches": self.batcher.batches,
+            "posts": self.batcher.posts,
+            "theme_index": None if theme_index is None else theme_index.stats()
+        }
+
+    def serve_forever(self):
+        """Handle requests until close() is called from another thread"""
+        self._serving = True
+        try:
+            self._server.serve_forever()
+        finally:
+            self._serving = False
+
+    def start(self) -> "AnalyzerServer":
+        """Handle requests on a background thread"""
+        threading.Thread(target=self.serve_forever, name="thumbcrafter-analyzer-server", daemon=True).start()
+        return self
+
+    def close(self):
+        """Stop serving, drop open client connections and remove the socket file"""
+        if self._serving:
+            self._server.shutdown()
+        self._server.server_close()
+        # Clients blocked on a response get a closed connection (and retry against a
+        # restarted server) instead of waiting out their timeout
+        self._server.close_connections()
+        self.batcher.close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _remove_stale_socket(self):
+        """Remove a socket file left by a crashed server, refusing to replace a live one"""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f"An analyzer server is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+class AnalyzerClient:
+    """
+    Client of an AnalyzerServer
+
+    Each thread uses its own connection, so concurrent threads of a worker
+    are batched together by the server like requests from other processes.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        """
+        Args:
+            socket_path (str): Filesystem path of the server's Unix socket
+            timeout (float): Seconds to wait for a response
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def analyze_many(self, posts: Sequence[Tuple[str, str]]) -> List[List[str]]:
+        """
+        Classify posts on the server
+
+        Args:
+            posts (Sequence[Tuple[str, str]]): (title, summary) pairs
+
+        Returns:
+            List[List[str]]: Themes for each post, in input order
+        """
+        posts = [list(post) for post in posts]
+        if not posts:
+            return []
+        response = self._call({"op": "analyze", "posts": posts})
+        if "error" in response:
+            raise RuntimeError(f"Analyzer server failed: {response['error']}")
+        return response["themes"]
+
+    def ping(self) -> Dict:
+        """Check the server is reachable and get its model configuration"""
+        return self._call({"op": "ping"})
+
+    def close(self):
+        """Close this thread's connection"""
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, request: dict) -> dict:
+        # Requests are idempotent, so a connection dropped by a restarted server is retried once
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                _send_frame(sock, request)
+                response = _recv_frame(sock)
+                if response is None:
+                    raise ConnectionError("Analyzer server closed the connection")
+                return response
+            except OSError as error:
+                # A timed out connection may still receive the late response, so drop it
+                self.close()
+                if attempt or not isinstance(error, ConnectionError):
+                    raise
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the `thumbcrafter-analyzer` console script"""
+    parser = argparse.ArgumentParser(
+        prog="thumbcrafter-analyzer",
+        description="Serve the theme classifier to local worker processes over a Unix socket"
+    )
+    parser.add_argument("--socket", default=os.getenv(SOCKET_ENV_VAR, "/tmp/thumbcrafter-analyzer.sock"), help="Unix socket path")
+    parser.add_argument("--model", help="Model name or path")
+    parser.add_argument("--theme-mode", default="nli", choices=["nli", "embedding"], help="Theme engine")
+    parser.add_argument("--backend", default="torch", choices=["torch", "torch-int8", "onnx", "onnx-int8"], help="Inference backend")
+    parser.add_argument("--threads", type=int, help="Inference threads")
+    parser.add_argument("--max-batch", type=int, default=32, help="Maximum number of posts classified together")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Milliseconds a batch waits for more requests")
+    parser.add_argument("--batch-size", type=int, default=16, help="Batch size of each model forward pass")
+    parser.add_argument("--theme-index", help="Directory of a near-duplicate theme index to reuse themes from")
+    parser.add_argument("--theme-index-similarity", type=float, default=0.95, help="Minimum similarity (0-1) for reusing indexed themes")
+    args = parser.parse_args(argv)
+
+    from .content_analyzer import ContentAnalyzer
+
+    theme_index = None
+    if args.theme_index:
+        from .theme_index import ThemeIndex
+
+        theme_index = ThemeIndex(args.theme_index, args.theme_index_similarity)
+    analyzer = ContentAnalyzer(
+        args.model, args.theme_mode, backend=args.backend, num_threads=args.threads, server="", theme_index=theme_index
+    )
+    analyzer.warmup()
+
+    server = AnalyzerServer(args.socket, analyzer, args.max_batch, args.max_wait_ms / 1000, args.batch_size)
+    print(f"Serving {args.theme_mode} themes on {args.socket}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
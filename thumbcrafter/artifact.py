@@ -0,0 +1,187 @@
+"""
+Render artifacts: a finished thumbnail together with everything it was rendered from
+"""
+
+import copy
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from PIL import Image
+from .cache import image_from_bytes, image_to_bytes
+
+# Bump when the on-disk layout changes
+FORMAT_VERSION = 1
+
+class RenderArtifact:
+    """
+    A rendered thumbnail with its base image, themes, prompt and overlay inputs
+
+    Keeping the base image means an edit to the title or style only redoes
+    the stages whose inputs changed: a new title re-applies the overlay in
+    milliseconds, and the paid image generation runs again only if the
+    prompt changes. Artifacts can be saved to and loaded from a single file.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        summary: str,
+        themes: List[str],
+        style: str,
+        resolution: Tuple[int, int],
+        prompt: str,
+        color_scheme: Dict[str, Tuple[int, int, int]],
+        base_image: Image.Image,
+        thumbnail: Image.Image,
+        crafter=None
+    ):
+        """
+        Args:
+            title (str): Title drawn on the thumbnail
+            summary (str): Post summary the themes were extracted from
+            themes (List[str]): Extracted themes
+            style (str): Style preset
+            resolution (tuple): Thumbnail resolution (width, height)
+            prompt (str): Prompt the base image was generated from
+            color_scheme (dict): Colors used for the overlay
+            base_image (PIL.Image): Generated image without overlay
+            thumbnail (PIL.Image): Final thumbnail
+            crafter (ThumbCrafter, optional): Creator used by `rerender`
+        """
+        self.title = title
+        self.summary = summary
+        self.themes = list(themes)
+        self.style = style
+        self.resolution = tuple(resolution)
+        self.prompt = prompt
+        self.color_scheme = color_scheme
+        self.base_image = base_image
+        self.thumbnail = thumbnail
+        self.crafter = crafter
+
+    def rerender(
+        self,
+        title: Optional[str] = None,
+        style: Optional[str] = None,
+        summary: Optional[str] = None,
+        keep_base_image: bool = False
+    ) -> "RenderArtifact":
+        """
+        Render the thumbnail again with some inputs changed
+
+        Themes are kept unless a different summary is given, since rewording
+        a title rarely changes what a post is about. The base image is reused
+        whenever the prompt is unchanged, or always with keep_base_image, so
+        only the overlay is redone.
+
+        Args:
+            title (str, optional): New title
+            style (str, optional): New style preset
+            summary (str, optional): New summary; re-runs theme analysis
+            keep_base_image (bool): Reuse the base image even if the new style changes the prompt
+
+        Returns:
+            RenderArtifact: Artifact of the new render (self if nothing changed, or a copy
+                holding the new summary if it did not change the themes)
+
+        Raises:
+            ValueError: If the artifact is not bound to a ThumbCrafter
+        """
+        if self.crafter is None:
+            raise ValueError("RenderArtifact is not bound to a ThumbCrafter; pass one to RenderArtifact.load")
+
+        title = self.title if title is None else title
+        style = self.style if style is None else style
+        themes = self.themes
+        if summary is not None and summary != self.summary:
+            themes = self.crafter._analyze(title, summary)
+        else:
+            summary = self.summary
+
+        if (title, style, themes) == (self.title, self.style, self.themes):
+            if summary == self.summary:
+                return self
+            # Same render, but the artifact records the new summary
+            artifact = copy.copy(self)
+            artifact.summary = summary
+            return artifact
+
+        prompt = self.prompt if keep_base_image else self.crafter._build_prompt(title, themes, style)
+        base_image = self.base_image if prompt == self.prompt else None
+        return self.crafter._render_artifact(title, summary, themes, style, self.resolution, prompt, base_image)
+
+    def save(self, path: Union[str, Path]):
+        """
+        Write the artifact to a single file
+
+        The file is a zip archive holding the metadata as JSON and both
+        images as PNG. It is written to a temporary file first and moved
+        into place, so readers never see a partial artifact.
+
+        Args:
+            path (str or Path): Destination file
+        """
+        path = Path(path)
+        metadata = {
+            "format_version": FORMAT_VERSION,
+            "title": self.title,
+            "summary": self.summary,
+            "themes": self.themes,
+            "style": self.style,
+            "resolution": list(self.resolution),
+            "prompt": self.prompt,
+            "color_scheme": {name: list(color) for name, color in self.color_scheme.items()}
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.tmp-")
+        try:
+            # PNG is already compressed, so the entries are stored as is
+            with os.fdopen(fd, "wb") as file, zipfile.ZipFile(file, "w", zipfile.ZIP_STORED) as archive:
+                archive.writestr("artifact.json", json.dumps(metadata, indent=2))
+                archive.writestr("base_image.png", image_to_bytes(self.base_image))
+                archive.writestr("thumbnail.png", image_to_bytes(self.thumbnail))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, Path], crafter=None) -> "RenderArtifact":
+        """
+        Read an artifact written by `save`
+
+        Args:
+            path (str or Path): Artifact file
+            crafter (ThumbCrafter, optional): Creator to bind for `rerender`
+
+        Returns:
+            RenderArtifact: Loaded artifact
+
+        Raises:
+            ValueError: If the file was written by a newer, incompatible version
+        """
+        with zipfile.ZipFile(path) as archive:
+            metadata = json.loads(archive.read("artifact.json"))
+            if metadata.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported render artifact format version {metadata.get('format_version')!r}")
+            base_image = image_from_bytes(archive.read("base_image.png"))
+            thumbnail = image_from_bytes(archive.read("thumbnail.png"))
+
+        return cls(
+            title=metadata["title"],
+            summary=metadata["summary"],
+            themes=metadata["themes"],
+            style=metadata["style"],
+            resolution=tuple(metadata["resolution"]),
+            prompt=metadata["prompt"],
+            color_scheme={name: tuple(color) for name, color in metadata["color_scheme"].items()},
+            base_image=base_image,
+            thumbnail=thumbnail,
+            crafter=crafter
+        )
@@ -0,0 +1,225 @@
+"""
+Content-addressed on-disk cache for pipeline stage results
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from PIL import Image
+
+class ResultCache:
+    """
+    Size-bounded on-disk cache with least-recently-used eviction
+
+    Values are raw bytes stored under keys built by `make_key`, which hashes
+    the stage name together with every input of that stage. Keys are
+    prefixed with the stage name so hit, miss and eviction counters are
+    tracked per stage as well as in total.
+
+    Any object with the same `get(key)` and `set(key, value)` methods, taking
+    string keys and returning or storing bytes (`get` returns None on a
+    miss), can be passed to ThumbCrafter in place of this class; JSON
+    values are encoded by ThumbCrafter itself.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the cache
+
+        Args:
+            directory (str or Path): Directory holding the cache entries
+            max_bytes (int): Maximum total size of all entries before the least recently used are evicted
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stage_stats: Dict[str, Dict[str, int]] = {}
+
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._size = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(stage: str, *parts: Any) -> str:
+        """
+        Build a cache key from a stage name and its inputs
+
+        Args:
+            stage (str): Pipeline stage name, e.g. "themes" or "base_image"
+            *parts: JSON-serializable inputs of the stage
+
+        Returns:
+            str: Stage-prefixed SHA-256 key
+        """
+        payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{stage}-{digest}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up a cached value
+
+        Args:
+            key (str): Key returned by `make_key`
+
+        Returns:
+            bytes or None: Cached value, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._count(key, "misses")
+                return None
+
+            path = self._path(key)
+            try:
+                data = path.read_bytes()
+            except OSError:
+                # Entry was removed behind our back
+                self._forget(key)
+                self._count(key, "misses")
+                return None
+
+            self._entries.move_to_end(key)
+            try:
+                os.utime(path)  # Persist recency for the next process
+            except OSError:
+                pass
+
+            self._count(key, "hits")
+            return data
+
+    def set(self, key: str, value: bytes):
+        """
+        Store a value, evicting least recently used entries if over budget
+
+        Args:
+            key (str): Key returned by `make_key`
+            value (bytes): Value to store
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # Write atomically so concurrent readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            dict: Total hits, misses, evictions, entry count and size, plus per-stage counters
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "stages": {stage: dict(counts) for stage, counts in self._stage_stats.items()}
+            }
+
+    def clear(self):
+        """Remove every cache entry"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _path(self, key: str) -> Path:
+        digest = key.rsplit("-", 1)[-1]
+        return self.directory / digest[:2] / key
+
+    def _count(self, key: str, counter: str):
+        setattr(self, counter, getattr(self, counter) + 1)
+        stage = key.rsplit("-", 1)[0]
+        counts = self._stage_stats.setdefault(stage, {"hits": 0, "misses": 0, "evictions": 0})
+        counts[counter] += 1
+
+    def _forget(self, key: str):
+        self._size -= self._entries.pop(key, 0)
+
+    def _remove(self, key: str):
+        self._forget(key)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self._count(key, "evictions")
+
+    def _load_index(self):
+        """Rebuild the LRU order from entries left by earlier processes"""
+        entries = []
+        for path in self.directory.glob("*/*"):
+            if path.name.startswith(".tmp-"):
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+def image_to_bytes(image: Image.Image, format: str = "PNG") -> bytes:
+    """
+    Encode an image for storage in the cache
+
+    Args:
+        image (PIL.Image): Image to encode
+        format (str): Pillow format name
+
+    Returns:
+        bytes: Encoded image
+    """
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+def image_from_bytes(data: bytes) -> Image.Image:
+    """
+    Decode an image stored in the cache
+
+    Args:
+        data (bytes): Encoded image
+
+    Returns:
+        PIL.Image: Decoded image
+    """
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
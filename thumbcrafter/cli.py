@@ -0,0 +1,560 @@
+"""
+Command line interface for rendering thumbnails in bulk from a post feed
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterator, List, Optional, Set, Union
+
+# Sentinel passed down the pipeline once the input is exhausted
+_DONE = object()
+
+MANIFEST_NAME = "manifest.jsonl"
+
+class InvalidRecord(ValueError):
+    """An input record that is not a post; the pipeline reports it in the manifest and moves on"""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+
+def read_posts(stream: IO[str], format: str) -> Iterator[Union[Dict[str, str], InvalidRecord]]:
+    """
+    Lazily read posts from a JSONL or CSV stream
+
+    Records that are not valid JSON, not a JSON object or have non-string
+    text fields are yielded as InvalidRecord errors instead of ending the
+    stream. Missing (or empty CSV) title and summary fields become "".
+
+    Args:
+        stream (IO[str]): Text stream to read from
+        format (str): "jsonl" or "csv"
+
+    Returns:
+        Iterator[dict]: Posts with string "title" and "summary" fields, or InvalidRecord errors
+    """
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        for post in reader:
+            yield _check_post(post, reader.line_num)
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            post = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield InvalidRecord(line_number, f"invalid JSON: {error}")
+            continue
+        if not isinstance(post, dict):
+            yield InvalidRecord(line_number, f"expected a JSON object, got {type(post).__name__}")
+            continue
+        yield _check_post(post, line_number)
+
+def _check_post(post: dict, line_number: int) -> Union[Dict[str, str], InvalidRecord]:
+    """Fill in missing title/summary fields, or reject a post whose text fields are not strings"""
+    for field in ("title", "summary"):
+        if post.get(field) is None:
+            post[field] = ""
+    for field in ("title", "summary", "style"):
+        value = post.get(field)
+        if value is not None and not isinstance(value, str):
+            return InvalidRecord(line_number, f"field {field!r} must be a string, got {type(value).__name__}")
+    return post
+
+def post_id(post: Dict[str, str], style: str) -> str:
+    """
+    Get a stable, filesystem-safe identifier for a post
+
+    Uses the post's "id" field when present, otherwise a hash of its title,
+    summary and style.
+
+    Args:
+        post (dict): Post record
+        style (str): Style the post is rendered in
+
+    Returns:
+        str: Post identifier
+    """
+    if post.get("id"):
+        return re.sub(r"[^A-Za-z0-9._-]", "_", str(post["id"]))
+    content = "\x1f".join([post.get("title", ""), post.get("summary", ""), style])
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+def load_completed(manifest_path: Path) -> Set[str]:
+    """
+    Collect ids of posts already rendered successfully
+
+    Args:
+        manifest_path (Path): Manifest written by an earlier run
+
+    Returns:
+        set: Ids recorded with status "ok"
+    """
+    completed = set()
+    if not manifest_path.exists():
+        return completed
+
+    with open(manifest_path, encoding="utf-8") as manifest:
+        for line in manifest:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line from a crash
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+class StageStats:
+    """Counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float, errors: int = 0):
+        with self._lock:
+            self.items += items
+            self.errors += errors
+            self.busy += seconds
+
+class Pipeline:
+    """
+    Streams posts through analysis, generation, overlay and encoding
+
+    Each stage runs on its own thread(s) and hands work to the next stage
+    through a bounded queue, so only a fixed number of posts and images are
+    held in memory no matter how large the input is. Finished posts are
+    appended to a manifest, which is also used to skip them on a rerun.
+    """
+
+    def __init__(
+        self,
+        crafter,
+        output_dir: Path,
+        style: str = "modern",
+        resolution=(1024, 1024),
+        queue_size: int = 8,
+        batch_size: int = 16,
+        generate_workers: int = 4,
+        image_format: str = "png",
+        quality: Optional[int] = None,
+        target_bytes: Optional[int] = None,
+        progress_interval: float = 5.0,
+        render_pool=None,
+        dedupe: bool = False,
+        log: IO[str] = sys.stderr
+    ):
+        """
+        Args:
+            crafter (ThumbCrafter): Configured thumbnail creator
+            output_dir (Path): Directory for thumbnails and the manifest
+            style (str): Default style for posts without a "style" field
+            resolution (tuple): Output image resolution
+            queue_size (int): Capacity of each queue between stages
+            batch_size (int): Maximum number of posts analyzed together
+            generate_workers (int): Number of concurrent image generation threads
+            image_format (str): Output format: png, webp, jpeg or avif
+            quality (int, optional): Fixed encoder quality for lossy formats
+            target_bytes (int, optional): Byte budget per thumbnail for lossy formats
+            progress_interval (float): Seconds between progress reports, 0 to disable
+            render_pool (RenderPool, optional): Process pool that runs overlay and encoding
+                off the main process. Uses one overlay thread per pool process
+            dedupe (bool): Also skip posts repeated within this run. Remembers every post id
+                of the input, so memory grows with the input size
+            log (IO[str]): Stream for progress reports
+        """
+        self.crafter = crafter
+        self.output_dir = Path(output_dir)
+        self.style = style
+        self.resolution = tuple(resolution)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.generate_workers = generate_workers
+        self.image_format = image_format.lower()
+        self.quality = quality
+        self.target_bytes = target_bytes
+        self.progress_interval = progress_interval
+        self.render_pool = render_pool
+        self.overlay_workers = render_pool.processes if render_pool is not None else 1
+        self.dedupe = dedupe
+        self.log = log
+
+        self.stats = {name: StageStats(name) for name in ("analyze", "generate", "overlay", "encode")}
+        self.skipped = 0
+
+    def run(self, posts: Iterator[Dict[str, str]]) -> Dict[str, int]:
+        """
+        Render every post not already recorded as done in the manifest
+
+        Records that are not posts (such as the InvalidRecord errors of
+        read_posts) are reported as failed posts in the manifest.
+
+        Args:
+            posts (Iterator[dict]): Post records
+
+        Returns:
+            dict: Number of rendered, failed and skipped posts
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.output_dir / MANIFEST_NAME
+        completed = load_completed(manifest_path)
+
+        to_analyze = queue.Queue(self.queue_size)
+        to_generate = queue.Queue(self.queue_size)
+        to_overlay = queue.Queue(self.queue_size)
+        to_encode = queue.Queue(self.queue_size)
+
+        threads = [
+            self._spawn(self._analyze_stage, to_analyze, to_generate, self.generate_workers),
+        ]
+        generate_exits = _ExitCounter(self.generate_workers, to_overlay, self.overlay_workers)
+        threads += [
+            self._spawn(self._generate_stage, to_generate, to_overlay, generate_exits)
+            for _ in range(self.generate_workers)
+        ]
+        overlay_exits = _ExitCounter(self.overlay_workers, to_encode, 1)
+        threads += [
+            self._spawn(self._overlay_stage, to_overlay, to_encode, overlay_exits)
+            for _ in range(self.overlay_workers)
+        ]
+
+        start = time.perf_counter()
+        stop_progress = threading.Event()
+        if self.progress_interval > 0:
+            reporter = threading.Thread(target=self._report_progress, args=(start, stop_progress), daemon=True)
+            reporter.start()
+
+        with open(manifest_path, "a", encoding="utf-8") as manifest:
+            encoder = self._spawn(self._encode_stage, to_encode, manifest)
+
+            try:
+                for index, post in enumerate(posts, start=1):
+                    if not isinstance(post, dict):
+                        # Passed through the stages untouched and recorded as a failed post
+                        line_number = getattr(post, "line_number", index)
+                        to_analyze.put({"id": f"line-{line_number}", "post": {}, "style": self.style, "error": f"read: {post}"})
+                        continue
+                    style = post.get("style") or self.style
+                    item = {"id": post_id(post, style), "post": post, "style": style}
+                    if item["id"] in completed:
+                        self.skipped += 1
+                        continue
+                    if self.dedupe:
+                        completed.add(item["id"])
+                    to_analyze.put(item)
+            finally:
+                # Let the stages drain and finish before the manifest closes, even if reading the input failed
+                to_analyze.put(_DONE)
+                for thread in threads:
+                    thread.join()
+                encoder.join()
+                stop_progress.set()
+
+        self._print_progress(start, final=True)
+
+        encode = self.stats["encode"]
+        return {"rendered": encode.items - encode.errors, "failed": encode.errors, "skipped": self.skipped}
+
+    def _spawn(self, target: Callable, *args) -> threading.Thread:
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def _analyze_stage(self, inbox: queue.Queue, outbox: queue.Queue, downstream: int):
+        """Classify posts in batches of whatever is queued, up to batch_size"""
+        done = False
+        while not done:
+            batch = [inbox.get()]
+            if batch[0] is _DONE:
+                break
+            while len(batch) < self.batch_size:
+                try:
+                    item = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+
+            start = time.perf_counter()
+            pending = [item for item in batch if "error" not in item]
+            errors = len(batch) - len(pending)
+            try:
+                if pending:
+                    themes = self.crafter.analyze_many(
+                        [(item["post"].get("title", ""), item["post"].get("summary", "")) for item in pending],
+                        batch_size=self.batch_size
+                    )
+                    for item, post_themes in zip(pending, themes):
+                        item["themes"] = post_themes
+            except Exception as error:
+                for item in pending:
+                    item["error"] = f"analyze: {error!r}"
+                errors = len(batch)
+            self.stats["analyze"].record(len(batch), time.perf_counter() - start, errors)
+
+            for item in batch:
+                outbox.put(item)
+
+        for _ in range(downstream):
+            outbox.put(_DONE)
+
+    def _generate_stage(self, inbox: queue.Queue, outbox: queue.Queue, exits: "_ExitCounter"):
+        """Plan each render and fetch or generate its base image"""
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                exits.exit()
+                return
+            self._run(item, "generate", self._generate, outbox)
+
+    def _generate(self, item):
+        title = item["post"].get("title", "")
+        # Sizes beyond what the engine generates are reframed from a base image at its limit
+        plan, item["plan"] = self.crafter.plan_render(title, item["themes"], item["style"], self.resolution)
+        item["thumbnail"] = self.crafter.cached_thumbnail(item["plan"])
+        if item["thumbnail"] is None:
+            item["base_image"] = self.crafter.generate_base(plan, self.resolution)
+
+    def _overlay_stage(self, inbox: queue.Queue, outbox: queue.Queue, exits: "_ExitCounter"):
+        """Add the text overlay to each base image"""
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                exits.exit()
+                return
+            self._run(item, "overlay", self._overlay, outbox)
+
+    def _overlay(self, item):
+        if item["thumbnail"] is not None:
+            return
+
+        plan = item["plan"]
+        base_image = item.pop("base_image")
+        if self.render_pool is None:
+            item["thumbnail"] = self.crafter.apply_overlay(plan, base_image)
+            return
+
+        # Overlay and encode in a worker process; the encoded bytes go straight to disk
+        from .render_pool import RenderJob
+
+        job = RenderJob(plan.title, plan.color_scheme, plan.style, self.image_format, self.quality, self.target_bytes)
+        with self.crafter.instrumentation.stage("render_pool"):
+            item["encoded"] = self.render_pool.render(base_image, [job])[0]
+        if self.image_format == "png" and self.crafter.cache is not None:
+            self.crafter.cache.set(plan.thumbnail_key, item["encoded"])
+
+    def _encode_stage(self, inbox: queue.Queue, manifest: IO[str]):
+        """Write thumbnails atomically and record every post in the manifest"""
+        from .encoder import encode_image
+
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+
+            start = time.perf_counter()
+            record = {
+                "id": item["id"],
+                "title": item["post"].get("title", ""),
+                "style": item["style"]
+            }
+            if "error" in item:
+                record.update(status="error", error=item["error"])
+            else:
+                try:
+                    path = self.output_dir / f"{item['id']}.{self.image_format}"
+                    tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+                    encoded = item.get("encoded")
+                    if encoded is None:
+                        with self.crafter.instrumentation.stage("encode"):
+                            encoded = encode_image(item["thumbnail"], self.image_format, self.quality, self.target_bytes)
+                    self.crafter.instrumentation.record_bytes("encode", len(encoded))
+                    tmp_path.write_bytes(encoded)
+                    os.replace(tmp_path, path)
+                    record.update(status="ok", path=path.name, bytes=path.stat().st_size)
+                except Exception as error:
+                    record.update(status="error", error=f"encode: {error!r}")
+
+            manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            self.stats["encode"].record(1, time.perf_counter() - start, int(record["status"] != "ok"))
+
+    def _run(self, item: dict, stage: str, func: Callable, outbox: queue.Queue):
+        """Run one stage on an item, turning failures into a per-post error"""
+        start = time.perf_counter()
+        errors = 0
+        if "error" not in item:
+            try:
+                func(item)
+            except Exception as error:
+                item["error"] = f"{stage}: {error!r}"
+                errors = 1
+        self.stats[stage].record(1, time.perf_counter() - start, errors)
+        outbox.put(item)
+
+    def _report_progress(self, start: float, stop: threading.Event):
+        while not stop.wait(self.progress_interval):
+            self._print_progress(start)
+
+    def _print_progress(self, start: float, final: bool = False):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        parts = []
+        for stats in self.stats.values():
+            part = f"{stats.name} {stats.items} ({stats.items / elapsed:.1f}/s"
+            if stats.busy:
+                part += f", {stats.items / stats.busy:.1f}/s busy"
+            part += ")"
+            if stats.errors:
+                part += f" {stats.errors} failed"
+            parts.append(part)
+        prefix = "done" if final else "progress"
+        print(f"[{prefix} {elapsed:.0f}s] " + " | ".join(parts) + f" | skipped {self.skipped}", file=self.log, flush=True)
+
+class _ExitCounter:
+    """Forwards end-of-input downstream once every worker of a stage has exited"""
+
+    def __init__(self, workers: int, outbox: queue.Queue, downstream: int):
+        self.remaining = workers
+        self.outbox = outbox
+        self.downstream = downstream
+        self._lock = threading.Lock()
+
+    def exit(self):
+        with self._lock:
+            self.remaining -= 1
+            last = self.remaining == 0
+        if last:
+            for _ in range(self.downstream):
+                self.outbox.put(_DONE)
+
+def parse_resolution(value: str):
+    """Parse a WIDTHxHEIGHT argument"""
+    try:
+        width, height = [int(part) for part in value.lower().split("x")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid resolution {value!r}, expected WIDTHxHEIGHT")
+    return (width, height)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="thumbcrafter",
+        description="Render blog thumbnails in bulk from a JSONL or CSV feed of posts"
+    )
+    parser.add_argument("input", help="JSONL or CSV file with title/summary (and optional id/style) fields, or - for stdin")
+    parser.add_argument("-o", "--output-dir", default="thumbnails", help="Directory for thumbnails and manifest.jsonl")
+    parser.add_argument("--input-format", choices=["jsonl", "csv"], help="Input format (default: from file extension, jsonl for stdin)")
+    parser.add_argument("--style", default="modern", help="Style for posts without a style field")
+    parser.add_argument("--resolution", type=parse_resolution, default=(1024, 1024), help="Output resolution as WIDTHxHEIGHT")
+    parser.add_argument("--image-format", default="png", choices=["png", "webp", "jpeg", "jpg", "avif"], help="Image file format of the thumbnails")
+    parser.add_argument("--quality", type=int, help="Encoder quality for webp/jpeg/avif")
+    parser.add_argument("--target-bytes", type=int, help="Byte budget per thumbnail for webp/jpeg/avif; quality is searched to fit")
+    parser.add_argument("--analyzer-backend", default="torch", choices=["torch", "torch-int8", "onnx", "onnx-int8"], help="Inference backend of the theme classifier")
+    parser.add_argument("--analyzer-threads", type=int, help="Inference threads of the theme classifier")
+    parser.add_argument("--theme-index", help="Reuse themes of near-duplicate posts from the index in this directory")
+    parser.add_argument("--theme-index-similarity", type=float, default=0.95, help="Minimum similarity (0-1) for reusing indexed themes")
+    parser.add_argument("--cache-dir", help="Enable the stage result cache in this directory")
+    parser.add_argument("--queue-size", type=int, default=8, help="Capacity of the queues between stages")
+    parser.add_argument("--batch-size", type=int, default=16, help="Maximum number of posts analyzed together")
+    parser.add_argument("--generate-workers", type=int, default=4, help="Concurrent image generation requests")
+    parser.add_argument("--render-processes", type=int, default=0, help="Run overlay and encoding on this many processes (0 keeps them in-process)")
+    parser.add_argument("--dedupe", action="store_true", help="Also skip posts repeated within the input (memory grows with the input size)")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress reports (0 disables)")
+    parser.add_argument("--metrics", help="Write per-stage timings, counters and byte sizes to this file (.prom for Prometheus text, otherwise JSON)")
+    parser.add_argument("--profile-stage", action="append", default=[], help="Run this stage under cProfile and append its report to stderr (repeatable)")
+    parser.add_argument("--trace-memory-stage", action="append", default=[], help="Record peak traced allocations of this stage with tracemalloc (repeatable)")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the `thumbcrafter` console script"""
+    args = build_parser().parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    from . import ThumbCrafter
+    from .cache import ResultCache
+    from .content_analyzer import ContentAnalyzer
+    from .instrumentation import Instrumentation
+
+    cache = ResultCache(args.cache_dir) if args.cache_dir else None
+    instrumentation = None
+    if args.metrics or args.profile_stage or args.trace_memory_stage:
+        instrumentation = Instrumentation(
+            profile_stages=args.profile_stage,
+            trace_memory_stages=args.trace_memory_stage
+        )
+    theme_index = None
+    if args.theme_index:
+        from .theme_index import ThemeIndex
+
+        theme_index = ThemeIndex(args.theme_index, args.theme_index_similarity)
+    analyzer = ContentAnalyzer(backend=args.analyzer_backend, num_threads=args.analyzer_threads, theme_index=theme_index)
+    crafter = ThumbCrafter(cache=cache, content_analyzer=analyzer, instrumentation=instrumentation)
+
+    render_pool = None
+    if args.render_processes > 0:
+        from .render_pool import RenderPool
+
+        render_pool = RenderPool(args.render_processes, crafter.text_overlay.font_paths, crafter.text_overlay.max_lines)
+    pipeline = Pipeline(
+        crafter,
+        Path(args.output_dir),
+        style=args.style,
+        resolution=args.resolution,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        generate_workers=args.generate_workers,
+        image_format=args.image_format,
+        quality=args.quality,
+        target_bytes=args.target_bytes,
+        progress_interval=args.progress_interval,
+        render_pool=render_pool,
+        dedupe=args.dedupe
+    )
+
+    try:
+        if args.input == "-":
+            summary = pipeline.run(read_posts(sys.stdin, args.input_format or "jsonl"))
+        else:
+            input_format = args.input_format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+            with open(args.input, newline="" if input_format == "csv" else None, encoding="utf-8") as stream:
+                summary = pipeline.run(read_posts(stream, input_format))
+    finally:
+        if render_pool is not None:
+            render_pool.close()
+
+    if instrumentation is not None:
+        if args.metrics:
+            metrics = instrumentation.to_prometheus() if args.metrics.endswith(".prom") else instrumentation.to_json()
+            Path(args.metrics).write_text(metrics, encoding="utf-8")
+        for stage in args.profile_stage:
+            print(f"cProfile report for stage {stage!r}:", file=sys.stderr)
+            print(instrumentation.profile_report(stage), file=sys.stderr)
+
+    if theme_index is not None:
+        summary["theme_index"] = theme_index.stats()
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
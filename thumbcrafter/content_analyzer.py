@@ -2,25 +2,123 @@
 Content analysis module for extracting themes and generating image prompts
 """
 
+import os
 import re
-from typing import List, Dict, Tuple
-from transformers import pipeline
-from colorthief import ColorThief
-import numpy as np
+import threading
+from typing import List, Dict, Tuple, Iterable, Optional
 from .utils import StylePresets, ColorSchemes
+from .analyzer_server import SOCKET_ENV_VAR
+from .inference import check_backend
+
+# Zero-shot model used by the transformers pipeline when none is given
+DEFAULT_NLI_MODEL = "facebook/bart-large-mnli"
 
 class ContentAnalyzer:
     """Analyzes blog content to extract themes and generate image prompts"""
     
-    def __init__(self):
-        """Initialize the content analyzer with necessary models"""
-        self.theme_extractor = pipeline("zero-shot-classification")
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        theme_mode: str = "nli",
+        backend: str = "torch",
+        num_threads: Optional[int] = None,
+        server: Optional[str] = None,
+        theme_index=None
+    ):
+        """
+        Initialize the content analyzer with necessary models
+        
+        Args:
+            model (str, optional): Model name or path for the selected theme mode. Uses the mode's default if not provided
+            theme_mode (str): Theme engine to use, "nli" for zero-shot NLI classification or
+                "embedding" for cosine similarity against precomputed label embeddings
+            backend (str): Inference backend: "torch" (fp32), "torch-int8" (dynamically quantized),
+                "onnx" or "onnx-int8" (ONNX Runtime, requires optimum[onnxruntime])
+            num_threads (int, optional): Inference threads. Defaults to the backend's choice
+            server (str, optional): Unix socket of a shared analyzer server (`thumbcrafter-analyzer`)
+                to classify on instead of loading the model in this process. Defaults to the
+                THUMBCRAFTER_ANALYZER_SOCKET env var; pass "" to always classify locally
+            theme_index (ThemeIndex, optional): Near-duplicate index consulted before running the
+                model; posts close enough to an indexed one reuse its themes. Use one index per
+                model configuration
+        """
+        if theme_mode not in ("nli", "embedding"):
+            raise ValueError("Invalid theme_mode. Use 'nli' or 'embedding'")
+        check_backend(backend)
+            
+        self.theme_mode = theme_mode
+        self.model = model
+        self.backend = backend
+        self.num_threads = num_threads
+        self.server = os.getenv(SOCKET_ENV_VAR) if server is None else server
+        self.theme_index = theme_index
         self.candidate_themes = [
             "technology", "business", "lifestyle", "health", "education",
             "entertainment", "sports", "science", "art", "food",
             "travel", "fashion", "finance", "environment", "politics"
         ]
         
+        # The model is loaded on first use (or by warmup) so constructing an
+        # analyzer stays cheap
+        self.score_threshold = None
+        self._theme_extractor = None
+        self._client = None
+        self._load_lock = threading.Lock()
+        
+    @property
+    def theme_extractor(self):
+        """Theme classifier for the selected mode, loaded on first access"""
+        if self._theme_extractor is None:
+            with self._load_lock:
+                if self._theme_extractor is None:
+                    self._theme_extractor = self._load_theme_extractor()
+        return self._theme_extractor
+    
+    def _load_theme_extractor(self):
+        """Import and load the theme classifier for the selected mode"""
+        if self.theme_mode == "nli":
+            from transformers import pipeline
+            
+            if self.backend == "torch" and not self.num_threads:
+                theme_extractor = pipeline("zero-shot-classification", model=self.model)
+            else:
+                from .inference import load_sequence_classifier
+                
+                model, tokenizer = load_sequence_classifier(self.model or DEFAULT_NLI_MODEL, self.backend, self.num_threads)
+                theme_extractor = pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+            default_threshold = 0.3
+        else:
+            from .theme_engine import EmbeddingThemeEngine
+            
+            theme_extractor = EmbeddingThemeEngine(model=self.model, backend=self.backend, num_threads=self.num_threads)
+            default_threshold = theme_extractor.threshold
+            
+            # Encode the fixed label hypotheses once, up front
+            theme_extractor.encode_labels(self.candidate_themes)
+            
+        if self.score_threshold is None:
+            self.score_threshold = default_threshold
+        return theme_extractor
+    
+    @property
+    def client(self):
+        """Client of the analyzer server, created on first access"""
+        if self._client is None:
+            with self._load_lock:
+                if self._client is None:
+                    from .analyzer_server import AnalyzerClient
+                    
+                    self._client = AnalyzerClient(self.server)
+        return self._client
+    
+    def warmup(self):
+        """Load the theme model and run one classification so the first real request is fast"""
+        if self.server:
+            self.client.ping()
+            return
+        # Bypasses the theme index so the placeholder post is not stored
+        self.theme_extractor("warmup", candidate_labels=self.candidate_themes, multi_label=True)
+        
     def analyze(self, title: str, summary: str) -> List[str]:
         """
         Analyze blog content to extract main themes
@@ -32,6 +130,16 @@ class ContentAnalyzer:
         Returns:
             List[str]: List of identified themes
         """
+        if self.theme_index is not None:
+            match = self.theme_index.lookup(title, summary)
+            if match is not None:
+                return match.themes
+                
+        if self.server:
+            themes = self.client.analyze_many([(title, summary)])[0]
+            self._index_themes([(title, summary)], [themes])
+            return themes
+            
         # Combine title and summary for analysis
         content = f"{title} {summary}"
         
@@ -42,20 +150,95 @@ class ContentAnalyzer:
             multi_label=True
         )
         
-        # Get themes with confidence > 0.3
-        themes = [
-            theme for theme, score in zip(result['labels'], result['scores'])
-            if score > 0.3
+        scored = self._score_themes(result)
+        self._index_themes([(title, summary)], [[theme for theme, _ in scored]], [[score for _, score in scored]])
+        return [theme for theme, _ in scored]
+    
+    def analyze_many(self, posts: Iterable[Tuple[str, str]], batch_size: int = 16) -> List[List[str]]:
+        """
+        Analyze many blog posts at once
+        
+        In "nli" mode every (post, candidate theme) hypothesis pair is packed
+        into padded batches of `batch_size` pairs, so the model runs far
+        fewer forward passes than calling `analyze` once per post. In
+        "embedding" mode `batch_size` posts are encoded per forward pass.
+        With a theme index, only posts without a near duplicate in it are
+        classified.
+        
+        Args:
+            posts (Iterable[Tuple[str, str]]): (title, summary) pairs
+            batch_size (int): Number of hypothesis pairs (or posts in "embedding" mode) per forward pass
+            
+        Returns:
+            List[List[str]]: Themes for each post, in input order
+        """
+        posts = list(posts)
+        themes: List[Optional[List[str]]] = [None] * len(posts)
+        if self.theme_index is not None:
+            for i, (title, summary) in enumerate(posts):
+                match = self.theme_index.lookup(title, summary)
+                if match is not None:
+                    themes[i] = match.themes
+        pending = [i for i, post_themes in enumerate(themes) if post_themes is None]
+        if not pending:
+            return themes
+        pending_posts = [posts[i] for i in pending]
+            
+        if self.server:
+            # The server batches requests from all its clients with its own batch size
+            analyzed = self.client.analyze_many(pending_posts)
+            scores = None
+        else:
+            results = self.theme_extractor(
+                [f"{title} {summary}" for title, summary in pending_posts],
+                candidate_labels=self.candidate_themes,
+                multi_label=True,
+                batch_size=batch_size
+            )
+            if isinstance(results, dict):
+                results = [results]
+            scored = [self._score_themes(result) for result in results]
+            analyzed = [[theme for theme, _ in post_scored] for post_scored in scored]
+            scores = [[score for _, score in post_scored] for post_scored in scored]
+            
+        self._index_themes(pending_posts, analyzed, scores)
+        for i, post_themes in zip(pending, analyzed):
+            themes[i] = post_themes
+        return themes
+    
+    def _score_themes(self, result: Dict) -> List[Tuple[str, float]]:
+        """Pick the top 3 themes above the engine's confidence threshold, with their scores, from a classifier result"""
+        scored = [
+            (theme, float(score)) for theme, score in zip(result['labels'], result['scores'])
+            if score > self.score_threshold
         ]
         
-        return themes[:3]  # Return top 3 themes
+        return scored[:3]  # Return top 3 themes
     
-    def extract_color_scheme(self, themes: List[str]) -> Dict[str, Tuple[int, int, int]]:
+    def _index_themes(
+        self,
+        posts: List[Tuple[str, str]],
+        themes: List[List[str]],
+        scores: Optional[List[List[float]]] = None
+    ):
+        """Store freshly classified posts in the theme index, if there is one"""
+        if self.theme_index is None:
+            return
+        for i, (title, summary) in enumerate(posts):
+            self.theme_index.add(title, summary, themes[i], None if scores is None else scores[i])
+    
+    def extract_color_scheme(self, themes: List[str], image=None) -> Dict[str, Tuple[int, int, int]]:
         """
         Generate a color scheme based on themes
         
+        With an image, the secondary color is taken from the image's own
+        palette so accents match it, and the primary (text) color falls back
+        to black or white when the theme color has too little contrast with
+        the image's dominant color.
+        
         Args:
             themes (List[str]): List of identified themes
+            image (PIL.Image, optional): Generated image the scheme is used on
             
         Returns:
             Dict[str, Tuple[int, int, int]]: Color scheme with primary and secondary colors
@@ -83,9 +266,29 @@ class ContentAnalyzer:
         primary_theme = themes[0] if themes else "technology"
         colors = theme_colors.get(primary_theme, theme_colors["technology"])
         
+        if image is None:
+            return {
+                "primary": colors[0],
+                "secondary": colors[1]
+            }
+            
+        from .palette import MIN_CONTRAST, contrast_ratio, extract_palette
+        from .utils import get_optimal_text_color
+        
+        palette = extract_palette(image)
+        dominant = palette[0].color
+        primary = colors[0]
+        if contrast_ratio(primary, dominant) < MIN_CONTRAST:
+            primary = get_optimal_text_color(dominant)
+            
+        # The most saturated color covering a noticeable part of the image
+        def saturation(color):
+            return max(color) - min(color)
+        accents = [entry.color for entry in palette if entry.weight >= 0.05] or [dominant]
+        
         return {
-            "primary": colors[0],
-            "secondary": colors[1]
+            "primary": primary,
+            "secondary": max(accents, key=saturation)
         }
     
     def generate_prompt(self, title: str, themes: List[str], style: str) -> str:
@@ -0,0 +1,109 @@
+"""
+Output encoding for thumbnails: WebP, optimized JPEG, AVIF and PNG
+"""
+
+import io
+from typing import Optional
+from PIL import Image
+
+# Accepted format names and the Pillow plugin that writes them
+FORMATS = {
+    "webp": "WEBP",
+    "jpeg": "JPEG",
+    "jpg": "JPEG",
+    "avif": "AVIF",
+    "png": "PNG"
+}
+
+# Quality used when neither a quality nor a byte budget is given
+DEFAULT_QUALITY = {
+    "WEBP": 80,
+    "JPEG": 85,
+    "AVIF": 60
+}
+
+def avif_available() -> bool:
+    """
+    Check whether AVIF encoding is available
+
+    Pillow 11.2+ can be built with AVIF support; older versions need the
+    pillow-avif-plugin package, which registers itself on import.
+
+    Returns:
+        bool: True if images can be saved as AVIF
+    """
+    if "AVIF" in Image.SAVE:
+        return True
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        return False
+    return "AVIF" in Image.SAVE
+
+def encode_image(
+    image: Image.Image,
+    format: str = "webp",
+    quality: Optional[int] = None,
+    target_bytes: Optional[int] = None,
+    min_quality: int = 10,
+    max_quality: int = 95
+) -> memoryview:
+    """
+    Encode an image in memory
+
+    With a byte budget, the quality is binary-searched for the highest value
+    whose output still fits; if even min_quality does not fit, the
+    min_quality encoding is returned. PNG is lossless, so it ignores quality
+    and budget.
+
+    Args:
+        image (PIL.Image): Image to encode
+        format (str): "webp", "jpeg"/"jpg", "avif" or "png"
+        quality (int, optional): Fixed quality (1-100), ignored when target_bytes is given
+        target_bytes (int, optional): Maximum size of the encoded output
+        min_quality (int): Lowest quality tried when searching for the budget
+        max_quality (int): Highest quality tried when searching for the budget
+
+    Returns:
+        memoryview: Encoded image, viewed without copying the encoder's buffer
+
+    Raises:
+        ValueError: If the format is unknown or AVIF support is not installed
+    """
+    pillow_format = FORMATS.get(format.lower())
+    if pillow_format is None:
+        raise ValueError(f"Unsupported format {format!r}. Use one of: {', '.join(sorted(FORMATS))}")
+    if pillow_format == "AVIF" and not avif_available():
+        raise ValueError("AVIF encoding requires Pillow built with AVIF support or pillow-avif-plugin")
+
+    if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    if pillow_format == "PNG" or target_bytes is None:
+        return _encode(image, pillow_format, quality or DEFAULT_QUALITY.get(pillow_format))
+
+    best = None
+    low, high = min_quality, max_quality
+    while low <= high:
+        candidate_quality = (low + high) // 2
+        encoded = _encode(image, pillow_format, candidate_quality)
+        if encoded.nbytes <= target_bytes:
+            best = encoded
+            low = candidate_quality + 1
+        else:
+            high = candidate_quality - 1
+
+    return best if best is not None else _encode(image, pillow_format, min_quality)
+
+def _encode(image: Image.Image, pillow_format: str, quality: Optional[int]) -> memoryview:
+    """Encode with per-format speed/size settings"""
+    buffer = io.BytesIO()
+    if pillow_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    elif pillow_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    elif pillow_format == "AVIF":
+        image.save(buffer, format="AVIF", quality=quality, speed=6)
+    else:
+        image.save(buffer, format="PNG", optimize=False, compress_level=6)
+    return buffer.getbuffer()
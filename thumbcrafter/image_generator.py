@@ -2,108 +2,752 @@
 Image generation module using Stable Diffusion API
 """
 
+import asyncio
+import hashlib
+import itertools
 import os
-from typing import Tuple, Optional
-import stability_sdk.interfaces.gooseai.generation.generation_pb2 as generation
-from stability_sdk import client
-import stability_sdk.utils as utils
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from PIL import Image
 import io
 
+# Names of gRPC status codes worth retrying; everything else is surfaced immediately
+TRANSIENT_STATUS_CODES = frozenset({
+    "UNAVAILABLE",
+    "DEADLINE_EXCEEDED",
+    "RESOURCE_EXHAUSTED",
+    "ABORTED",
+})
+
+def _generation():
+    """Import stability_sdk's generation protobufs on first use"""
+    import stability_sdk.interfaces.gooseai.generation.generation_pb2 as generation
+    return generation
+
+def _random_seed() -> int:
+    """Draw a random generation seed using stability_sdk's helper"""
+    import stability_sdk.utils as utils
+    return utils.generate_random_seed()
+
+def prompt_seed(prompt: str) -> int:
+    """
+    Derive a stable generation seed from a prompt
+
+    Args:
+        prompt (str): Image generation prompt
+
+    Returns:
+        int: Seed in 1..2**32-1 (0 asks the API for a random seed)
+    """
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % 0xFFFFFFFF + 1
+
+class LazyImage:
+    """
+    Encoded image returned by the API, decoded only when its pixels are needed
+
+    Keeps the raw bytes of the artifact as a memoryview. Size, mode and
+    format come from the header; `preview` decodes at reduced resolution
+    (JPEG draft mode and Pillow's reduce), which is enough for ranking many
+    samples; `open` gives a full-resolution image. The bytes can be saved,
+    uploaded or sent back as an init image without re-encoding.
+    """
+
+    __slots__ = ("_buffer", "data", "_header")
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        """
+        Args:
+            data (bytes-like): Encoded image, e.g. PNG or JPEG
+        """
+        self._buffer = data
+        self.data = memoryview(data)
+        self._header = None
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the encoded image"""
+        return self.data.nbytes
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Image dimensions (width, height)"""
+        return self._read_header()[0]
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def mode(self) -> str:
+        """Pillow mode the image decodes to"""
+        return self._read_header()[1]
+
+    @property
+    def format(self) -> str:
+        """Pillow format name of the encoded bytes"""
+        return self._read_header()[2]
+
+    def encoded(self) -> bytes:
+        """Encoded bytes, without copying when they are backed by a bytes object"""
+        if isinstance(self._buffer, bytes):
+            return self._buffer
+        return self.data.tobytes()
+
+    def open(self) -> Image.Image:
+        """
+        Open the image at full resolution
+
+        Returns a new image each call; like Image.open, pixels are decoded on
+        first access.
+
+        Returns:
+            PIL.Image: Image backed by the encoded bytes
+        """
+        # BytesIO shares a bytes object instead of copying it
+        return Image.open(io.BytesIO(self.encoded()))
+
+    def load(self) -> Image.Image:
+        """Open and fully decode the image"""
+        image = self.open()
+        image.load()
+        return image
+
+    def preview(self, max_side: int = 256) -> Image.Image:
+        """
+        Decode a downscaled copy that fits max_side x max_side
+
+        JPEGs are decoded directly at a reduced scale (draft mode); other
+        formats are decoded once and shrunk with Pillow's fast integer
+        reduce before the final resample.
+
+        Args:
+            max_side (int): Largest width or height of the preview
+
+        Returns:
+            PIL.Image: Preview image
+        """
+        image = self.open()
+        # thumbnail() applies draft() and reduce() before resampling
+        image.thumbnail((max_side, max_side), Image.BILINEAR, reducing_gap=2.0)
+        return image
+
+    def save(self, fp):
+        """
+        Write the encoded bytes as they are, without re-encoding
+
+        Args:
+            fp (str, Path or file object): Destination
+        """
+        if hasattr(fp, "write"):
+            fp.write(self.data)
+            return
+        with open(fp, "wb") as file:
+            file.write(self.data)
+
+    def _read_header(self) -> Tuple[Tuple[int, int], str, str]:
+        if self._header is None:
+            with self.open() as image:
+                self._header = (image.size, image.mode, image.format)
+        return self._header
+
+    def __repr__(self) -> str:
+        return f"<LazyImage {self.format} {self.size[0]}x{self.size[1]} {self.nbytes} bytes>"
+
+class _Flight:
+    """A generation request in progress, shared by identical concurrent requests"""
+
+    __slots__ = ("future", "followers")
+
+    def __init__(self):
+        self.future = Future()
+        self.followers = 0
+
+class _CancelToken:
+    """Cancellation state of a deferred request, which can only be cancelled before it is sent"""
+
+    __slots__ = ("_lock", "_cancelled", "_sent")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._sent = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to timeout seconds, returning early (True) once cancelled"""
+        return self._cancelled.wait(timeout)
+
+    def cancel(self) -> bool:
+        """Cancel unless the request was already sent; returns whether it was cancelled"""
+        with self._lock:
+            if not self._sent:
+                self._cancelled.set()
+            return self._cancelled.is_set()
+
+    def send(self) -> bool:
+        """Mark the request as sent unless it was cancelled; returns whether it may be sent"""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._sent = True
+            return self._sent
+
+class ProgressiveRender:
+    """
+    A fast draft available right away and a final image delivered later
+
+    `final` is a Future resolving to the final image. Calling `cancel()`
+    before the final request is sent to the API stops it, so abandoned
+    edits are not charged for it.
+    """
+
+    def __init__(self, draft: Image.Image, final: Future, token: _CancelToken):
+        """
+        Args:
+            draft (PIL.Image): Draft image at the final resolution
+            final (Future): Future of the final image
+            token (_CancelToken): Cancellation state of the final request
+        """
+        self.draft = draft
+        self.final = final
+        self._token = token
+
+    def cancel(self) -> bool:
+        """
+        Stop the final render
+
+        Returns:
+            bool: True if the final request will not be sent, False if it already was
+                (the final image is then still delivered)
+        """
+        if not self._token.cancel():
+            return False
+        # A worker already waiting to send sees the token and fails the future with CancelledError
+        self.final.cancel()
+        return True
+
+    def cancelled(self) -> bool:
+        """Whether the final render was cancelled"""
+        return self._token.cancelled
+
+    def done(self) -> bool:
+        """Whether the final image is available (or failed or was cancelled)"""
+        return self.final.done()
+
+    def result(self, timeout: Optional[float] = None) -> Image.Image:
+        """
+        Wait for the final image
+
+        Args:
+            timeout (float, optional): Seconds to wait
+
+        Returns:
+            PIL.Image: Final image
+
+        Raises:
+            concurrent.futures.CancelledError: If the final render was cancelled
+        """
+        return self.final.result(timeout)
+
+def draft_resolution(resolution: Tuple[int, int], scale: float) -> Tuple[int, int]:
+    """
+    Resolution a draft of a render is generated at
+
+    Args:
+        resolution (tuple): Final resolution (width, height)
+        scale (float): Fraction of each side
+
+    Returns:
+        tuple: Scaled resolution, rounded down to multiples of 64 (at least 64)
+    """
+    return tuple(max(64, int(side * scale) // 64 * 64) for side in resolution)
+
 class ImageGenerator:
     """Handles image generation using Stable Diffusion API"""
-    
-    def __init__(self, api_key: Optional[str] = None):
+
+    # Largest width or height the engine accepts
+    max_resolution = 1024
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        host: Optional[str] = None,
+        pool_size: int = 4,
+        max_in_flight: int = 32,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        verbose: bool = False,
+        client_factory: Optional[Callable[[], Any]] = None,
+        deterministic: bool = True
+    ):
         """
         Initialize the image generator
-        
+
         Args:
             api_key (str, optional): Stability AI API key. If not provided, will look for STABILITY_API_KEY env var
+            host (str, optional): gRPC endpoint, e.g. a local stand-in server. Defaults to the Stability API
+            pool_size (int): Number of client connections requests are spread over
+            max_in_flight (int): Maximum number of generation requests running at the same time
+            max_retries (int): Retries for requests failing with a transient error
+            backoff_base (float): Base delay in seconds for exponential backoff between retries
+            backoff_max (float): Upper bound in seconds for a single backoff delay
+            verbose (bool): Enable the Stability client's request logging
+            client_factory (callable, optional): Zero-argument callable returning a client with a
+                StabilityInference-compatible `generate` method. Overrides api_key and host
+            deterministic (bool): Derive the seed of requests without an explicit seed from the
+                prompt, so the same prompt always produces the same image. If False, draw random seeds
         """
         self.api_key = api_key or os.getenv("STABILITY_API_KEY")
-        if not self.api_key:
+        if not self.api_key and client_factory is None:
             raise ValueError("Stability API key is required. Set STABILITY_API_KEY environment variable or pass api_key parameter.")
-            
-        self.stability_api = client.StabilityInference(
-            key=self.api_key,
-            verbose=True,
-            engine="stable-diffusion-xl-1024-v1-0"
-        )
-        
-    def generate(self, prompt: str, resolution: Tuple[int, int] = (1024, 1024)) -> Image.Image:
+
+        self.host = host
+        self.pool_size = max(1, pool_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.verbose = verbose
+        self.client_factory = client_factory or self._create_client
+        self.deterministic = deterministic
+        self.shared_requests = 0
+
+        self._clients: List[Any] = []
+        self._client_cycle = None
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._flights: Dict[tuple, _Flight] = {}
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def generate(
+        self,
+        prompt: str,
+        resolution: Tuple[int, int] = (1024, 1024),
+        seed: Optional[int] = None,
+        steps: int = 30,
+        lazy: bool = False
+    ) -> Union[Image.Image, LazyImage]:
         """
         Generate an image using Stable Diffusion
-        
+
+        Concurrent calls with the same prompt, seed, resolution and steps
+        share one API request; each caller decodes its own image.
+
         Args:
             prompt (str): Image generation prompt
             resolution (tuple): Output image resolution (width, height)
-            
+            seed (int, optional): Generation seed. Defaults to a seed derived from the prompt
+                (or a random one when the generator is not deterministic)
+            steps (int): Number of diffusion steps
+            lazy (bool): Return a LazyImage handle, which can be passed to generate_variations
+                without re-encoding and is decoded only if needed
+
+        Returns:
+            PIL.Image or LazyImage: Generated image
+        """
+        params = self._generate_params(prompt, resolution, seed, steps)
+        key = self._flight_key(params)
+        flight, leader = self._join_flight(key)
+        if leader:
+            try:
+                handle = self._first_handle(self._request_with_retries(params))
+            except BaseException as error:
+                self._finish_flight(key, flight, error=error)
+                raise
+            self._finish_flight(key, flight, handle=handle)
+        else:
+            handle = flight.future.result()
+        return handle if lazy else handle.open()
+
+    def generate_progressive(
+        self,
+        prompt: str,
+        resolution: Tuple[int, int] = (1024, 1024),
+        seed: Optional[int] = None,
+        steps: int = 30,
+        draft_steps: int = 8,
+        draft_scale: float = 0.5,
+        final_delay: float = 0.0,
+        callback: Optional[Callable[[Image.Image], None]] = None
+    ) -> ProgressiveRender:
+        """
+        Generate a fast draft now and the final image in the background
+
+        The draft uses few steps at a reduced resolution with the same seed,
+        so it previews the composition of the final image; it is upscaled to
+        the final resolution. The final request is sent from a worker thread
+        after `final_delay` seconds, which gives editors a window to cancel
+        it while the user is still typing. Final requests are not shared
+        with identical concurrent requests, so cancelling one never fails
+        another caller.
+
+        Args:
+            prompt (str): Image generation prompt
+            resolution (tuple): Final image resolution (width, height)
+            seed (int, optional): Generation seed shared by the draft and the final image
+            steps (int): Diffusion steps of the final image
+            draft_steps (int): Diffusion steps of the draft
+            draft_scale (float): Fraction of each side the draft is generated at
+            final_delay (float): Seconds to wait before sending the final request
+            callback (callable, optional): Called with the final image once it is available
+
+        Returns:
+            ProgressiveRender: Draft image and the pending final image
+        """
+        params = self._generate_params(prompt, resolution, seed, steps)
+        draft = self.generate(prompt, draft_resolution(resolution, draft_scale), params["seed"], draft_steps)
+        if draft.size != tuple(resolution):
+            draft = draft.resize(tuple(resolution), Image.BILINEAR)
+
+        token = _CancelToken()
+        final = Future()
+        if callback is not None:
+            def deliver(future):
+                if not future.cancelled() and future.exception() is None:
+                    callback(future.result())
+            final.add_done_callback(deliver)
+        self._get_executor().submit(self._generate_final, params, final, token, final_delay)
+        return ProgressiveRender(draft, final, token)
+
+    def generate_variations(
+        self,
+        image: Union[Image.Image, LazyImage],
+        num_variations: int = 3,
+        seed: Optional[int] = None,
+        lazy: bool = False
+    ) -> list:
+        """
+        Generate variations of an existing image
+
+        Args:
+            image (PIL.Image or LazyImage): Base image to generate variations from. A PNG or
+                JPEG LazyImage is uploaded as is instead of being re-encoded
+            num_variations (int): Number of variations to generate
+            seed (int, optional): Generation seed. Defaults to a seed derived from the image
+                (or a random one when the generator is not deterministic)
+            lazy (bool): Return LazyImage handles, so samples are decoded only if needed
+
         Returns:
-            PIL.Image: Generated image
+            list: List of generated variation images
         """
+        images = self._request_with_retries(self._variation_params(image, num_variations, seed))
+        return images if lazy else [handle.open() for handle in images]
+
+    async def agenerate(
+        self,
+        prompt: str,
+        resolution: Tuple[int, int] = (1024, 1024),
+        seed: Optional[int] = None,
+        steps: int = 30,
+        lazy: bool = False
+    ) -> Union[Image.Image, LazyImage]:
+        """
+        Asynchronously generate an image using Stable Diffusion
+
+        Waits without blocking the event loop while `max_in_flight`
+        requests are already running. Identical concurrent requests, sync
+        or async, share one API request as in `generate`.
+
+        Args:
+            prompt (str): Image generation prompt
+            resolution (tuple): Output image resolution (width, height)
+            seed (int, optional): Generation seed. Defaults to a seed derived from the prompt
+                (or a random one when the generator is not deterministic)
+            steps (int): Number of diffusion steps
+            lazy (bool): Return a LazyImage handle instead of decoding the image, as in `generate`
+
+        Returns:
+            PIL.Image or LazyImage: Generated image
+        """
+        params = self._generate_params(prompt, resolution, seed, steps)
+        key = self._flight_key(params)
+        flight, leader = self._join_flight(key)
+        if leader:
+            # Followers depend on the request, so cancelling the leader only cancels its own wait
+            request = asyncio.ensure_future(self._alead_flight(key, flight, params))
+            request.add_done_callback(lambda task: task.cancelled() or task.exception())  # Retrieved even if abandoned
+            handle = await asyncio.shield(request)
+        else:
+            handle = await asyncio.wrap_future(flight.future)
+        return handle if lazy else handle.open()
+
+    async def agenerate_variations(
+        self,
+        image: Union[Image.Image, LazyImage],
+        num_variations: int = 3,
+        seed: Optional[int] = None,
+        lazy: bool = False
+    ) -> list:
+        """
+        Asynchronously generate variations of an existing image
+
+        Args:
+            image (PIL.Image or LazyImage): Base image to generate variations from. A PNG or
+                JPEG LazyImage is uploaded as is instead of being re-encoded
+            num_variations (int): Number of variations to generate
+            seed (int, optional): Generation seed. Defaults to a seed derived from the image
+                (or a random one when the generator is not deterministic)
+            lazy (bool): Return LazyImage handles, so samples are decoded only if needed
+
+        Returns:
+            list: List of generated variation images
+        """
+        loop = asyncio.get_running_loop()
+        params = await loop.run_in_executor(
+            self._get_executor(), self._variation_params, image, num_variations, seed
+        )
+        images = await self._arequest_with_retries(params)
+        return images if lazy else [handle.open() for handle in images]
+
+    def warmup(self):
+        """Open every pooled client connection ahead of the first request"""
+        with self._lock:
+            while len(self._clients) < self.pool_size:
+                self._clients.append(self.client_factory())
+
+    def close(self):
+        """Release the worker threads used by the async API"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _create_client(self):
+        """Create a Stability API client connection"""
+        from stability_sdk import client
+
+        kwargs = {"host": self.host} if self.host else {}
+        return client.StabilityInference(
+            key=self.api_key,
+            verbose=self.verbose,
+            engine="stable-diffusion-xl-1024-v1-0",
+            **kwargs
+        )
+
+    def _next_client(self):
+        """
+        Pick a client from the pool in round-robin order
+
+        gRPC channels multiplex concurrent calls, so a pooled client is
+        shared by many in-flight requests rather than borrowed exclusively.
+        Connections are opened on first use.
+        """
+        with self._lock:
+            if len(self._clients) < self.pool_size:
+                api = self.client_factory()
+                self._clients.append(api)
+                return api
+            if self._client_cycle is None:
+                self._client_cycle = itertools.cycle(self._clients)
+            return next(self._client_cycle)
+
+    def _seed(self, seed: Optional[int], content: str) -> int:
+        """Resolve the seed of a request, deriving it from its content by default"""
+        if seed is not None:
+            return seed
+        return prompt_seed(content) if self.deterministic else _random_seed()
+
+    def _generate_params(self, prompt: str, resolution: Tuple[int, int], seed: Optional[int] = None, steps: int = 30) -> dict:
+        """Build and validate request parameters for a text-to-image generation"""
         # Ensure resolution is valid
         width, height = resolution
-        if width > 1024 or height > 1024:
-            raise ValueError("Maximum resolution supported is 1024x1024")
-            
-        # Generate the image
-        answers = self.stability_api.generate(
+        if width > self.max_resolution or height > self.max_resolution:
+            raise ValueError(f"Maximum resolution supported is {self.max_resolution}x{self.max_resolution}")
+
+        return dict(
             prompt=prompt,
-            seed=utils.generate_random_seed(),
-            steps=30,
+            seed=self._seed(seed, prompt),
+            steps=steps,
             cfg_scale=7.0,
             width=width,
             height=height,
             samples=1,
-            sampler=generation.SAMPLER_K_DPMPP_2M
+            sampler=_generation().SAMPLER_K_DPMPP_2M
         )
-        
-        # Process the response
-        for resp in answers:
-            for artifact in resp.artifacts:
-                if artifact.type == generation.ARTIFACT_IMAGE:
-                    # Convert the image data to a PIL Image
-                    img = Image.open(io.BytesIO(artifact.binary))
-                    return img
-                    
-        raise RuntimeError("No image was generated")
-        
-    def generate_variations(self, image: Image.Image, num_variations: int = 3) -> list:
-        """
-        Generate variations of an existing image
-        
-        Args:
-            image (PIL.Image): Base image to generate variations from
-            num_variations (int): Number of variations to generate
-            
-        Returns:
-            list: List of generated variation images
-        """
-        # Convert PIL Image to bytes
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        img_byte_arr = img_byte_arr.getvalue()
-        
-        # Generate variations
-        answers = self.stability_api.generate(
+
+    def _variation_params(self, image: Union[Image.Image, LazyImage], num_variations: int, seed: Optional[int] = None) -> dict:
+        """Build request parameters for an image-to-image variation request"""
+        if isinstance(image, LazyImage) and image.format in ("PNG", "JPEG"):
+            # Already encoded in a format the API accepts
+            img_byte_arr = image.encoded()
+        else:
+            # Convert PIL Image to bytes
+            if isinstance(image, LazyImage):
+                image = image.open()
+            img_byte_arr = io.BytesIO()
+            image.save(img_byte_arr, format='PNG')
+            img_byte_arr = img_byte_arr.getvalue()
+
+        return dict(
             prompt="variation of the provided image, maintaining style and composition",
             init_image=img_byte_arr,
             start_schedule=0.6,
-            seed=utils.generate_random_seed(),
+            seed=self._seed(seed, hashlib.sha256(img_byte_arr).hexdigest()),
             steps=30,
             cfg_scale=7.0,
             width=image.width,
             height=image.height,
             samples=num_variations,
-            sampler=generation.SAMPLER_K_DPMPP_2M
+            sampler=_generation().SAMPLER_K_DPMPP_2M
         )
-        
-        # Process the response
-        variations = []
-        for resp in answers:
-            for artifact in resp.artifacts:
-                if artifact.type == generation.ARTIFACT_IMAGE:
-                    img = Image.open(io.BytesIO(artifact.binary))
-                    variations.append(img)
-                    
-        return variations 
\ No newline at end of file
+
+    @staticmethod
+    def _flight_key(params: dict) -> tuple:
+        """Identify requests producing the same image"""
+        return (params["prompt"], params["seed"], params["width"], params["height"], params["steps"])
+
+    def _join_flight(self, key: tuple) -> Tuple[_Flight, bool]:
+        """
+        Join the in-flight request for a key, or register a new one
+
+        Returns:
+            tuple: The flight and whether the caller leads it (sends the request)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.shared_requests += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _finish_flight(self, key: tuple, flight: _Flight, handle: Optional[LazyImage] = None, error: Optional[BaseException] = None):
+        """Publish a leader's result to the requests that joined its flight"""
+        with self._lock:
+            del self._flights[key]
+            followers = flight.followers
+        if not followers:
+            return
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            # The encoded handle is immutable, so it is shared rather than copied
+            flight.future.set_result(handle)
+
+    async def _alead_flight(self, key: tuple, flight: _Flight, params: dict) -> LazyImage:
+        """Send the request of a flight led by `agenerate` and publish its outcome to the followers"""
+        try:
+            handle = self._first_handle(await self._arequest_with_retries(params))
+        except BaseException as error:
+            self._finish_flight(key, flight, error=error)
+            raise
+        self._finish_flight(key, flight, handle=handle)
+        return handle
+
+    def _generate_final(self, params: dict, future: Future, token: _CancelToken, delay: float):
+        """Worker of `generate_progressive` sending the final request unless it is cancelled first"""
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            if token.wait(delay):
+                raise CancelledError()
+            image = self._first_handle(self._request_with_retries(params, token)).open()
+        except BaseException as error:
+            future.set_exception(error)
+        else:
+            future.set_result(image)
+
+    def _acquire_slot(self, token: Optional[_CancelToken]):
+        """Wait for an in-flight slot, giving up if the request is cancelled meanwhile"""
+        if token is None:
+            self._in_flight.acquire()
+            return
+        while not self._in_flight.acquire(timeout=0.05):
+            if token.cancelled:
+                raise CancelledError()
+        if not token.send():
+            self._in_flight.release()
+            raise CancelledError()
+
+    def _request(self, params: dict, token: Optional[_CancelToken] = None) -> List[LazyImage]:
+        """Send a single generation request and wrap the returned images without decoding them"""
+        generation = _generation()
+        self._acquire_slot(token)
+        try:
+            answers = self._next_client().generate(**params)
+
+            # Process the response
+            images = []
+            for resp in answers:
+                for artifact in resp.artifacts:
+                    if artifact.type == generation.ARTIFACT_IMAGE:
+                        images.append(LazyImage(artifact.binary))
+        finally:
+            self._in_flight.release()
+
+        return images
+
+    def _request_with_retries(self, params: dict, token: Optional[_CancelToken] = None) -> List[LazyImage]:
+        """Send a request, retrying transient failures with jittered backoff"""
+        for attempt in itertools.count():
+            try:
+                return self._request(params, token)
+            except Exception as error:
+                if attempt >= self.max_retries or not self._is_transient(error):
+                    raise
+            time.sleep(self._backoff_delay(attempt))
+
+    async def _arequest_with_retries(self, params: dict) -> List[LazyImage]:
+        """Async variant of `_request_with_retries` that sleeps without holding a worker thread"""
+        loop = asyncio.get_running_loop()
+        for attempt in itertools.count():
+            try:
+                async with self._get_semaphore():
+                    return await loop.run_in_executor(self._get_executor(), self._request, params)
+            except Exception as error:
+                if attempt >= self.max_retries or not self._is_transient(error):
+                    raise
+            await asyncio.sleep(self._backoff_delay(attempt))
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Check whether a failed request is worth retrying"""
+        import grpc
+
+        if isinstance(error, grpc.RpcError) and hasattr(error, "code"):
+            return error.code().name in TRANSIENT_STATUS_CODES
+        return isinstance(error, (ConnectionError, TimeoutError))
+
+    @staticmethod
+    def _first_handle(images: List[LazyImage]) -> LazyImage:
+        """First generated image, or fail if there is none; other samples are never decoded"""
+        if not images:
+            raise RuntimeError("No image was generated")
+        return images[0]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the worker pool backing the async API, sized to `max_in_flight`"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_in_flight,
+                    thread_name_prefix="thumbcrafter-generate"
+                )
+            return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the in-flight semaphore for the running event loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphores[loop] = semaphore
+        return semaphore
@@ -0,0 +1,95 @@
+"""
+Inference backends for the theme models: fp32 torch, int8 torch and ONNX Runtime
+"""
+
+import os
+import tempfile
+from typing import Any, Optional, Tuple
+
+# Supported backends:
+#   "torch"       fp32 PyTorch, the reference path
+#   "torch-int8"  PyTorch with Linear layers dynamically quantized to int8
+#   "onnx"        Model exported to ONNX and run with onnxruntime (needs optimum[onnxruntime])
+#   "onnx-int8"   As "onnx", with weights dynamically quantized to int8
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+def check_backend(backend: str):
+    """Raise ValueError for an unknown backend name"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend {backend!r}. Use one of: {', '.join(BACKENDS)}")
+
+def load_sequence_classifier(model_name: str, backend: str, num_threads: Optional[int] = None) -> Tuple[Any, Any]:
+    """
+    Load a sequence classification (NLI) model and its tokenizer
+
+    Args:
+        model_name (str): Model name or path. For the ONNX backends, a directory
+            that already holds an exported model is loaded without re-exporting
+        backend (str): One of BACKENDS
+        num_threads (int, optional): Intra-op threads for inference. Defaults to the runtime's choice
+
+    Returns:
+        tuple: (model, tokenizer), usable with transformers.pipeline
+    """
+    return _load(model_name, backend, num_threads, "ORTModelForSequenceClassification", "AutoModelForSequenceClassification")
+
+def load_encoder(model_name: str, backend: str, num_threads: Optional[int] = None) -> Tuple[Any, Any]:
+    """
+    Load a text encoder returning last_hidden_state, and its tokenizer
+
+    Args:
+        model_name (str): Model name or path
+        backend (str): One of BACKENDS
+        num_threads (int, optional): Intra-op threads for inference. Defaults to the runtime's choice
+
+    Returns:
+        tuple: (model, tokenizer)
+    """
+    return _load(model_name, backend, num_threads, "ORTModelForFeatureExtraction", "AutoModel")
+
+def _load(model_name: str, backend: str, num_threads: Optional[int], ort_class: str, torch_class: str):
+    check_backend(backend)
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend.startswith("onnx"):
+        return _load_onnx(model_name, backend == "onnx-int8", num_threads, ort_class), tokenizer
+
+    import torch
+    import transformers
+
+    if num_threads:
+        # torch's intra-op pool is process-wide
+        torch.set_num_threads(num_threads)
+    model = getattr(transformers, torch_class).from_pretrained(model_name).eval()
+    if backend == "torch-int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model, tokenizer
+
+def _load_onnx(model_name: str, quantize: bool, num_threads: Optional[int], ort_class: str):
+    """Export (unless already exported), optionally quantize, and open an ONNX Runtime session"""
+    import onnxruntime
+    import optimum.onnxruntime as ort
+
+    model_class = getattr(ort, ort_class)
+    session_options = onnxruntime.SessionOptions()
+    if num_threads:
+        session_options.intra_op_num_threads = num_threads
+        session_options.inter_op_num_threads = 1
+
+    exported = os.path.isdir(model_name) and any(name.endswith(".onnx") for name in os.listdir(model_name))
+    if not quantize:
+        return model_class.from_pretrained(model_name, export=not exported, session_options=session_options)
+
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    workdir = tempfile.mkdtemp(prefix="thumbcrafter-onnx-")
+    source = model_name
+    if not exported:
+        model_class.from_pretrained(model_name, export=True).save_pretrained(workdir)
+        source = workdir
+
+    # Dynamic quantization: int8 weights, activations quantized on the fly; AVX2 kernels run on any x86-64 CPU
+    quantizer = ort.ORTQuantizer.from_pretrained(source)
+    quantizer.quantize(save_dir=workdir, quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False))
+    return model_class.from_pretrained(workdir, file_name="model_quantized.onnx", session_options=session_options)
@@ -0,0 +1,319 @@
+"""
+Lightweight per-stage timing, counters and profiling hooks for the pipeline
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+
+class Event(NamedTuple):
+    """A single measurement passed to the instrumentation callback"""
+    kind: str      # "timing" (seconds), "count" or "bytes"
+    name: str
+    value: float
+
+class _Summary:
+    """Count, total and maximum of a series of observations"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max
+        }
+
+# tracemalloc is process-wide: the first traced stage to enter (in any thread)
+# starts it and resets the peak, the last one to exit stops it again
+_tracing_lock = threading.Lock()
+_traced_stages = 0
+_started_tracing = False
+
+def _enter_traced_stage():
+    global _traced_stages, _started_tracing
+    with _tracing_lock:
+        if _traced_stages == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+            elif hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+                tracemalloc.reset_peak()
+        _traced_stages += 1
+
+def _exit_traced_stage() -> int:
+    """Leave a traced stage and return the peak traced memory since the first running one entered"""
+    global _traced_stages, _started_tracing
+    with _tracing_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _traced_stages -= 1
+        if _traced_stages == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+    return peak
+
+# cProfile is process-wide on Python 3.12+, where enabling a second profiler
+# raises ValueError: one stage (in any thread) is profiled at a time and
+# stages overlapping it run unprofiled
+_profiling_lock = threading.Lock()
+
+def _start_profiler() -> Optional[cProfile.Profile]:
+    """Start profiling, or return None while another stage or profiling tool is active"""
+    if not _profiling_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # Another profiling tool is active (Python 3.12+)
+        _profiling_lock.release()
+        return None
+    return profiler
+
+def _stop_profiler(profiler: cProfile.Profile):
+    try:
+        profiler.disable()
+    finally:
+        _profiling_lock.release()
+
+class _StageTimer:
+    """Context manager timing (and optionally profiling) one stage run"""
+
+    __slots__ = ("owner", "name", "start", "profiler")
+
+    def __init__(self, owner: "Instrumentation", name: str):
+        self.owner = owner
+        self.name = name
+        self.profiler = None
+
+    def __enter__(self):
+        owner = self.owner
+        if self.name in owner.trace_memory_stages:
+            _enter_traced_stage()
+        if self.name in owner.profile_stages:
+            try:
+                self.profiler = _start_profiler()
+            except BaseException:
+                if self.name in owner.trace_memory_stages:
+                    _exit_traced_stage()
+                raise
+            if self.profiler is None:
+                owner.count(f"{self.name}.profile_skipped")
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self.start
+        owner = self.owner
+        if self.profiler is not None:
+            _stop_profiler(self.profiler)
+            owner._add_profile(self.name, self.profiler)
+        if self.name in owner.trace_memory_stages:
+            owner.record_bytes(f"{self.name}.peak_traced_memory", _exit_traced_stage())
+        owner.record_timing(self.name, elapsed)
+        if exc_type is not None:
+            owner.count(f"{self.name}.errors")
+        return False
+
+class Instrumentation:
+    """
+    Collects per-stage timings, counters and byte sizes
+
+    Every measurement is aggregated in memory and, if a callback is set,
+    also passed to it as an Event, so it can be forwarded to any metrics
+    backend. Aggregates can be exported as JSON or Prometheus text.
+
+    Stages listed in profile_stages run under cProfile, and stages listed
+    in trace_memory_stages record their peak Python allocations with
+    tracemalloc. Both are opt-in because they slow the stage down. Only
+    one stage is profiled at a time (cProfile is process-wide on Python
+    3.12+): profiled stages overlapping it, in any thread, run unprofiled
+    and count "<stage>.profile_skipped". Traced stages that overlap, in
+    any thread, share one peak. Without
+    tracemalloc.reset_peak (Python 3.8) the peak cannot be reset when
+    tracing was started elsewhere, and then covers everything since.
+    """
+
+    enabled = True
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[Event], None]] = None,
+        profile_stages: Iterable[str] = (),
+        trace_memory_stages: Iterable[str] = ()
+    ):
+        """
+        Initialize the instrumentation
+
+        Args:
+            callback (callable, optional): Called with an Event for every measurement
+            profile_stages (Iterable[str]): Stages to run under cProfile
+            trace_memory_stages (Iterable[str]): Stages whose peak allocations are traced with tracemalloc
+        """
+        self.callback = callback
+        self.profile_stages = frozenset(profile_stages)
+        self.trace_memory_stages = frozenset(trace_memory_stages)
+
+        self._lock = threading.Lock()
+        self._timings: Dict[str, _Summary] = {}
+        self._bytes: Dict[str, _Summary] = {}
+        self._counters: Dict[str, float] = {}
+        self._profiles: Dict[str, pstats.Stats] = {}
+
+    def stage(self, name: str) -> _StageTimer:
+        """
+        Time a pipeline stage
+
+        Args:
+            name (str): Stage name, e.g. "analyze" or "generate"
+
+        Returns:
+            Context manager recording the stage's duration when it exits
+        """
+        return _StageTimer(self, name)
+
+    def record_timing(self, name: str, seconds: float):
+        """Record the duration of one run of a stage"""
+        with self._lock:
+            self._timings.setdefault(name, _Summary()).add(seconds)
+        self._emit("timing", name, seconds)
+
+    def count(self, name: str, value: float = 1):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._emit("count", name, value)
+
+    def record_bytes(self, name: str, nbytes: int):
+        """Record a byte size, e.g. of an encoded thumbnail"""
+        with self._lock:
+            self._bytes.setdefault(name, _Summary()).add(nbytes)
+        self._emit("bytes", name, nbytes)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Get the aggregated measurements
+
+        Returns:
+            dict: "timings" and "bytes" summaries (count, total, mean, max) and "counters"
+        """
+        with self._lock:
+            return {
+                "timings": {name: summary.as_dict() for name, summary in self._timings.items()},
+                "bytes": {name: summary.as_dict() for name, summary in self._bytes.items()},
+                "counters": dict(self._counters)
+            }
+
+    def to_json(self) -> str:
+        """Export the aggregated measurements as JSON"""
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self, prefix: str = "thumbcrafter") -> str:
+        """
+        Export the aggregated measurements in the Prometheus text format
+
+        Args:
+            prefix (str): Metric name prefix
+
+        Returns:
+            str: Exposition text
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def label(name):
+            return name.replace("\\", "\\\\").replace('"', '\\"')
+
+        if snapshot["timings"]:
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for name, summary in sorted(snapshot["timings"].items()):
+                lines.append(f'{metric}_count{{stage="{label(name)}"}} {summary["count"]}')
+                lines.append(f'{metric}_sum{{stage="{label(name)}"}} {summary["total"]}')
+
+        if snapshot["bytes"]:
+            metric = f"{prefix}_bytes"
+            lines.append(f"# TYPE {metric} summary")
+            for name, summary in sorted(snapshot["bytes"].items()):
+                lines.append(f'{metric}_count{{name="{label(name)}"}} {summary["count"]}')
+                lines.append(f'{metric}_sum{{name="{label(name)}"}} {summary["total"]}')
+
+        if snapshot["counters"]:
+            metric = f"{prefix}_events_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, value in sorted(snapshot["counters"].items()):
+                lines.append(f'{metric}{{name="{label(name)}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def profile_report(self, stage: str, sort: str = "cumulative", limit: int = 25) -> str:
+        """
+        Format the accumulated cProfile statistics of a stage
+
+        Args:
+            stage (str): Stage listed in profile_stages
+            sort (str): pstats sort key
+            limit (int): Number of functions to show
+
+        Returns:
+            str: Report text, empty if the stage has not been profiled
+        """
+        with self._lock:
+            stats = self._profiles.get(stage)
+            if stats is None:
+                return ""
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def _add_profile(self, stage: str, profiler: cProfile.Profile):
+        with self._lock:
+            stats = self._profiles.get(stage)
+            if stats is None:
+                self._profiles[stage] = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+
+    def _emit(self, kind: str, name: str, value: float):
+        if self.callback is not None:
+            self.callback(Event(kind, name, value))
+
+class NullInstrumentation:
+    """Instrumentation that records nothing; every call is a cheap no-op"""
+
+    enabled = False
+
+    _null_stage = nullcontext()
+
+    def stage(self, name: str):
+        return self._null_stage
+
+    def record_timing(self, name: str, seconds: float):
+        pass
+
+    def count(self, name: str, value: float = 1):
+        pass
+
+    def record_bytes(self, name: str, nbytes: int):
+        pass
+
+# Shared default used when instrumentation is disabled
+NULL_INSTRUMENTATION = NullInstrumentation()
@@ -0,0 +1,159 @@
+"""
+Image-aware palette extraction and text contrast selection
+"""
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image
+from .utils import get_optimal_text_color
+
+# Minimum WCAG contrast ratio for large text (AA)
+MIN_CONTRAST = 3.0
+
+class PaletteColor(NamedTuple):
+    """A dominant image color and the share of pixels it represents"""
+    color: Tuple[int, int, int]
+    weight: float
+
+def _downsample(image: Image.Image, max_side: int) -> np.ndarray:
+    """RGB pixels of an integer-factor reduced copy, shape (rows, columns, 3)"""
+    factor = max(1, max(image.size) // max_side)
+    small = image.reduce(factor) if factor > 1 else image
+    return np.asarray(small.convert("RGB"), dtype=np.float32)
+
+def extract_palette(
+    image: Image.Image,
+    colors: int = 5,
+    max_side: int = 64,
+    iterations: int = 10,
+    seed: int = 0
+) -> List[PaletteColor]:
+    """
+    Extract the dominant colors of an image with k-means
+
+    Clusters the pixels of a box-filtered copy no larger than max_side,
+    seeded with k-means++ so results are deterministic for a given seed.
+
+    Args:
+        image (PIL.Image): Image to analyze
+        colors (int): Maximum number of palette colors
+        max_side (int): Longest side of the downsampled copy that is clustered
+        iterations (int): Maximum k-means iterations
+        seed (int): Seed for the k-means++ initialization
+
+    Returns:
+        List[PaletteColor]: Palette colors, most common first
+    """
+    pixels = _downsample(image, max_side).reshape(-1, 3)
+    k = min(colors, len(pixels))
+    rng = np.random.default_rng(seed)
+
+    # k-means++ initialization
+    centers = np.empty((k, 3), dtype=np.float32)
+    centers[0] = pixels[rng.integers(len(pixels))]
+    distances = ((pixels - centers[0]) ** 2).sum(axis=1)
+    for index in range(1, k):
+        total = distances.sum()
+        if total <= 0:
+            k = index  # Fewer distinct colors than requested
+            break
+        centers[index] = pixels[rng.choice(len(pixels), p=distances / total)]
+        distances = np.minimum(distances, ((pixels - centers[index]) ** 2).sum(axis=1))
+    centers = centers[:k]
+
+    squared_norms = (pixels ** 2).sum(axis=1, keepdims=True)
+    for _ in range(iterations):
+        labels = (squared_norms - 2 * pixels @ centers.T + (centers ** 2).sum(axis=1)).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=pixels[:, channel], minlength=k) for channel in range(3)], axis=1)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers).astype(np.float32)
+        converged = np.abs(updated - centers).max() < 0.5
+        centers = updated
+        if converged:
+            break
+
+    labels = (squared_norms - 2 * pixels @ centers.T + (centers ** 2).sum(axis=1)).argmin(axis=1)
+    counts = np.bincount(labels, minlength=k)
+    return [
+        PaletteColor(tuple(int(round(value)) for value in centers[index]), counts[index] / len(pixels))
+        for index in np.argsort(-counts) if counts[index]
+    ]
+
+def relative_luminance(color: Sequence[float]) -> float:
+    """
+    WCAG relative luminance of an sRGB color
+
+    Args:
+        color (Sequence[float]): RGB color with 0-255 channels
+
+    Returns:
+        float: Luminance from 0 (black) to 1 (white)
+    """
+    return float(_linear_luminance(np.asarray(color[:3], dtype=np.float32)))
+
+def contrast_ratio(first: Sequence[float], second: Sequence[float]) -> float:
+    """
+    WCAG contrast ratio between two sRGB colors
+
+    Returns:
+        float: Ratio from 1 (identical luminance) to 21 (black on white)
+    """
+    return _ratio(relative_luminance(first), relative_luminance(second))
+
+def choose_text_color(
+    image: Image.Image,
+    box: Tuple[int, int, int, int],
+    preferred: Tuple[int, int, int],
+    candidates: Sequence[Optional[Tuple[int, int, int]]] = (),
+    min_contrast: float = MIN_CONTRAST,
+    max_side: int = 64
+) -> Tuple[int, int, int]:
+    """
+    Pick a text color that stays readable on the image region behind it
+
+    A color's contrast is measured against both the dark (5th percentile)
+    and the bright (95th percentile) end of the region's luminance, so text
+    over a busy background is judged by its worst part. The preferred color
+    is kept when it reaches min_contrast, then the candidates are tried in
+    order, and otherwise black or white is chosen for the region's mean color
+    with utils.get_optimal_text_color.
+
+    Args:
+        image (PIL.Image): Image the text is drawn on
+        box (tuple): Text region (left, top, right, bottom)
+        preferred (tuple): Color to use if it is readable
+        candidates (Sequence): Further colors to try, in order of preference
+        min_contrast (float): Contrast ratio a color must reach
+        max_side (int): Longest side of the downsampled region
+
+    Returns:
+        tuple: RGB text color
+    """
+    left, top, right, bottom = box
+    left, top = max(0, left), max(0, top)
+    right, bottom = min(image.size[0], right), min(image.size[1], bottom)
+    if right <= left or bottom <= top:
+        return tuple(preferred)
+
+    region = _downsample(image.crop((left, top, right, bottom)), max_side).reshape(-1, 3)
+    dark, bright = np.percentile(_linear_luminance(region), [5, 95])
+
+    for color in (preferred, *candidates):
+        if color is None:
+            continue
+        luminance = relative_luminance(color)
+        if min(_ratio(luminance, dark), _ratio(luminance, bright)) >= min_contrast:
+            return tuple(color)
+
+    mean = region.mean(axis=0)
+    return get_optimal_text_color(tuple(int(value) for value in mean))
+
+def _linear_luminance(colors: np.ndarray) -> np.ndarray:
+    """WCAG relative luminance of sRGB colors along the last axis"""
+    channels = colors / 255.0
+    linear = np.where(channels <= 0.04045, channels / 12.92, ((channels + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+
+def _ratio(first: float, second: float) -> float:
+    high, low = max(first, second), min(first, second)
+    return (high + 0.05) / (low + 0.05)
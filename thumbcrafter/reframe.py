@@ -0,0 +1,115 @@
+"""
+Saliency-aware cropping and resizing for deriving output sizes from one image
+"""
+
+from typing import Optional, Tuple
+import numpy as np
+from PIL import Image
+
+class SaliencyMap:
+    """Edge-energy saliency of an image, computed on a downsampled copy"""
+
+    def __init__(self, energy: np.ndarray, image_size: Tuple[int, int]):
+        """
+        Args:
+            energy (np.ndarray): Saliency per downsampled pixel, shape (rows, columns)
+            image_size (tuple): Size (width, height) of the full-resolution image
+        """
+        self.energy = energy
+        self.image_size = image_size
+
+    @classmethod
+    def from_image(cls, image: Image.Image, max_side: int = 128, center_bias: float = 0.5) -> "SaliencyMap":
+        """
+        Compute saliency as gradient magnitude weighted towards the center
+
+        Args:
+            image (PIL.Image): Image to analyze
+            max_side (int): Longest side of the downsampled copy
+            center_bias (float): How strongly the image center is preferred, 0 to disable
+
+        Returns:
+            SaliencyMap: Saliency of the image
+        """
+        factor = max(1, max(image.size) // max_side)
+        small = image.reduce(factor) if factor > 1 else image
+        gray = np.asarray(small.convert("L"), dtype=np.float32)
+
+        energy = np.zeros_like(gray)
+        energy[:, 1:] += np.abs(np.diff(gray, axis=1))
+        energy[1:, :] += np.abs(np.diff(gray, axis=0))
+
+        if center_bias:
+            rows, columns = gray.shape
+            y = (np.arange(rows, dtype=np.float32) - (rows - 1) / 2) / max(rows / 2, 1)
+            x = (np.arange(columns, dtype=np.float32) - (columns - 1) / 2) / max(columns / 2, 1)
+            distance = np.minimum(y[:, None] ** 2 + x[None, :] ** 2, 1)
+            # Add a floor so flat images still crop around the center
+            energy = (energy + energy.mean() + 1e-6) * (1 - center_bias * distance)
+
+        return cls(energy, image.size)
+
+def crop_box(image_size: Tuple[int, int], target_size: Tuple[int, int], saliency: Optional[SaliencyMap] = None) -> Tuple[float, float, float, float]:
+    """
+    Find the largest crop of the target aspect ratio
+
+    The crop spans the full image along one axis and slides along the other
+    to the position holding the most saliency, or stays centered when no
+    saliency map is given.
+
+    Args:
+        image_size (tuple): Source image size (width, height)
+        target_size (tuple): Output size (width, height)
+        saliency (SaliencyMap, optional): Saliency of the source image
+
+    Returns:
+        tuple: Crop box (left, top, right, bottom) in source pixels
+    """
+    width, height = image_size
+    aspect = target_size[0] / target_size[1]
+
+    if width / height > aspect:
+        crop_width, crop_height = height * aspect, float(height)
+        slide_axis, free = 0, width - crop_width
+    else:
+        crop_width, crop_height = float(width), width / aspect
+        slide_axis, free = 1, height - crop_height
+
+    offset = free / 2
+    if saliency is not None and free >= 1:
+        # Sum saliency across the fixed axis, then score every window position
+        profile = saliency.energy.sum(axis=0 if slide_axis == 0 else 1)
+        scale = len(profile) / image_size[slide_axis]
+        window = max(1, int(round((crop_width if slide_axis == 0 else crop_height) * scale)))
+        if window < len(profile):
+            cumulative = np.concatenate([[0.0], np.cumsum(profile)])
+            scores = cumulative[window:] - cumulative[:-window]
+            offset = min(float(np.argmax(scores)) / scale, free)
+
+    if slide_axis == 0:
+        return (offset, 0.0, offset + crop_width, crop_height)
+    return (0.0, offset, crop_width, offset + crop_height)
+
+def reframe(image: Image.Image, size: Tuple[int, int], saliency: Optional[SaliencyMap] = None) -> Image.Image:
+    """
+    Crop an image to the target aspect ratio and resize it to the target size
+
+    Cropping and resizing happen in one pass. Downscaling first reduces by an
+    integer factor with a cheap box filter and then resamples the remainder
+    with Lanczos, which is much faster than a full Lanczos pass at large
+    ratios and visually equivalent.
+
+    Args:
+        image (PIL.Image): Source image
+        size (tuple): Output size (width, height)
+        saliency (SaliencyMap, optional): Saliency of the source image for content-aware cropping
+
+    Returns:
+        PIL.Image: Reframed image
+    """
+    size = tuple(size)
+    if image.size == size:
+        return image
+
+    box = crop_box(image.size, size, saliency)
+    return image.resize(size, Image.Resampling.LANCZOS, box=box, reducing_gap=2.0)
@@ -0,0 +1,167 @@
+"""
+Multi-process render pool for the CPU-bound overlay and encode stages
+"""
+
+import os
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from PIL import Image
+from .encoder import encode_image
+
+class RenderJob(NamedTuple):
+    """One overlay + encode job for a base image"""
+    text: str
+    color_scheme: Dict[str, Tuple[int, int, int]]
+    style: str
+    format: str = "png"
+    quality: Optional[int] = None
+    target_bytes: Optional[int] = None
+
+# Per-worker overlay renderer; its font and layout caches stay warm across jobs
+_worker_overlay = None
+
+def _init_worker(font_paths: Optional[Tuple[str, ...]], max_lines: int):
+    global _worker_overlay
+    from .text_overlay import TextOverlay
+
+    _worker_overlay = TextOverlay(font_paths, max_lines)
+
+def _render_shared(shm_name: str, mode: str, size: Tuple[int, int], job: RenderJob) -> bytes:
+    """Render one job against a base image living in shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # Zero-copy view of the parent's pixels (Pillow only maps 4-byte modes such as RGBX
+        # and RGBA); add_text makes its own RGB or RGBA working copy
+        base = Image.frombuffer(mode, size, shm.buf, "raw", mode, 0, 1)
+        try:
+            thumbnail = _worker_overlay.add_text(base, job.text, job.color_scheme, job.style)
+        except BaseException as error:
+            # The finished frames of the traceback still reference the view; clear their
+            # locals so closing the segment does not fail with BufferError and hide the error
+            traceback.clear_frames(error.__traceback__)
+            raise
+        finally:
+            del base  # Release the buffer export before closing the segment
+
+        return encode_image(thumbnail, job.format, job.quality, job.target_bytes).tobytes()
+    finally:
+        shm.close()
+
+class _SharedImage:
+    """Copies an image's pixels into a shared memory segment once, RGB padded to RGBX"""
+
+    def __init__(self, image: Image.Image):
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        self.mode = "RGBA" if image.mode == "RGBA" else "RGBX"
+        self.size = image.size
+
+        data = image.tobytes("raw", self.mode)
+        self.shm = shared_memory.SharedMemory(create=True, size=len(data))
+        self.shm.buf[:len(data)] = data
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+class RenderPool:
+    """
+    Renders text overlays and encodes thumbnails on a pool of processes
+
+    Overlay drawing and PNG encoding hold the GIL for most of their work, so
+    threads do not scale them past one core. Base images are shipped to the
+    workers through shared memory rather than pickled PIL images, so several
+    jobs against the same base image (sizes, styles) share one copy. Each
+    worker keeps its own TextOverlay, whose font caches stay warm.
+    """
+
+    def __init__(self, processes: Optional[int] = None, font_paths: Optional[Sequence[str]] = None, max_lines: int = 3):
+        """
+        Initialize the render pool
+
+        Args:
+            processes (int, optional): Number of worker processes. Defaults to the CPU count
+            font_paths (Sequence[str], optional): Candidate fonts for the workers' TextOverlay
+            max_lines (int): Maximum number of lines a title is wrapped into
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_init_worker,
+            initargs=(tuple(font_paths) if font_paths else None, max_lines)
+        )
+
+    def render(self, image: Image.Image, jobs: Sequence[RenderJob]) -> List[bytes]:
+        """
+        Render several jobs against one base image
+
+        Args:
+            image (PIL.Image): Base image
+            jobs (Sequence[RenderJob]): Overlay and encode jobs
+
+        Returns:
+            List[bytes]: Encoded thumbnails, in job order
+        """
+        return next(self.render_many([(image, jobs)]))
+
+    def render_many(self, tasks: Iterable[Tuple[Image.Image, Sequence[RenderJob]]], window: Optional[int] = None) -> Iterator[List[bytes]]:
+        """
+        Render jobs for a stream of base images
+
+        At most `window` base images are held in shared memory at a time,
+        which keeps every worker busy without copying the whole input.
+
+        Args:
+            tasks (Iterable): (base image, jobs) pairs
+            window (int, optional): Base images in flight. Defaults to twice the process count
+
+        Returns:
+            Iterator[List[bytes]]: Encoded thumbnails per task, in input order
+        """
+        window = window or 2 * self.processes
+        pending = deque()
+        try:
+            for image, jobs in tasks:
+                shared = _SharedImage(image)
+                futures = [
+                    self._executor.submit(_render_shared, shared.name, shared.mode, shared.size, job)
+                    for job in jobs
+                ]
+                pending.append((shared, futures))
+                if len(pending) >= window:
+                    yield self._collect(*pending.popleft())
+
+            while pending:
+                yield self._collect(*pending.popleft())
+        finally:
+            for shared, futures in pending:
+                for future in futures:
+                    future.cancel()
+                for future in futures:
+                    if not future.cancelled():
+                        future.exception()  # Wait so no worker still maps the segment
+                shared.release()
+
+    def close(self):
+        """Shut down the worker processes"""
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _collect(shared: _SharedImage, futures) -> List[bytes]:
+        try:
+            return [future.result() for future in futures]
+        finally:
+            shared.release()
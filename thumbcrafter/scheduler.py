@@ -0,0 +1,631 @@
+"""
+Rate-, priority- and budget-aware scheduling of paid image generation requests
+"""
+
+import contextvars
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from PIL import Image
+from .instrumentation import NULL_INSTRUMENTATION
+
+# Lower values are dispatched first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKFILL = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BACKFILL: "backfill",
+}
+
+# Priority and tenant of requests made without explicit ones, see request_context
+_request_context: "contextvars.ContextVar[Tuple[int, Optional[str]]]" = contextvars.ContextVar(
+    "thumbcrafter_request_context", default=(PRIORITY_NORMAL, None)
+)
+
+@contextmanager
+def request_context(priority: int = PRIORITY_NORMAL, tenant: Optional[str] = None):
+    """
+    Set the priority and tenant of scheduled generations made inside the block
+
+    Lets code that does not pass them explicitly, such as
+    ThumbCrafter.generate_thumbnail, be scheduled as interactive work or
+    billed to a tenant.
+
+    Args:
+        priority (int): PRIORITY_INTERACTIVE, PRIORITY_NORMAL or PRIORITY_BACKFILL
+        tenant (str, optional): Tenant whose credits pay for the requests
+    """
+    token = _request_context.set((priority, tenant))
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+def default_cost(kind: str, params: Dict[str, Any]) -> float:
+    """Credits charged for a request: one per generated image"""
+    return float(params.get("num_variations", 1)) if kind == "variations" else 1.0
+
+class BudgetExceeded(RuntimeError):
+    """Raised when a tenant does not have enough credits left for a request"""
+
+    def __init__(self, tenant: str, cost: float, remaining: float):
+        """
+        Args:
+            tenant (str): Tenant that submitted the request
+            cost (float): Credits the request costs
+            remaining (float): Credits the tenant has left
+        """
+        super().__init__(f"Tenant {tenant!r} has {remaining:g} credits left, request costs {cost:g}")
+        self.tenant = tenant
+        self.cost = cost
+        self.remaining = remaining
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter
+
+    Tokens refill continuously at `rate` per second up to `burst`; a
+    request takes one. Not thread-safe on its own.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate (float): Tokens added per second
+            burst (float): Bucket capacity, the number of requests allowed back to back
+            clock (callable): Returns the current time in seconds
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.clock = clock
+        self.tokens = self.capacity
+        self._updated = clock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens if they are available
+
+        Args:
+            tokens (float): Tokens to take
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until they will be available
+        """
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+class _Job:
+    """A queued request and every submission coalesced into it"""
+
+    __slots__ = ("kind", "key", "call", "params", "priority", "seq", "tenant", "cost", "token", "waiters", "queued")
+
+    def __init__(self, kind, key, call, params, priority, seq, tenant, cost, token=None):
+        self.kind = kind
+        self.key = key
+        self.call = call
+        self.params = params
+        self.priority = priority
+        self.seq = seq
+        self.tenant = tenant
+        self.cost = cost
+        # Cancellation state of a progressive final request, marked as sent on dispatch
+        self.token = token
+        # (future, submit time, priority) of every submission waiting for this job
+        self.waiters: List[Tuple[Future, float, int]] = []
+        self.queued = True
+
+class GenerationScheduler:
+    """
+    Schedules ImageGenerator requests under a rate limit, priorities and budgets
+
+    Requests are queued by priority, so interactive edits go ahead of
+    backfill jobs, and dispatched no faster than a token bucket allows with
+    at most `max_concurrency` running. A request identical to one still
+    queued joins it instead of paying for a second generation, and is
+    raised to the higher of the two priorities. Tenants with a budget are
+    charged credits when they queue a request (coalesced submissions are
+    free) and refunded if it fails or is cancelled before it starts.
+
+    By default a background thread dispatches requests. With
+    `autostart=False` nothing is dispatched until `dispatch()` is called,
+    which together with an injected clock allows stepping through a
+    simulated timeline.
+    """
+
+    def __init__(
+        self,
+        generator,
+        rate: Optional[float] = None,
+        burst: float = 1.0,
+        max_concurrency: int = 4,
+        budgets: Optional[Dict[str, float]] = None,
+        cost: Callable[[str, Dict[str, Any]], float] = default_cost,
+        clock: Callable[[], float] = time.monotonic,
+        autostart: bool = True,
+        instrumentation=None,
+        wait_samples: int = 1024
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            generator (ImageGenerator): Generator requests are sent to
+            rate (float, optional): Requests per second allowed on average. Unlimited if not given
+            burst (float): Requests allowed back to back when the rate limit has not been used up
+            max_concurrency (int): Maximum number of requests running at the same time
+            budgets (dict, optional): Credits available to each tenant. Tenants without an
+                entry, and requests without a tenant, are not limited
+            cost (callable): Returns the credits a request costs from its kind
+                ("generate" or "variations") and parameters
+            clock (callable): Returns the current time in seconds
+            autostart (bool): Dispatch requests from a background thread
+            instrumentation (Instrumentation, optional): Receives wait times and coalescing,
+                rejection and dispatch counts
+            wait_samples (int): Number of recent wait times kept for the percentiles in stats()
+        """
+        self.generator = generator
+        self.max_concurrency = max(1, max_concurrency)
+        self.cost = cost
+        self.clock = clock
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        self.bucket = TokenBucket(rate, burst, clock) if rate else None
+
+        self.submitted = 0
+        self.dispatched = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.failed = 0
+
+        self._budgets: Dict[str, float] = dict(budgets or {})
+        self._heap: List[Tuple[int, int, _Job]] = []
+        self._queued: Dict[tuple, _Job] = {}
+        self._running = 0
+        self._seq = itertools.count()
+        self._waits: "deque[float]" = deque(maxlen=wait_samples)
+        self._condition = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="thumbcrafter-scheduled")
+        self._thread = None
+        if autostart:
+            self._thread = threading.Thread(target=self._run_dispatcher, name="thumbcrafter-scheduler", daemon=True)
+            self._thread.start()
+
+    @property
+    def max_resolution(self) -> int:
+        """Largest width or height the underlying generator accepts"""
+        return self.generator.max_resolution
+
+    def submit(
+        self,
+        prompt: str,
+        resolution: Tuple[int, int] = (1024, 1024),
+        seed: Optional[int] = None,
+        steps: int = 30,
+        priority: Optional[int] = None,
+        tenant: Optional[str] = None
+    ) -> Future:
+        """
+        Queue a text-to-image generation
+
+        Args:
+            prompt (str): Image generation prompt
+            resolution (tuple): Output image resolution (width, height)
+            seed (int, optional): Generation seed, as for ImageGenerator.generate
+            steps (int): Number of diffusion steps
+            priority (int, optional): Dispatch priority. Defaults to the current request_context
+            tenant (str, optional): Tenant charged for the request. Defaults to the current request_context
+
+        Returns:
+            Future: Resolves to the generated PIL.Image
+
+        Raises:
+            BudgetExceeded: If the tenant cannot afford the request
+        """
+        width, height = resolution
+        params = {"prompt": prompt, "resolution": (width, height), "seed": seed, "steps": steps}
+        key = None
+        if seed is not None or getattr(self.generator, "deterministic", False):
+            key = ("generate", prompt, seed, width, height, steps)
+        return self._submit("generate", key, self.generator.generate, params, priority, tenant)
+
+    def submit_variations(
+        self,
+        image: Image.Image,
+        num_variations: int = 3,
+        seed: Optional[int] = None,
+        priority: Optional[int] = None,
+        tenant: Optional[str] = None
+    ) -> Future:
+        """
+        Queue an image-to-image variation request
+
+        Args:
+            image (PIL.Image or LazyImage): Base image to generate variations from
+            num_variations (int): Number of variations to generate
+            seed (int, optional): Generation seed, as for ImageGenerator.generate_variations
+            priority (int, optional): Dispatch priority. Defaults to the current request_context
+            tenant (str, optional): Tenant charged for the request. Defaults to the current request_context
+
+        Returns:
+            Future: Resolves to the list of generated variation images
+
+        Raises:
+            BudgetExceeded: If the tenant cannot afford the request
+        """
+        params = {"image": image, "num_variations": num_variations, "seed": seed}
+        key = None
+        if seed is not None or getattr(self.generator, "deterministic", False):
+            # Encoded handles are keyed by their bytes, decoded images by their pixels
+            data = image.encoded() if hasattr(image, "encoded") else image.tobytes()
+            digest = hashlib.sha256(data).hexdigest()
+            key = ("variations", digest, image.mode, image.size, num_variations, seed)
+        return self._submit("variations", key, self.generator.generate_variations, params, priority, tenant)
+
+    def generate(
+        self,
+        prompt: str,
+        resolution: Tuple[int, int] = (1024, 1024),
+        seed: Optional[int] = None,
+        steps: int = 30,
+        priority: Optional[int] = None,
+        tenant: Optional[str] = None
+    ) -> Image.Image:
+        """Queue a generation and wait for its image; see `submit`"""
+        return self.submit(prompt, resolution, seed, steps, priority, tenant).result()
+
+    def generate_variations(
+        self,
+        image: Image.Image,
+        num_variations: int = 3,
+        seed: Optional[int] = None,
+        priority: Optional[int] = None,
+        tenant: Optional[str] = None
+    ) -> list:
+        """Queue a variation request and wait for its images; see `submit_variations`"""
+        return self.submit_variations(image, num_variations, seed, priority, tenant).result()
+
+    def generate_progressive(
+        self,
+        prompt: str,
+        resolution: Tuple[int, int] = (1024, 1024),
+        seed: Optional[int] = None,
+        steps: int = 30,
+        draft_steps: int = 8,
+        draft_scale: float = 0.5,
+        final_delay: float = 0.0,
+        callback: Optional[Callable[[Image.Image], None]] = None,
+        priority: Optional[int] = None,
+        tenant: Optional[str] = None
+    ):
+        """
+        Generate a fast draft now and queue the final image, as ImageGenerator.generate_progressive
+
+        The draft is queued at interactive priority and waited for; the
+        final request is queued at `priority` after `final_delay` seconds.
+        Both are charged to the tenant. Cancelling the returned render
+        before the final request is dispatched withdraws it and refunds it.
+
+        Args:
+            prompt (str): Image generation prompt
+            resolution (tuple): Final image resolution (width, height)
+            seed (int, optional): Generation seed shared by the draft and the final image
+            steps (int): Diffusion steps of the final image
+            draft_steps (int): Diffusion steps of the draft
+            draft_scale (float): Fraction of each side the draft is generated at
+            final_delay (float): Seconds to wait before queueing the final request
+            callback (callable, optional): Called with the final image once it is available
+            priority (int, optional): Dispatch priority of the final request. Defaults to the current request_context
+            tenant (str, optional): Tenant charged for both requests. Defaults to the current request_context
+
+        Returns:
+            ProgressiveRender: Draft image and the pending final image
+
+        Raises:
+            BudgetExceeded: If the tenant cannot afford the draft. A final request it cannot
+                afford fails the `final` future instead
+        """
+        from .image_generator import ProgressiveRender, _CancelToken, draft_resolution
+
+        resolution = tuple(resolution)
+        seed = self.generator._seed(seed, prompt)
+        draft = self.generate(prompt, draft_resolution(resolution, draft_scale), seed, draft_steps, PRIORITY_INTERACTIVE, tenant)
+        if draft.size != resolution:
+            draft = draft.resize(resolution, Image.BILINEAR)
+
+        token = _CancelToken()
+        final = Future()
+        if callback is not None:
+            def deliver(future):
+                if not future.cancelled() and future.exception() is None:
+                    callback(future.result())
+            final.add_done_callback(deliver)
+
+        # Resolved now, as the timer thread does not run in the caller's context
+        default_priority, default_tenant = _request_context.get()
+        priority = default_priority if priority is None else priority
+        tenant = default_tenant if tenant is None else tenant
+        params = {"prompt": prompt, "resolution": resolution, "seed": seed, "steps": steps}
+
+        def settle(queued: Future):
+            if queued.cancelled():
+                final.cancel()
+            elif not final.cancelled():
+                error = queued.exception()
+                if error is not None:
+                    final.set_exception(error)
+                else:
+                    final.set_result(queued.result())
+
+        def submit_final():
+            if token.cancelled:
+                final.cancel()
+                return
+            try:
+                queued = self._submit("generate", None, self.generator.generate, params, priority, tenant, token)
+            except BaseException as error:
+                if not final.cancelled():
+                    final.set_exception(error)
+                return
+            queued.add_done_callback(settle)
+
+        if final_delay > 0:
+            timer = threading.Timer(final_delay, submit_final)
+            timer.daemon = True
+            timer.start()
+        else:
+            submit_final()
+        return ProgressiveRender(draft, final, token)
+
+    def add_credits(self, tenant: str, credits: float):
+        """
+        Give a tenant more credits, starting a budget if it had none
+
+        Args:
+            tenant (str): Tenant name
+            credits (float): Credits to add
+        """
+        with self._condition:
+            self._budgets[tenant] = self._budgets.get(tenant, 0.0) + credits
+
+    def remaining_credits(self, tenant: str) -> Optional[float]:
+        """Credits a tenant has left, or None if it is not limited"""
+        with self._condition:
+            return self._budgets.get(tenant)
+
+    def dispatch(self) -> Optional[float]:
+        """
+        Start every queued request allowed to run now
+
+        Called by the background thread; call it directly when the
+        scheduler was created with autostart=False.
+
+        Returns:
+            float or None: Seconds until the rate limit lets the next queued request start,
+                or None if the queue is empty or all concurrency slots are busy
+        """
+        with self._condition:
+            return self._dispatch_ready()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue and throughput metrics
+
+        Returns:
+            dict: Queue depth (total and per priority), running requests, request counters,
+                tenant credits and wait-time percentiles in seconds over recent dispatches
+        """
+        with self._condition:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for job in self._queued.values():
+                name = PRIORITY_NAMES.get(job.priority, str(job.priority))
+                depth[name] = depth.get(name, 0) + len(job.waiters)
+            waits = sorted(self._waits)
+            return {
+                "queue_depth": sum(depth.values()),
+                "queue_depth_by_priority": depth,
+                "running": self._running,
+                "submitted": self.submitted,
+                "dispatched": self.dispatched,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "credits": dict(self._budgets),
+                "wait_p50": _percentile(waits, 0.5),
+                "wait_p95": _percentile(waits, 0.95),
+                "wait_max": waits[-1] if waits else 0.0
+            }
+
+    def close(self, wait: bool = True):
+        """
+        Stop dispatching and fail requests that are still queued
+
+        Args:
+            wait (bool): Wait for running requests to finish
+        """
+        with self._condition:
+            self._closed = True
+            jobs = list(self._queued.values())
+            self._queued.clear()
+            self._heap.clear()
+            for job in jobs:
+                self._refund(job)
+            self._condition.notify_all()
+        for job in jobs:
+            for future, _, _ in job.waiters:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(RuntimeError("GenerationScheduler was closed"))
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _submit(self, kind, key, call, params, priority, tenant, token=None) -> Future:
+        """Charge, coalesce and queue a request, optionally withdrawn by cancelling a token before dispatch"""
+        default_priority, default_tenant = _request_context.get()
+        priority = default_priority if priority is None else priority
+        tenant = default_tenant if tenant is None else tenant
+
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("GenerationScheduler is closed")
+            self.submitted += 1
+            now = self.clock()
+
+            job = self._queued.get(key) if key is not None else None
+            if job is not None:
+                # Identical request still queued: share it, at the more urgent priority
+                job.waiters.append((future, now, priority))
+                if priority < job.priority:
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, job.seq, job))
+                self.coalesced += 1
+                self.instrumentation.count("scheduler.coalesced")
+                return future
+
+            cost = self.cost(kind, params)
+            remaining = self._budgets.get(tenant) if tenant is not None else None
+            if remaining is not None:
+                if remaining < cost:
+                    self.rejected += 1
+                    self.instrumentation.count("scheduler.rejected")
+                    raise BudgetExceeded(tenant, cost, remaining)
+                self._budgets[tenant] = remaining - cost
+
+            seq = next(self._seq)
+            # Requests that must not be coalesced get a key of their own
+            job = _Job(kind, key if key is not None else ("unique", seq), call, params, priority, seq, tenant, cost, token)
+            job.waiters.append((future, now, priority))
+            self._queued[job.key] = job
+            heapq.heappush(self._heap, (priority, job.seq, job))
+            self._condition.notify_all()
+        return future
+
+    def _dispatch_ready(self) -> Optional[float]:
+        """Start queued jobs while slots and rate tokens allow; the condition must be held"""
+        while self._running < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                return None
+            if self.bucket is not None:
+                delay = self.bucket.try_acquire()
+                if delay > 0:
+                    return delay
+
+            heapq.heappop(self._heap)
+            del self._queued[job.key]
+            job.queued = False
+            if job.token is not None and not job.token.send():
+                # Cancelled since _next_job looked at it
+                self._cancel_job(job)
+                continue
+
+            now = self.clock()
+            waiters = []
+            for future, submitted, priority in job.waiters:
+                if future.set_running_or_notify_cancel():
+                    waiters.append(future)
+                    wait = now - submitted
+                    self._waits.append(wait)
+                    self.instrumentation.record_timing(f"scheduler.wait.{PRIORITY_NAMES.get(priority, priority)}", wait)
+            if not waiters:
+                # Everyone cancelled between the check in _next_job and now
+                self._refund(job)
+                continue
+
+            self._running += 1
+            self.dispatched += 1
+            self.instrumentation.count("scheduler.dispatched")
+            self._executor.submit(self._run_job, job, waiters)
+        return None
+
+    def _next_job(self) -> Optional[_Job]:
+        """Most urgent queued job, dropping stale heap entries and fully cancelled jobs"""
+        while self._heap:
+            priority, _, job = self._heap[0]
+            if not job.queued or priority != job.priority:
+                heapq.heappop(self._heap)
+                continue
+            if all(future.cancelled() for future, _, _ in job.waiters) or (job.token is not None and job.token.cancelled):
+                heapq.heappop(self._heap)
+                del self._queued[job.key]
+                job.queued = False
+                self._cancel_job(job)
+                continue
+            return job
+        return None
+
+    def _cancel_job(self, job: _Job):
+        """Drop a job withdrawn before dispatch; the condition must be held"""
+        self._refund(job)
+        for future, _, _ in job.waiters:
+            future.cancel()
+
+    def _run_job(self, job: _Job, waiters: List[Future]):
+        """Worker sending one dispatched request and publishing its result"""
+        params = job.params
+        try:
+            if job.kind == "generate":
+                result = job.call(params["prompt"], params["resolution"], params["seed"], params["steps"])
+            else:
+                result = job.call(params["image"], params["num_variations"], params["seed"])
+        except BaseException as error:
+            with self._condition:
+                self.failed += 1
+                self._refund(job)
+            for future in waiters:
+                future.set_exception(error)
+        else:
+            # Every waiter after the first gets its own copy
+            waiters[0].set_result(result)
+            for future in waiters[1:]:
+                future.set_result(_copy_result(result))
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+
+    def _refund(self, job: _Job):
+        """Return the credits of a job that was not (successfully) sent; the condition must be held"""
+        if job.tenant is not None and job.tenant in self._budgets:
+            self._budgets[job.tenant] += job.cost
+
+    def _run_dispatcher(self):
+        """Background thread dispatching requests as slots and rate tokens free up"""
+        with self._condition:
+            while not self._closed:
+                delay = self._dispatch_ready()
+                self._condition.wait(delay)
+
+def _copy_result(result):
+    """Independent copy of a generated image or list of images"""
+    if isinstance(result, list):
+        return [image.copy() for image in result]
+    return result.copy()
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values, 0 when empty"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
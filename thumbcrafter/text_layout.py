@@ -0,0 +1,187 @@
+"""
+Font caching and text layout for overlays
+"""
+
+import logging
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+from PIL import ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Fonts tried in order; the first one that loads is used
+DEFAULT_FONT_PATHS = (
+    "arial.ttf",
+    "Arial.ttf",
+    "DejaVuSans.ttf",
+    "LiberationSans-Regular.ttf",
+    "Helvetica.ttc"
+)
+
+_warned_font_paths = set()
+
+class TextLayout(NamedTuple):
+    """A title laid out to fit a box"""
+    font: ImageFont.FreeTypeFont
+    lines: Tuple[str, ...]
+    line_widths: Tuple[int, ...]
+    line_height: int
+    line_spacing: int
+    width: int
+    height: int
+
+@lru_cache(maxsize=64)
+def load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    """
+    Load a TrueType font, cached process-wide by (path, size)
+
+    Args:
+        path (str): Font file name or path
+        size (int): Font size in pixels
+
+    Returns:
+        ImageFont.FreeTypeFont: Loaded font
+
+    Raises:
+        OSError: If the font cannot be loaded
+    """
+    return ImageFont.truetype(path, size)
+
+@lru_cache(maxsize=256)
+def resolve_font(paths: Tuple[str, ...], size: int) -> ImageFont.FreeTypeFont:
+    """
+    Load the first available font from a list of candidates
+
+    Falls back to Pillow's scalable default font, logging a warning once per
+    candidate list, when none of the candidates can be loaded. The outcome is
+    cached so failed lookups are not retried on every render.
+
+    Args:
+        paths (tuple): Candidate font file names or paths
+        size (int): Font size in pixels
+
+    Returns:
+        ImageFont.FreeTypeFont: Loaded font
+    """
+    for path in paths:
+        try:
+            return load_font(path, size)
+        except OSError:
+            continue
+
+    if paths not in _warned_font_paths:
+        _warned_font_paths.add(paths)
+        logger.warning("None of the fonts %s could be loaded; using Pillow's default font", ", ".join(paths))
+    return ImageFont.load_default(size)
+
+@lru_cache(maxsize=8192)
+def measure_text(font: ImageFont.FreeTypeFont, text: str) -> Tuple[int, int, int, int]:
+    """
+    Measure the bounding box of a single line of text, memoized per (font, text)
+
+    Fonts come from the process-wide cache, so the same font object is
+    reused across renders and its measurements stay cached.
+
+    Args:
+        font (ImageFont.FreeTypeFont): Font to measure with
+        text (str): Single line of text
+
+    Returns:
+        tuple: (left, top, right, bottom), as returned by ImageDraw.textbbox at the origin
+    """
+    return font.getbbox(text)
+
+def text_width(font: ImageFont.FreeTypeFont, text: str) -> int:
+    """Get the rendered width of a single line of text"""
+    left, _, right, _ = measure_text(font, text)
+    return right - left
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int) -> List[str]:
+    """
+    Greedily wrap text into lines no wider than max_width
+
+    A single word wider than max_width is kept on its own line.
+
+    Args:
+        text (str): Text to wrap
+        font (ImageFont.FreeTypeFont): Font used for measuring
+        max_width (int): Maximum line width in pixels
+
+    Returns:
+        List[str]: Wrapped lines
+    """
+    lines = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and text_width(font, candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+@lru_cache(maxsize=1024)
+def layout_text(
+    text: str,
+    font_paths: Tuple[str, ...],
+    max_width: int,
+    max_height: int,
+    max_size: int,
+    min_size: int,
+    max_lines: int = 3,
+    spacing: float = 0.2
+) -> TextLayout:
+    """
+    Lay out text at the largest font size that fits a box
+
+    Binary-searches font sizes between min_size and max_size, wrapping the
+    text at each candidate size. If even min_size does not fit, the
+    min_size layout is returned as is. Layouts are memoized, so rendering
+    the same title at the same size again costs a dictionary lookup.
+
+    Args:
+        text (str): Text to lay out
+        font_paths (tuple): Candidate fonts, first available wins
+        max_width (int): Maximum line width in pixels
+        max_height (int): Maximum block height in pixels
+        max_size (int): Largest font size to try
+        min_size (int): Smallest font size to try
+        max_lines (int): Maximum number of lines
+        spacing (float): Gap between lines as a fraction of the line height
+
+    Returns:
+        TextLayout: Chosen font, lines and block dimensions
+    """
+    min_size = max(1, min(min_size, max_size))
+
+    def build(size):
+        font = resolve_font(font_paths, size)
+        lines = tuple(wrap_text(text, font, max_width)) or ("",)
+        widths = tuple(text_width(font, line) for line in lines)
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent
+        line_spacing = int(line_height * spacing)
+        height = len(lines) * line_height + (len(lines) - 1) * line_spacing
+        return TextLayout(font, lines, widths, line_height, line_spacing, max(widths), height)
+
+    def fits(layout):
+        return (
+            len(layout.lines) <= max_lines
+            and layout.width <= max_width
+            and layout.height <= max_height
+        )
+
+    best = build(min_size)
+    low, high = min_size + 1, max_size
+    while low <= high:
+        size = (low + high) // 2
+        layout = build(size)
+        if fits(layout):
+            best = layout
+            low = size + 1
+        else:
+            high = size - 1
+    return best
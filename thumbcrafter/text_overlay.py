@@ -2,16 +2,84 @@
 Text overlay module for adding text to generated images
 """
 
-from typing import Dict, Tuple
-from PIL import Image, ImageDraw, ImageFont
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+from PIL import Image, ImageDraw
 import numpy as np
+from .palette import choose_text_color, relative_luminance
+from .text_layout import DEFAULT_FONT_PATHS, TextLayout, layout_text
 from .utils import StylePresets
 
+@lru_cache(maxsize=8)
+def _intensity_lut(bands: str) -> Tuple[int, ...]:
+    """
+    Lookup table raising color channel intensity by 20%, cached per band layout
+    
+    Color bands are scaled and clipped to 255; an alpha band is left as is.
+    """
+    boost = [min(255, int(value * 1.2)) for value in range(256)]
+    identity = list(range(256))
+    return tuple(
+        value for band in bands for value in (identity if band == "A" else boost)
+    )
+
+@lru_cache(maxsize=16)
+def _gradient_mask(size: Tuple[int, int]) -> Image.Image:
+    """
+    Alpha mask for the modern style's vertical gradient, cached per size
+    
+    Opacity falls linearly from 128 at the top row to 0 at the bottom.
+    """
+    width, height = size
+    alpha = (128 * (1 - np.arange(height, dtype=np.float32) / height)).astype(np.uint8)
+    return Image.fromarray(np.repeat(alpha[:, None], width, axis=1), "L")
+
+@lru_cache(maxsize=16)
+def _vignette_mask(size: Tuple[int, int]) -> Image.Image:
+    """
+    Alpha mask for the vibrant style's radial vignette, cached per size
+    
+    Opacity depends on the distance from the image center, scaled by the
+    larger half-dimension; pixels beyond that radius are left untouched.
+    """
+    width, height = size
+    center_x, center_y = width // 2, height // 2
+    max_radius = max(center_x, center_y)
+    
+    x = np.arange(width, dtype=np.float32) - center_x
+    y = np.arange(height, dtype=np.float32) - center_y
+    radius = np.maximum(np.rint(np.hypot(x[None, :], y[:, None])), 1)
+    alpha = np.where(radius <= max_radius, 128 * (1 - radius / max_radius), 0)
+    return Image.fromarray(alpha.astype(np.uint8), "L")
+
 class TextOverlay:
     """Handles text overlay on generated images"""
     
-    def __init__(self):
-        """Initialize the text overlay handler"""
+    # Bump whenever rendered output changes so cached thumbnails are invalidated
+    version = 6
+    
+    def __init__(
+        self,
+        font_paths: Optional[Sequence[str]] = None,
+        max_lines: int = 3,
+        contrast_aware: bool = True,
+        layer_cache_bytes: int = 16 * 2 ** 20
+    ):
+        """
+        Initialize the text overlay handler
+        
+        Args:
+            font_paths (Sequence[str], optional): Candidate fonts, the first one that loads is used
+            max_lines (int): Maximum number of lines a title is wrapped into
+            contrast_aware (bool): Replace the scheme's text color when it is not readable on
+                the part of the image behind the title
+            layer_cache_bytes (int): Memory budget of the rendered text layers kept for reuse (0 disables)
+        """
+        self.font_paths = tuple(font_paths or DEFAULT_FONT_PATHS)
+        self.max_lines = max_lines
+        self.contrast_aware = contrast_aware
         self.font_sizes = {
             "small": 0.05,    # 5% of image height
             "medium": 0.08,   # 8% of image height
@@ -24,6 +92,29 @@ class TextOverlay:
             "bold": "Bold"
         }
         
+        # Effects run in order on the working image once the text is
+        # composited; each one may modify it in place and returns the image to
+        # hand to the next effect
+        self.style_effects = {
+            "modern": [self._add_modern_effects],
+            "minimal": [self._add_minimal_effects],
+            "vibrant": [self._add_vibrant_effects]
+        }
+        
+        # Per-band lookup tables applied to the base image and the text color
+        # before the layer is composited
+        self.style_luts = {
+            "vibrant": _intensity_lut
+        }
+        
+        # Text and shadow rasterized into one RGBA layer cropped to the text
+        # block, so the same title on another base image costs a single composite
+        self.layer_cache_bytes = layer_cache_bytes
+        self.layer_cache_hits = 0
+        self._layers: "OrderedDict[tuple, Tuple[Tuple[int, int], Image.Image]]" = OrderedDict()
+        self._layers_size = 0
+        self._layers_lock = threading.Lock()
+        
     def add_text(self, image: Image.Image, text: str, color_scheme: Dict[str, Tuple[int, int, int]], style: str) -> Image.Image:
         """
         Add text overlay to the image
@@ -37,64 +128,144 @@ class TextOverlay:
         Returns:
             PIL.Image: Image with text overlay
         """
-        # Create a copy of the image to work with
-        img = image.copy()
-        draw = ImageDraw.Draw(img)
+        img = image if image.mode in ("RGB", "RGBA") else image.convert("RGB")
         
         # Get image dimensions
         width, height = img.size
         
-        # Determine font size based on image height
-        font_size = int(height * self.font_sizes["medium"])
+        # Shrink the font from the medium size until the wrapped title fits
+        # the central area of the image
+        layout = layout_text(
+            text,
+            self.font_paths,
+            max_width=int(width * 0.9),
+            max_height=int(height * 0.6),
+            max_size=int(height * self.font_sizes["medium"]),
+            min_size=int(height * self.font_sizes["small"]),
+            max_lines=self.max_lines
+        )
+        
+        y = (height - layout.height) // 2
         
-        # Load appropriate font
-        try:
-            font = ImageFont.truetype("arial.ttf", font_size)
-        except IOError:
-            # Fallback to default font if Arial is not available
-            font = ImageFont.load_default()
+        # Keep the title readable on the part of the image behind it
+        text_color = color_scheme["primary"]
+        if self.contrast_aware:
+            box = ((width - layout.width) // 2, y, (width + layout.width) // 2, y + layout.height)
+            text_color = choose_text_color(
+                img, box, text_color, (color_scheme.get("secondary"), color_scheme.get("accent"))
+            )
             
-        # Calculate text size
-        text_bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
+        # Text shadow for better readability, light behind dark text
+        shadow_color = (0, 0, 0, 128) if relative_luminance(text_color) > 0.18 else (255, 255, 255, 128)
         
-        # Calculate text position
-        x = (width - text_width) // 2
-        y = (height - text_height) // 2
+        # Style adjustments such as the vibrant intensity boost apply to the
+        # base image and the text alike, as if they ran on the finished thumbnail
+        text_color = tuple(text_color[:3])
+        lut = self.style_luts.get(style)
+        if lut is not None:
+            text_color = tuple(lut("RGB")[value] for value in text_color)
+            img = img.point(lut("".join(img.getbands())))
+        elif img is image:
+            # Work on a copy; the layer and the effects are applied in place
+            img = image.copy()
+            
+        # Font and size follow from the text and resolution for a given overlay
+        key = (text, img.size, text_color, shadow_color)
+        entry = self._get_layer(key)
+        if entry is None:
+            entry = self._render_layer(img.size, layout, y, text_color, shadow_color)
+            self._put_layer(key, entry)
+            
+        # One composite for the text and its shadow
+        position, layer = entry
+        if img.mode == "RGBA":
+            img.alpha_composite(layer, position)
+        else:
+            img.paste(layer, position, layer)
+            
+        # Add style-specific effects
+        for effect in self.style_effects.get(style, []):
+            img = effect(img, text, color_scheme)
+            
+        return img
         
-        # Add text shadow for better readability
-        shadow_offset = int(font_size * 0.02)  # 2% of font size
-        draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=(0, 0, 0, 128))
+    def _render_layer(
+        self,
+        size: Tuple[int, int],
+        layout: TextLayout,
+        y: int,
+        text_color: Tuple[int, int, int],
+        shadow_color: Tuple[int, int, int, int]
+    ) -> Tuple[Tuple[int, int], Image.Image]:
+        """
+        Rasterize the shadow and the text into one RGBA layer
         
-        # Add main text
-        draw.text((x, y), text, font=font, fill=color_scheme["primary"])
+        Returns:
+            tuple: Position of the layer on the image and the layer, cropped to the text block
+        """
+        width, height = size
+        font = layout.font
+        shadow_offset = int(font.size * 0.02)  # 2% of font size
         
-        # Add style-specific effects
-        if style == "modern":
-            self._add_modern_effects(img, text, color_scheme)
-        elif style == "minimal":
-            self._add_minimal_effects(img, text, color_scheme)
-        elif style == "vibrant":
-            self._add_vibrant_effects(img, text, color_scheme)
+        # Lines are centered horizontally, the block vertically; the margin
+        # keeps glyphs reaching past their advance width. A title taller than
+        # the image (at the minimum font size) is cut at the image edges
+        margin = font.size // 4
+        line_xs = [(width - line_width) // 2 for line_width in layout.line_widths]
+        left = max(0, min(line_xs) - margin)
+        right = min(width, max(x + line_width for x, line_width in zip(line_xs, layout.line_widths)) + shadow_offset + margin)
+        top = max(0, y)
+        bottom = min(height, y + layout.height + shadow_offset + 1)
+        
+        # Transparent pixels carry the ink color so anti-aliased edges keep it when composited
+        block_size = (max(1, right - left), max(1, bottom - top))
+        shadow = Image.new("RGBA", block_size, shadow_color[:3] + (0,))
+        block = Image.new("RGBA", block_size, text_color + (0,))
+        shadow_draw = ImageDraw.Draw(shadow)
+        block_draw = ImageDraw.Draw(block)
+        
+        line_y = y - top
+        for line, x in zip(layout.lines, line_xs):
+            x -= left
+            shadow_draw.text((x + shadow_offset, line_y + shadow_offset), line, font=font, fill=shadow_color)
             
-        return img
+            # Add main text
+            block_draw.text((x, line_y), line, font=font, fill=text_color + (255,))
+            line_y += layout.line_height + layout.line_spacing
+        shadow.alpha_composite(block)
+        return (left, top), shadow
         
-    def _add_modern_effects(self, image: Image.Image, text: str, color_scheme: Dict[str, Tuple[int, int, int]]):
-        """Add modern style effects to the image"""
-        # Add subtle gradient overlay
-        gradient = Image.new('RGBA', image.size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(gradient)
-        
-        # Create a vertical gradient
-        for y in range(image.size[1]):
-            alpha = int(128 * (1 - y / image.size[1]))  # Fade from top to bottom
-            draw.line([(0, y), (image.size[0], y)], fill=(0, 0, 0, alpha))
+    def _get_layer(self, key: tuple) -> Optional[Tuple[Tuple[int, int], Image.Image]]:
+        """Look up a rendered overlay layer, refreshing its position in the LRU order"""
+        with self._layers_lock:
+            layer = self._layers.get(key)
+            if layer is not None:
+                self._layers.move_to_end(key)
+                self.layer_cache_hits += 1
+            return layer
             
-        # Composite the gradient
-        image.paste(gradient, (0, 0), gradient)
+    def _put_layer(self, key: tuple, entry: Tuple[Tuple[int, int], Image.Image]):
+        """Store a rendered overlay layer, evicting the least recently used ones beyond the memory budget"""
+        _, layer = entry
+        nbytes = layer.width * layer.height * 4
+        if nbytes > self.layer_cache_bytes:
+            return
+        with self._layers_lock:
+            if key in self._layers:
+                return
+            self._layers[key] = entry
+            self._layers_size += nbytes
+            while self._layers_size > self.layer_cache_bytes:
+                _, (_, evicted) = self._layers.popitem(last=False)
+                self._layers_size -= evicted.width * evicted.height * 4
+                
+    def _add_modern_effects(self, image: Image.Image, text: str, color_scheme: Dict[str, Tuple[int, int, int]]) -> Image.Image:
+        """Add modern style effects to the image"""
+        # Add subtle gradient overlay, fading from top to bottom
+        image.paste((0, 0, 0), (0, 0) + image.size, _gradient_mask(image.size))
+        return image
         
-    def _add_minimal_effects(self, image: Image.Image, text: str, color_scheme: Dict[str, Tuple[int, int, int]]):
+    def _add_minimal_effects(self, image: Image.Image, text: str, color_scheme: Dict[str, Tuple[int, int, int]]) -> Image.Image:
         """Add minimal style effects to the image"""
         # Add subtle border
         border_width = int(image.size[0] * 0.01)  # 1% of image width
@@ -102,33 +273,13 @@ class TextOverlay:
         draw.rectangle(
             [(border_width, border_width), 
              (image.size[0] - border_width, image.size[1] - border_width)],
-            outline=color_scheme["secondary"],
+            outline=tuple(color_scheme["secondary"]),
             width=border_width
         )
+        return image
         
-    def _add_vibrant_effects(self, image: Image.Image, text: str, color_scheme: Dict[str, Tuple[int, int, int]]):
-        """Add vibrant style effects to the image"""
-        # Increase saturation
-        img_array = np.array(image)
-        img_array = img_array.astype(np.float32)
-        img_array[:, :, :3] = np.clip(img_array[:, :, :3] * 1.2, 0, 255)  # Increase color intensity by 20%
-        image = Image.fromarray(img_array.astype(np.uint8))
-        
+    def _add_vibrant_effects(self, image: Image.Image, text: str, color_scheme: Dict[str, Tuple[int, int, int]]) -> Image.Image:
+        """Add vibrant style effects to the image; the intensity boost is a style LUT"""
         # Add subtle vignette
-        vignette = Image.new('RGBA', image.size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(vignette)
-        
-        # Create radial gradient
-        center_x, center_y = image.size[0] // 2, image.size[1] // 2
-        max_radius = max(center_x, center_y)
-        
-        for radius in range(max_radius, 0, -1):
-            alpha = int(128 * (1 - radius / max_radius))  # Fade from center to edges
-            draw.ellipse(
-                [center_x - radius, center_y - radius,
-                 center_x + radius, center_y + radius],
-                outline=(0, 0, 0, alpha)
-            )
-            
-        # Composite the vignette
-        image.paste(vignette, (0, 0), vignette) 
\ No newline at end of file
+        image.paste((0, 0, 0), (0, 0) + image.size, _vignette_mask(image.size))
+        return image
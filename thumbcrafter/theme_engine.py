@@ -0,0 +1,142 @@
+"""
+Embedding-similarity theme engine for fast theme classification
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+class EmbeddingThemeEngine:
+    """
+    Classifies text by cosine similarity against precomputed label embeddings
+
+    The candidate label hypotheses are encoded once and cached as a NumPy
+    matrix, so classifying a post costs a single encoder pass plus one
+    matrix product instead of one NLI forward pass per label. Instances are
+    called like the transformers zero-shot pipeline and return results in
+    the same {"sequence", "labels", "scores"} shape.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        hypothesis_template: str = "This example is about {}.",
+        threshold: float = 0.2,
+        top_k: int = 3,
+        backend: str = "torch",
+        num_threads: Optional[int] = None
+    ):
+        """
+        Initialize the embedding engine
+
+        Args:
+            model (str, optional): Sentence embedding model name or path
+            hypothesis_template (str): Template used to turn a label into a hypothesis sentence
+            threshold (float): Minimum cosine similarity for a theme to be kept
+            top_k (int): Number of best matching labels returned per text
+            backend (str): Inference backend, see inference.BACKENDS
+            num_threads (int, optional): Inference threads. Defaults to the backend's choice
+        """
+        from .inference import load_encoder
+
+        self.model, self.tokenizer = load_encoder(model or DEFAULT_EMBEDDING_MODEL, backend, num_threads)
+        self.hypothesis_template = hypothesis_template
+        self.threshold = threshold
+        self.top_k = top_k
+        self._label_embeddings: Dict[Tuple[str, ...], np.ndarray] = {}
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode texts into L2-normalized embeddings
+
+        Args:
+            texts (Sequence[str]): Texts to encode
+            batch_size (int): Number of texts per forward pass
+
+        Returns:
+            np.ndarray: Float32 matrix of shape (len(texts), embedding_dim)
+        """
+        import torch
+
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(
+                list(texts[start:start + batch_size]),
+                padding=True,
+                truncation=True,
+                return_tensors="pt"
+            )
+            with torch.inference_mode():
+                hidden = self.model(**batch).last_hidden_state
+
+            # Mean pooling over real (non-padding) tokens
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            chunks.append(pooled.cpu().numpy())
+
+        embeddings = np.concatenate(chunks).astype(np.float32)
+        embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+    def encode_labels(self, labels: Sequence[str]) -> np.ndarray:
+        """
+        Get the cached hypothesis embedding matrix for a label set
+
+        Args:
+            labels (Sequence[str]): Candidate labels
+
+        Returns:
+            np.ndarray: Matrix of shape (len(labels), embedding_dim)
+        """
+        key = tuple(labels)
+        matrix = self._label_embeddings.get(key)
+        if matrix is None:
+            matrix = self.encode([self.hypothesis_template.format(label) for label in labels])
+            self._label_embeddings[key] = matrix
+        return matrix
+
+    def __call__(
+        self,
+        sequences: Union[str, Sequence[str]],
+        candidate_labels: Sequence[str],
+        multi_label: bool = True,
+        batch_size: int = 32
+    ) -> Union[Dict, List[Dict]]:
+        """
+        Classify one or more texts against the candidate labels
+
+        Args:
+            sequences (str or Sequence[str]): Text or texts to classify
+            candidate_labels (Sequence[str]): Candidate labels
+            multi_label (bool): Accepted for pipeline compatibility; scores are always independent cosine similarities
+            batch_size (int): Number of texts per encoder forward pass
+
+        Returns:
+            dict or list: Result dict per text with the top-k labels and scores, best first
+        """
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        labels = list(candidate_labels)
+
+        label_matrix = self.encode_labels(labels)
+        similarities = self.encode(texts, batch_size) @ label_matrix.T
+
+        # Vectorized top-k: partition, then sort only the k survivors
+        k = min(self.top_k, len(labels))
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = [
+            {
+                "sequence": text,
+                "labels": [labels[index] for index in row],
+                "scores": scores.tolist()
+            }
+            for text, row, scores in zip(texts, top, top_scores)
+        ]
+
+        return results[0] if single else results
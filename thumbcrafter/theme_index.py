@@ -0,0 +1,216 @@
+"""
+Persistent near-duplicate index of extracted themes, keyed by SimHash of the post text
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Union
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within a process
+    fcntl = None
+
+# One record per indexed post: its fingerprint and the offset of its entry in entries.jsonl
+_RECORD = np.dtype([("fingerprint", "<u8"), ("offset", "<u8")])
+
+# Number of set bits for every byte value
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+class ThemeMatch(NamedTuple):
+    """Themes stored for an indexed post similar to the one looked up"""
+    themes: List[str]
+    scores: Optional[List[float]]
+    similarity: float
+
+def normalize_text(title: str, summary: str) -> str:
+    """
+    Normalize post text for near-duplicate detection
+
+    Applies Unicode compatibility folding and lowercasing, and reduces
+    punctuation and whitespace to single spaces.
+
+    Args:
+        title (str): Post title
+        summary (str): Post summary
+
+    Returns:
+        str: Normalized text
+    """
+    text = unicodedata.normalize("NFKC", f"{title} {summary}").lower()
+    return " ".join(re.findall(r"\w+", text))
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash of a text over its word unigrams and bigrams
+
+    Texts sharing most of their words get fingerprints that differ in only
+    a few bits.
+
+    Args:
+        text (str): Normalized text
+
+    Returns:
+        int: Fingerprint
+    """
+    words = text.split()
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    if not features:
+        return 0
+
+    digests = b"".join(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest() for feature in features)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(features), 64)
+    votes = bits.sum(axis=0, dtype=np.int32) * 2 - len(features)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+
+class ThemeIndex:
+    """
+    Memory-mapped index that reuses themes of near-duplicate posts
+
+    Syndicated copies, tag pages and lightly edited posts mostly share
+    their wording, so their SimHash fingerprints differ in few bits. A
+    lookup scans all fingerprints of the memory-mapped index in one
+    vectorized pass and returns the stored themes of the closest post if it
+    is at least min_similarity similar (1 - differing bits / 64).
+
+    The index is a directory with two append-only files, so it persists
+    across runs and can be shared by processes on one host:
+    fingerprints.bin (fixed-size records, memory-mapped) and entries.jsonl
+    (themes and scores). Use one index per theme model configuration.
+    """
+
+    def __init__(self, directory: Union[str, Path], min_similarity: float = 0.95):
+        """
+        Open or create an index
+
+        Args:
+            directory (str or Path): Directory holding the index files
+            min_similarity (float): Similarity (0-1) a stored post needs to be reused
+        """
+        if not 0 <= min_similarity <= 1:
+            raise ValueError("min_similarity must be between 0 and 1")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.min_similarity = min_similarity
+        self.max_distance = int((1 - min_similarity) * 64 + 1e-9)
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+        self._records_path = self.directory / "fingerprints.bin"
+        self._entries_path = self.directory / "entries.jsonl"
+        self._records_path.touch()
+        self._entries_path.touch()
+        self._lock = threading.Lock()
+        self._records = np.zeros(0, dtype=_RECORD)
+        self._mapped_size = 0
+
+    def lookup(self, title: str, summary: str) -> Optional[ThemeMatch]:
+        """
+        Find the themes of the most similar indexed post
+
+        Args:
+            title (str): Post title
+            summary (str): Post summary
+
+        Returns:
+            ThemeMatch or None: Stored themes, or None if no post is similar enough
+        """
+        fingerprint = simhash(normalize_text(title, summary))
+        with self._lock:
+            records = self._refresh()
+            if not len(records):
+                self.misses += 1
+                return None
+
+            differing = np.bitwise_xor(records["fingerprint"], np.uint64(fingerprint))
+            distances = _POPCOUNT[differing.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+            # Prefer the most recent entry among equally close ones
+            best = len(distances) - 1 - int(np.argmin(distances[::-1]))
+            distance = int(distances[best])
+            if distance > self.max_distance:
+                self.misses += 1
+                return None
+
+            if distance == 0:
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+            entry = self._read_entry(int(records["offset"][best]))
+
+        return ThemeMatch(entry["themes"], entry.get("scores"), 1 - distance / 64)
+
+    def add(self, title: str, summary: str, themes: Sequence[str], scores: Optional[Sequence[float]] = None):
+        """
+        Store the themes of a post
+
+        Args:
+            title (str): Post title
+            summary (str): Post summary
+            themes (Sequence[str]): Themes extracted for the post
+            scores (Sequence[float], optional): Classifier scores of the themes
+        """
+        fingerprint = simhash(normalize_text(title, summary))
+        entry = {"themes": list(themes), "scores": None if scores is None else [float(score) for score in scores]}
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+
+        with self._lock, open(self._entries_path, "ab") as entries, open(self._records_path, "ab") as records:
+            # The entry is written before its record, so every visible record points at a complete entry
+            if fcntl is not None:
+                fcntl.flock(entries, fcntl.LOCK_EX)
+            try:
+                offset = entries.seek(0, os.SEEK_END)
+                entries.write(line)
+                entries.flush()
+                record = np.array([(fingerprint, offset)], dtype=_RECORD)
+                records.write(record.tobytes())
+                records.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(entries, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Get lookup counters
+
+        Returns:
+            dict: Entries, exact and near-duplicate hits, misses and the overall hit rate
+        """
+        with self._lock:
+            entries = len(self._refresh())
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                "entries": entries,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.near_hits) / lookups if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._refresh())
+
+    def _refresh(self) -> np.ndarray:
+        """Re-map the fingerprint file if it grew, e.g. through another process"""
+        size = os.path.getsize(self._records_path) // _RECORD.itemsize * _RECORD.itemsize
+        if size != self._mapped_size:
+            self._records = (
+                np.memmap(self._records_path, dtype=_RECORD, mode="r", shape=(size // _RECORD.itemsize,))
+                if size else np.zeros(0, dtype=_RECORD)
+            )
+            self._mapped_size = size
+        return self._records
+
+    def _read_entry(self, offset: int) -> dict:
+        with open(self._entries_path, "rb") as entries:
+            entries.seek(offset)
+            return json.loads(entries.readline())
@@ -13,6 +13,13 @@ class StylePresets(Enum):
     CORPORATE = "corporate"
     CREATIVE = "creative"
 
+# Output sizes expected by common social platforms
+SOCIAL_RESOLUTIONS = {
+    "og": (1200, 630),        # Open Graph link previews
+    "twitter": (1600, 900),   # Twitter / X summary cards
+    "square": (1080, 1080)    # Instagram and other square feeds
+}
+
 class ColorSchemes:
     """Predefined color schemes for different styles"""
     